@@ -0,0 +1,184 @@
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from decimal import Decimal
+from typing import Dict, List
+import httpx
+from fastapi import FastAPI, HTTPException, status
+from sqlmodel import Session, select, col
+from src.db.initialize import create_database_engine, create_db_and_tables, engine
+from src.db.settings import DatabaseSettings
+from src.sqlmodel.models.loan import Loan
+from src.sqlmodel.models.user import User
+
+# Concurrency benchmark for the async database path
+# Starts a uvicorn server for each implementation of /loans/all/:
+# - blocking: the previous implementation, a synchronous Session inside an `async def` route
+# - async: the current route in main.py, backed by the aiosqlite engine
+# then sends parallel /loans/all/ requests while probing `/` and reports latency percentiles for both.
+# The probe shows how long unrelated requests wait on the event loop.
+# The data is seeded into a temporary SQLite file that the servers open through DATABASE_FILE,
+# so the run never touches database.db and does not depend on DATABASE_STORAGE.
+#
+#     python -m benchmarks.async_concurrency --requests 2000 --concurrency 50
+
+BENCHMARK_USER_ID = 900001
+BENCHMARK_LOAN_COUNT = 20
+
+blocking_app = FastAPI()
+
+@blocking_app.get("/")
+def read_root():
+    return "Welcome to the Greystone Loan Amortization App"
+
+@blocking_app.get("/loans/all/")
+async def fetch_all_user_loans_blocking(
+    user_id: int
+):
+    with Session(engine) as session:
+        user_statement = select(User).where(col(User.user_id) == user_id)
+        user_results = session.exec(user_statement).all()
+
+        if not user_results:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Cannot fetch all loans. User does not exist.")
+
+        statement = select(Loan).where(col(Loan.user_id) == user_id)
+        return session.exec(statement).all()
+
+def serve(implementation: str, port: int):
+    import uvicorn
+    from main import app
+    from src.db.async_initialize import async_engine
+
+    engine.echo = False
+    async_engine.echo = False
+    uvicorn.run(blocking_app if implementation == "blocking" else app, port=port, log_level="warning", access_log=False)
+
+def seed(seed_engine):
+    with Session(seed_engine) as session:
+        session.add(User(user_id=BENCHMARK_USER_ID, first_name="Bench", last_name="Mark", email="benchmark@example.com", password="123"))
+        session.add_all(
+            Loan(user_id=BENCHMARK_USER_ID, loan_amount=Decimal('250000.00'), annual_interest_rate=Decimal('6.50'), loan_term_months=360)
+            for _ in range(BENCHMARK_LOAN_COUNT)
+        )
+        session.commit()
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def percentile(latencies: List[float], percent: float) -> float:
+    ordered = sorted(latencies)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * percent / 100))] * 1000
+
+async def load(base_url: str, requests: int, concurrency: int) -> Dict[str, Dict[str, float]]:
+    latencies = []
+    probe_latencies = []
+    semaphore = asyncio.Semaphore(concurrency)
+    done = asyncio.Event()
+
+    async with httpx.AsyncClient(base_url=base_url, limits=httpx.Limits(max_connections=concurrency + 1)) as client:
+        async def send():
+            async with semaphore:
+                start = time.perf_counter()
+                response = await client.get(f"/loans/all/?user_id={BENCHMARK_USER_ID}")
+                latencies.append(time.perf_counter() - start)
+                response.raise_for_status()
+
+        async def probe():
+            while not done.is_set():
+                start = time.perf_counter()
+                await client.get("/")
+                probe_latencies.append(time.perf_counter() - start)
+                await asyncio.sleep(0.005)
+
+        probe_task = asyncio.create_task(probe())
+        start = time.perf_counter()
+        await asyncio.gather(*(send() for _ in range(requests)))
+        elapsed = time.perf_counter() - start
+        done.set()
+        await probe_task
+
+    return {
+        'loans_all': {
+            'requests_per_second': requests / elapsed,
+            'p50_ms': percentile(latencies, 50),
+            'p99_ms': percentile(latencies, 99),
+        },
+        'probe': {
+            'p50_ms': percentile(probe_latencies, 50),
+            'p99_ms': percentile(probe_latencies, 99),
+        },
+    }
+
+def benchmark(implementation: str, requests: int, concurrency: int, sqlite_file_name: str) -> Dict[str, Dict[str, float]]:
+    port = free_port()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "benchmarks.async_concurrency", "--serve", implementation, "--port", str(port)],
+        env={**os.environ, "DATABASE_STORAGE": "file", "DATABASE_FILE": sqlite_file_name}
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        for _ in range(100):
+            try:
+                httpx.get(base_url)
+                break
+            except httpx.TransportError:
+                time.sleep(0.1)
+        return asyncio.run(load(base_url, requests, concurrency))
+    finally:
+        server.terminate()
+        server.wait()
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare blocking and async database access under parallel load")
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    parser.add_argument("--serve", choices=["blocking", "async"], help=argparse.SUPPRESS)
+    parser.add_argument("--port", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args.serve, args.port)
+        return
+
+    directory = tempfile.mkdtemp(prefix="greystone-benchmark-")
+    sqlite_file_name = os.path.join(directory, "database.db")
+    try:
+        seed_engine = create_database_engine(DatabaseSettings(sqlite_file_name=sqlite_file_name))
+        create_db_and_tables(seed_engine)
+        seed(seed_engine)
+        seed_engine.dispose()
+
+        results = {
+            implementation: benchmark(implementation, args.requests, args.concurrency, sqlite_file_name)
+            for implementation in ["blocking", "async"]
+        }
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f"{args.requests} requests to /loans/all/, concurrency {args.concurrency}")
+    for implementation, result in results.items():
+        loans_all = result['loans_all']
+        probe = result['probe']
+        print(
+            f"{implementation:>9}: {loans_all['requests_per_second']:7.1f} req/s"
+            f"  p50 {loans_all['p50_ms']:7.2f} ms  p99 {loans_all['p99_ms']:7.2f} ms"
+            f"  | probe p50 {probe['p50_ms']:6.2f} ms  p99 {probe['p99_ms']:6.2f} ms"
+        )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,316 @@
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from decimal import Decimal
+from typing import Callable, Dict, List
+
+# Benchmark suite for the calculator and every API route
+# Calculator benchmarks cover terms of 12 to 480 months. Route benchmarks run through the ASGI test client
+# against a temporary SQLite database seeded with a realistic number of users, loans and shares.
+# Results are written as JSON and can be compared against a stored baseline:
+#
+#     python -m benchmarks.suite --output benchmarks/results.json
+#     python -m benchmarks.suite --baseline benchmarks/results.json --threshold 0.25
+#
+# The comparison exits with status 1 when the median of any benchmark regresses by more than the threshold.
+
+TERM_MONTHS = [12, 60, 120, 240, 360, 480]
+SEED_USERS = 1000
+SEED_LOANS_PER_USER = 20
+SEED_SHARES = 2000
+
+def measure(function: Callable[[], object], repeat: int) -> Dict[str, float]:
+    """Calls `function` `repeat` times (after one warm-up call) and summarizes the timings in milliseconds
+
+    Returns
+    -------
+    Dict[str, float]
+        { runs, mean_ms, median_ms, p95_ms, min_ms }
+    """
+    function()
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        timings.append((time.perf_counter() - start) * 1000)
+
+    timings.sort()
+    return {
+        'runs': repeat,
+        'mean_ms': statistics.fmean(timings),
+        'median_ms': statistics.median(timings),
+        'p95_ms': timings[min(len(timings) - 1, int(len(timings) * 0.95))],
+        'min_ms': timings[0],
+    }
+
+def benchmark_calculator(repeat: int) -> Dict[str, Dict[str, float]]:
+    from src.utils.loan_amortization_calculation import CalculationEngine, LoanAmortizationCalculator
+
+    results = {}
+    for term_months in TERM_MONTHS:
+        principal_loan_balance = Decimal('250000.00')
+        annual_interest_rate = Decimal('6.50')
+
+        results[f"calculator.calculate_loan_schedule[{term_months}]"] = measure(
+            lambda: LoanAmortizationCalculator.calculate_loan_schedule(principal_loan_balance, term_months, annual_interest_rate),
+            repeat
+        )
+
+        results[f"calculator.calculate_loan_schedule[{term_months}].cents"] = measure(
+            lambda: LoanAmortizationCalculator.calculate_loan_schedule(principal_loan_balance, term_months, annual_interest_rate, CalculationEngine.cents),
+            repeat
+        )
+
+        loan_schedule = LoanAmortizationCalculator.calculate_loan_schedule(principal_loan_balance, term_months, annual_interest_rate)
+        results[f"calculator.calculate_loan_summary[{term_months}]"] = measure(
+            lambda: LoanAmortizationCalculator.calculate_loan_summary(principal_loan_balance, loan_schedule[-1]),
+            repeat
+        )
+
+        results[f"calculator.calculate_loan_schedule_for_month[{term_months}]"] = measure(
+            lambda: LoanAmortizationCalculator.calculate_loan_schedule_for_month(principal_loan_balance, term_months, annual_interest_rate, term_months // 2),
+            repeat
+        )
+
+    # Inverse solvers over 1000 quotes at once
+    from src.utils.batch_loan_amortization_calculation import BatchLoanAmortizationCalculator
+
+    generator = random.Random(20240225)
+    principal_loan_balances = [Decimal(generator.randint(1000000, 100000000)).scaleb(-2) for _ in range(1000)]
+    term_months = [generator.choice(TERM_MONTHS) for _ in range(1000)]
+    annual_interest_rates = [Decimal(generator.randint(100, 1200)).scaleb(-2) for _ in range(1000)]
+    total_monthly_payments = [
+        LoanAmortizationCalculator.calculate_total_monthly_payment(principal_loan_balance, term, annual_interest_rate / 100)
+        for principal_loan_balance, term, annual_interest_rate in zip(principal_loan_balances, term_months, annual_interest_rates)
+    ]
+
+    results["calculator.solve_annual_interest_rates[1000]"] = measure(
+        lambda: BatchLoanAmortizationCalculator.solve_annual_interest_rates(principal_loan_balances, term_months, total_monthly_payments),
+        repeat
+    )
+    results["calculator.solve_principal_loan_balances[1000]"] = measure(
+        lambda: BatchLoanAmortizationCalculator.solve_principal_loan_balances(total_monthly_payments, term_months, annual_interest_rates),
+        repeat
+    )
+    results["calculator.solve_term_months[1000]"] = measure(
+        lambda: BatchLoanAmortizationCalculator.solve_term_months(principal_loan_balances, annual_interest_rates, total_monthly_payments),
+        repeat
+    )
+    return results
+
+def seed_database(engine, generator: random.Random) -> List[Dict]:
+    """Inserts SEED_USERS users with SEED_LOANS_PER_USER loans each and SEED_SHARES shares
+
+    Returns
+    -------
+    List[Dict]
+        the seeded loans as { loan_id, user_id, loan_term_months }
+    """
+    from sqlmodel import Session, insert
+    from src.sqlmodel.models.loan import Loan
+    from src.sqlmodel.models.loan_share import LoanShare
+    from src.sqlmodel.models.user import User
+
+    with Session(engine) as session:
+        session.execute(insert(User), [
+            {'user_id': user_id, 'first_name': "Seed", 'last_name': f"User {user_id}", 'email': f"seed{user_id}@example.com", 'password': "123"}
+            for user_id in range(1, SEED_USERS + 1)
+        ])
+        loans = [
+            {
+                'loan_id': loan_id,
+                'user_id': (loan_id - 1) // SEED_LOANS_PER_USER + 1,
+                'loan_amount': Decimal(generator.randint(1000000, 100000000)).scaleb(-2),
+                'annual_interest_rate': Decimal(generator.randint(100, 1200)).scaleb(-2),
+                'loan_term_months': generator.choice(TERM_MONTHS),
+            }
+            for loan_id in range(1, SEED_USERS * SEED_LOANS_PER_USER + 1)
+        ]
+        session.execute(insert(Loan), loans)
+
+        shares = set()
+        while len(shares) < SEED_SHARES:
+            loan = generator.choice(loans)
+            target_user_id = generator.randint(1, SEED_USERS)
+            if target_user_id != loan['user_id']:
+                shares.add((loan['loan_id'], loan['user_id'], target_user_id))
+        session.execute(insert(LoanShare), [
+            {'loan_id': loan_id, 'source_user_id': source_user_id, 'target_user_id': target_user_id}
+            for loan_id, source_user_id, target_user_id in shares
+        ])
+        session.commit()
+
+    return loans
+
+def benchmark_routes(repeat: int) -> Dict[str, Dict[str, float]]:
+    from fastapi.testclient import TestClient
+    from main import app
+    from src.db.initialize import create_db_and_tables, engine
+    from src.utils.loan_schedule_cache import loan_schedule_cache
+
+    create_db_and_tables()
+    generator = random.Random(20240202)
+    loans = seed_database(engine, generator)
+    long_loans = [loan for loan in loans if loan['loan_term_months'] == 360]
+    client = TestClient(app)
+    counter = iter(range(SEED_USERS + 1, sys.maxsize))
+
+    def request(method: str, url: str, **kwargs):
+        response = client.request(method, url, **kwargs)
+        response.raise_for_status()
+        return response
+
+    def signup():
+        user_id = next(counter)
+        request("POST", "/signup", json={'user_id': user_id, 'first_name': "Bench", 'last_name': "Mark", 'email': f"bench{user_id}@example.com", 'password': "123"})
+
+    def create_loan():
+        request("POST", "/loans/create/", json={'user_id': generator.randint(1, SEED_USERS), 'loan_amount': 250000, 'annual_interest_rate': 6.5, 'loan_term_months': 360})
+
+    def create_loans_bulk():
+        request("POST", "/loans/create/bulk/", json=[
+            {'user_id': generator.randint(1, SEED_USERS), 'loan_amount': 250000, 'annual_interest_rate': 6.5, 'loan_term_months': 360}
+            for _ in range(100)
+        ])
+
+    def share_loan():
+        loan = generator.choice(loans)
+        target_user_id = next(counter)
+        request("POST", "/signup", json={'user_id': target_user_id, 'first_name': "Bench", 'last_name': "Mark", 'email': f"bench{target_user_id}@example.com", 'password': "123"})
+        request("POST", "/loans/share/", json={'loan_id': loan['loan_id'], 'source_user_id': loan['user_id'], 'target_user_id': target_user_id})
+
+    def import_loans():
+        lines = ["user_id,loan_amount,annual_interest_rate,loan_term_months"] + [
+            f"{generator.randint(1, SEED_USERS)},250000.00,6.50,360"
+            for _ in range(1000)
+        ]
+        request("POST", "/loans/import/?format=csv", content="\n".join(lines))
+
+    def fetch_schedule_cold():
+        loan_schedule_cache.clear()
+        request("GET", f"/loans/schedule/?loan_id={generator.choice(long_loans)['loan_id']}")
+
+    results = {}
+    results["route.signup"] = measure(signup, repeat)
+    results["route.loans_create"] = measure(create_loan, repeat)
+    results["route.loans_create_bulk[100]"] = measure(create_loans_bulk, max(1, repeat // 10))
+    results["route.loans_all[20]"] = measure(lambda: request("GET", f"/loans/all/?user_id={generator.randint(1, SEED_USERS)}"), repeat)
+    results["route.loans_schedule[360].cold"] = measure(fetch_schedule_cold, repeat)
+    results["route.loans_schedule[360].warm"] = measure(lambda: request("GET", f"/loans/schedule/?loan_id={long_loans[0]['loan_id']}"), repeat)
+    results["route.loans_schedule[360].columns"] = measure(lambda: request("GET", f"/loans/schedule/?loan_id={long_loans[0]['loan_id']}&layout=columns&money=cents"), repeat)
+    results["route.loans_schedule_batch[50]"] = measure(
+        lambda: request("GET", "/loans/schedule/batch/", params={'loan_ids': [loan['loan_id'] for loan in generator.sample(loans, 50)]}),
+        repeat
+    )
+    results["route.loans_schedule_stream[360]"] = measure(lambda: request("GET", f"/loans/schedule/stream/?loan_id={generator.choice(long_loans)['loan_id']}"), repeat)
+    results["route.loans_summary[360]"] = measure(lambda: request("GET", f"/loans/summary/?loan_id={generator.choice(long_loans)['loan_id']}&month=180"), repeat)
+    results["route.loans_summary_range[360]"] = measure(lambda: request("GET", f"/loans/summary/range/?loan_id={generator.choice(long_loans)['loan_id']}&step=12"), repeat)
+    results["route.loans_accessible[20]"] = measure(lambda: request("GET", f"/loans/accessible/?user_id={generator.randint(1, SEED_USERS)}"), repeat)
+    results["route.loans_portfolio_summary[20]"] = measure(
+        lambda: request("GET", f"/loans/portfolio/summary/?user_id={generator.randint(1, SEED_USERS)}&month=12"),
+        repeat
+    )
+    results["route.loans_prepayment_scenarios[100]"] = measure(
+        lambda: request("POST", "/loans/prepayment/scenarios/", json={
+            'loan_id': generator.choice(long_loans)['loan_id'],
+            'scenarios': [
+                {'extra_payments': [{'amount': 100 * (index + 1), 'month': 1, 'recurring': True}]}
+                for index in range(100)
+            ],
+        }),
+        repeat
+    )
+    results["route.loans_schedule_adjustable[360]"] = measure(
+        lambda: request("POST", "/loans/schedule/adjustable/", json={
+            'loan_id': generator.choice(long_loans)['loan_id'],
+            'rate_resets': [{'effective_month': 61, 'annual_interest_rate': 7.0}, {'effective_month': 121, 'annual_interest_rate': 8.25}],
+        }),
+        repeat
+    )
+    results["route.loans_export[20]"] = measure(lambda: request("GET", f"/loans/export/?user_id={generator.randint(1, SEED_USERS)}&format=csv"), repeat)
+    results["route.loans_schedule_export[20]"] = measure(
+        lambda: request("GET", f"/loans/schedule/export/?user_id={generator.randint(1, SEED_USERS)}&format=csv"),
+        repeat
+    )
+    results["route.loans_payoff_threshold[100]"] = measure(
+        lambda: request("POST", "/loans/payoff/threshold/", json={'queries': [
+            {'loan_id': loan['loan_id'], 'metric': "remaining_balance", 'threshold': 50000}
+            for loan in generator.sample(loans, 100)
+        ]}),
+        repeat
+    )
+    results["route.loans_import[1000]"] = measure(import_loans, max(1, repeat // 10))
+    results["route.loans_share"] = measure(share_loan, repeat)
+    return results
+
+def compare(results: Dict[str, Dict[str, float]], baseline: Dict[str, Dict[str, float]], threshold: float) -> List[str]:
+    """Compares median timings against a baseline
+
+    Returns
+    -------
+    List[str]
+        a description of every benchmark whose median is more than `threshold` (ex. 0.25 = 25%) slower than the baseline
+    """
+    regressions = []
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        change = result['median_ms'] / baseline[name]['median_ms'] - 1
+        if change > threshold:
+            regressions.append(f"{name}: {baseline[name]['median_ms']:.3f} ms -> {result['median_ms']:.3f} ms ({change:+.0%})")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the loan calculator and API routes")
+    parser.add_argument("--repeat", type=int, default=50, help="timed runs per benchmark")
+    parser.add_argument("--only", choices=["calculator", "routes"], help="run a single group of benchmarks")
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--baseline", help="compare the results against this JSON file")
+    parser.add_argument("--threshold", type=float, default=0.25, help="allowed slowdown of the median before a benchmark counts as a regression")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        # Routes run against a throwaway database, never the application's database.db
+        os.environ["DATABASE_FILE"] = os.path.join(directory, "benchmark.db")
+        os.environ["DATABASE_ECHO"] = "false"
+
+        results = {}
+        if args.only in (None, "calculator"):
+            results.update(benchmark_calculator(args.repeat))
+        if args.only in (None, "routes"):
+            results.update(benchmark_routes(args.repeat))
+
+    report = {
+        'meta': {
+            'created_at': datetime.now(timezone.utc).isoformat(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'repeat': args.repeat,
+        },
+        'results': results,
+    }
+
+    for name, result in results.items():
+        print(f"{name:<55} median {result['median_ms']:9.3f} ms  p95 {result['p95_ms']:9.3f} ms")
+
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(report, file, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as file:
+            regressions = compare(results, json.load(file)['results'], args.threshold)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            raise SystemExit(1)
+
+if __name__ == "__main__":
+    main()
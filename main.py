@@ -1,11 +1,26 @@
-from fastapi import FastAPI, HTTPException, status
-from sqlmodel import Session, select
+from contextlib import asynccontextmanager
+from fastapi import Depends, FastAPI, HTTPException, status
+from fastapi.responses import PlainTextResponse
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import Session
 from src.sqlmodel.models.user import User
-from src.db.initialize import create_db_and_tables, engine
+from src.db.async_initialize import async_engine
+from src.db.initialize import create_db_and_tables, engine, get_session
 from src.routers.loans import loan_router
+from src.utils.adjustable_rate_calculation import AdjustableRateLoanCalculator
+from src.utils.loan_schedule_cache import loan_schedule_cache
+from src.utils.metrics import MetricsMiddleware, instrument_engine, metrics_registry
 
-create_db_and_tables()
-app = FastAPI()
+# Schema creation is an explicit startup step rather than a side effect of importing this module
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    create_db_and_tables()
+    yield
+
+app = FastAPI(lifespan=lifespan)
+app.add_middleware(MetricsMiddleware)
+instrument_engine(engine)
+instrument_engine(async_engine.sync_engine)
 
 @app.get("/")
 def read_root():
@@ -13,17 +28,34 @@ def read_root():
 
 app.include_router(loan_router)
 
+# Prometheus metrics: per-route latency, SQL statements, DB time and calculator time, plus schedule cache counters
+@app.get("/metrics", response_class=PlainTextResponse)
+def read_metrics():
+    cache_stats = loan_schedule_cache.stats()
+    segment_cache_info = AdjustableRateLoanCalculator.calculate_remaining_balances.cache_info()
+    return PlainTextResponse(
+        metrics_registry.render({
+            'loan_schedule_cache_hits_total': ("Loan schedule cache hits", cache_stats['hits']),
+            'loan_schedule_cache_misses_total': ("Loan schedule cache misses", cache_stats['misses']),
+            'loan_schedule_cache_evictions_total': ("Loan schedule cache evictions", cache_stats['evictions']),
+            'loan_schedule_cache_size': ("Loan schedules currently cached", cache_stats['size']),
+            'adjustable_rate_segment_cache_hits_total': ("Adjustable-rate schedule segment cache hits", segment_cache_info.hits),
+            'adjustable_rate_segment_cache_misses_total': ("Adjustable-rate schedule segment cache misses", segment_cache_info.misses),
+            'adjustable_rate_segment_cache_size': ("Adjustable-rate schedule segments currently cached", segment_cache_info.currsize),
+        }),
+        media_type="text/plain; version=0.0.4"
+    )
+
 # User Routes
 @app.post("/signup", response_model=User)
-def signup(user: User):
-    with Session(engine) as session:
-        statement = select(User).where(User.email == user.email)
-        results = session.exec(statement).all()
-
-        if results:
-            raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="User already exists") 
-
-        session.add(user)
+def signup(user: User, session: Session = Depends(get_session)):
+    # The unique index on User.email (and the primary key) reject duplicates atomically, so there is no check-then-insert race
+    session.add(user)
+    try:
         session.commit()
-        session.refresh(user)
-        return user
+    except IntegrityError:
+        session.rollback()
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="User already exists") 
+
+    session.refresh(user)
+    return user
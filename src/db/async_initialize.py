@@ -0,0 +1,34 @@
+from typing import AsyncIterator
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+from sqlmodel.ext.asyncio.session import AsyncSession
+from src.db.initialize import apply_sqlite_pragmas
+from src.db.settings import DatabaseSettings, settings
+
+# Async engine for `async def` routes, so database I/O does not block the event loop.
+# Shares the same storage as the sync engine in src/db/initialize.py
+
+def create_async_database_engine(settings: DatabaseSettings) -> AsyncEngine:
+    """Creates the async engine of the configured storage (aiosqlite for SQLite) with the pool size and SQL echo
+    from the settings, plus the PRAGMAs for SQLite
+
+    Returns
+    -------
+    AsyncEngine
+    """
+    async_engine = create_async_engine(
+        settings.database_url(async_driver=True),
+        echo=settings.echo,
+        pool_size=settings.pool_size,
+        max_overflow=settings.max_overflow,
+        pool_pre_ping=not settings.is_sqlite
+    )
+    if settings.is_sqlite:
+        apply_sqlite_pragmas(async_engine.sync_engine, settings)
+    return async_engine
+
+async_engine = create_async_database_engine(settings)
+
+async def get_async_session() -> AsyncIterator[AsyncSession]:
+    """FastAPI dependency that opens one AsyncSession per request and closes it once the request is done"""
+    async with AsyncSession(async_engine) as session:
+        yield session
@@ -1,9 +1,64 @@
-from sqlmodel import SQLModel, create_engine
+from typing import Iterator
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlmodel import Session, SQLModel, create_engine
+from src.db.migrations import migrate_db
+from src.db.settings import DatabaseSettings, settings
 
-sqlite_file_name = "database.db"
-sqlite_url = f"sqlite:///{sqlite_file_name}"
+# The storage is selected by DATABASE_STORAGE (file, memory or url), see src/db/settings.py.
+# Importing this module creates the engines but never touches the schema: the application creates it at startup
+# (see `lifespan` in main.py), and scripts call `create_db_and_tables()` themselves.
 
-engine = create_engine(sqlite_url, echo=True)
+sqlite_file_name = settings.sqlite_file_name
+sqlite_url = settings.database_url()
 
-def create_db_and_tables():
-    SQLModel.metadata.create_all(engine)
\ No newline at end of file
+def apply_sqlite_pragmas(engine: Engine, settings: DatabaseSettings):
+    """Runs the PRAGMA statements from the settings on every new connection of the engine"""
+    @event.listens_for(engine, "connect")
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for pragma, value in settings.sqlite_pragmas().items():
+            cursor.execute(f"PRAGMA {pragma}={value}")
+        cursor.close()
+
+def create_database_engine(settings: DatabaseSettings) -> Engine:
+    """Creates the engine of the configured storage with the pool size and SQL echo from the settings,
+    plus the PRAGMAs for SQLite
+
+    Returns
+    -------
+    Engine
+    """
+    if not settings.is_sqlite:
+        return create_engine(
+            settings.database_url(),
+            echo=settings.echo,
+            pool_size=settings.pool_size,
+            max_overflow=settings.max_overflow,
+            pool_pre_ping=True
+        )
+
+    engine = create_engine(
+        settings.database_url(),
+        echo=settings.echo,
+        pool_size=settings.pool_size,
+        max_overflow=settings.max_overflow,
+        connect_args={"check_same_thread": False}
+    )
+    apply_sqlite_pragmas(engine, settings)
+    return engine
+
+engine = create_database_engine(settings)
+
+def create_db_and_tables(engine: Engine = engine):
+    """Creates missing tables and indexes. Run once at startup, before the first request"""
+    # Registers every model on SQLModel.metadata, whatever the caller imported
+    from src.sqlmodel.models import loan, loan_schedule, loan_share, user
+
+    SQLModel.metadata.create_all(engine)
+    migrate_db(engine)
+
+def get_session() -> Iterator[Session]:
+    """FastAPI dependency that opens one Session per request and closes it once the request is done"""
+    with Session(engine) as session:
+        yield session
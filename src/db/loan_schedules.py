@@ -0,0 +1,139 @@
+import argparse
+from itertools import groupby
+from typing import Dict, List
+from sqlmodel import Session, select, col
+from src.db.initialize import create_db_and_tables, engine
+from src.sqlmodel.models.loan import Loan
+from src.sqlmodel.models.loan_schedule import MaterializedLoanSchedule
+from src.sqlmodel.models.user import User # registers the user table referenced by Loan.user_id
+from src.utils.loan_schedule_cache import loan_schedule_cache
+
+# Materialized loan schedules
+# A loan's schedule can be computed once and stored in the loan_schedule table, keyed by (loan_id, month),
+# so reads become a single indexed lookup instead of a recomputation.
+#
+# Backfill loans created before materialization, or check stored rows against the calculator:
+#     python -m src.db.loan_schedules backfill
+#     python -m src.db.loan_schedules check
+
+BACKFILL_BATCH_SIZE = 500
+
+def materialize_loan_schedule(session: Session, loan: Loan):
+    """Adds the schedule rows of a loan to the session. The caller commits.
+    The loan must already have a loan_id (ex. after session.flush()). A row with the same fields as Loan works too
+    """
+    loan_schedule = loan_schedule_cache.get_loan_schedule(
+        loan.loan_amount,
+        loan.loan_term_months,
+        loan.annual_interest_rate
+    )
+
+    session.add_all(
+        MaterializedLoanSchedule(loan_id=loan.loan_id, **row)
+        for row in loan_schedule.to_loan_schedule()
+    )
+
+def backfill_loan_schedules(session: Session, batch_size: int = BACKFILL_BATCH_SIZE) -> int:
+    """Materializes the schedule of every loan that has no stored schedule rows, committing every `batch_size` loans.
+    Loans are paged by loan_id (keyset) and read as plain tuples, so a commit never triggers a reload of each loan
+
+    Returns
+    -------
+    int
+        the number of loans backfilled
+    """
+    backfilled = 0
+    after_loan_id = None
+    while True:
+        statement = (
+            select(Loan.loan_id, Loan.loan_amount, Loan.loan_term_months, Loan.annual_interest_rate)
+            .outerjoin(MaterializedLoanSchedule, col(MaterializedLoanSchedule.loan_id) == col(Loan.loan_id))
+            .where(col(MaterializedLoanSchedule.loan_id).is_(None))
+            .order_by(col(Loan.loan_id))
+            .limit(batch_size)
+        )
+        if after_loan_id is not None:
+            statement = statement.where(col(Loan.loan_id) > after_loan_id)
+
+        loans = session.exec(statement).all()
+        if not loans:
+            return backfilled
+
+        for loan in loans:
+            materialize_loan_schedule(session, loan)
+        session.commit()
+
+        backfilled += len(loans)
+        after_loan_id = loans[-1].loan_id
+
+def find_drifted_loan_schedules(session: Session) -> Dict[int, List[int]]:
+    """Compares the stored schedule rows of every loan against LoanAmortizationCalculator.
+    The stored rows are streamed in one query ordered by (loan_id, month) and compared a loan at a time
+
+    Returns
+    -------
+    Dict[int, List[int]]
+        { loan_id: [months whose stored row is missing, extra or differs from the calculated schedule] }
+    """
+    drifted_loan_schedules = {}
+    statement = (
+        select(
+            Loan.loan_id,
+            Loan.loan_amount,
+            Loan.loan_term_months,
+            Loan.annual_interest_rate,
+            MaterializedLoanSchedule.month,
+            MaterializedLoanSchedule.remaining_balance,
+            MaterializedLoanSchedule.monthly_payment
+        )
+        .join(MaterializedLoanSchedule, col(MaterializedLoanSchedule.loan_id) == col(Loan.loan_id))
+        .order_by(col(Loan.loan_id), col(MaterializedLoanSchedule.month))
+        .execution_options(yield_per=BACKFILL_BATCH_SIZE)
+    )
+
+    for loan_id, stored_rows in groupby(session.exec(statement), key=lambda row: row.loan_id):
+        stored_rows = list(stored_rows)
+        stored_loan_schedule = {
+            row.month: (row.remaining_balance, row.monthly_payment)
+            for row in stored_rows
+        }
+        loan = stored_rows[0]
+        loan_schedule = {
+            row['month']: (row['remaining_balance'], row['monthly_payment'])
+            for row in loan_schedule_cache.get_loan_schedule(
+                loan.loan_amount,
+                loan.loan_term_months,
+                loan.annual_interest_rate
+            ).to_loan_schedule()
+        }
+
+        drifted_months = sorted(
+            month
+            for month in stored_loan_schedule.keys() | loan_schedule.keys()
+            if stored_loan_schedule.get(month) != loan_schedule.get(month)
+        )
+        if drifted_months:
+            drifted_loan_schedules[loan_id] = drifted_months
+
+    return drifted_loan_schedules
+
+def main():
+    parser = argparse.ArgumentParser(description="Manage materialized loan schedules")
+    parser.add_argument("command", choices=["backfill", "check"])
+    args = parser.parse_args()
+
+    create_db_and_tables()
+    with Session(engine, expire_on_commit=False) as session:
+        if args.command == "backfill":
+            print(f"Backfilled {backfill_loan_schedules(session)} loan schedules")
+            return
+
+        drifted_loan_schedules = find_drifted_loan_schedules(session)
+        for loan_id, months in drifted_loan_schedules.items():
+            print(f"Loan {loan_id}: {len(months)} months drift from the calculated schedule (first: {months[0]})")
+        if drifted_loan_schedules:
+            raise SystemExit(1)
+        print("All materialized loan schedules match the calculator")
+
+if __name__ == "__main__":
+    main()
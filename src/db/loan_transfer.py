@@ -0,0 +1,428 @@
+import argparse
+import csv
+import json
+import logging
+import sys
+from decimal import Decimal, InvalidOperation
+from enum import Enum
+from typing import AsyncIterator, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+from sqlmodel import Session, insert, select, col
+from src.db.initialize import create_db_and_tables, engine
+from src.sqlmodel.models.loan import Loan
+from src.sqlmodel.models.loan_import import LoanImportError, LoanImportResult
+from src.sqlmodel.models.user import User
+from src.utils.batch_loan_amortization_calculation import BatchLoanAmortizationCalculator
+from src.utils.loan_amortization_calculation import LoanAmortizationCalculator
+
+# Bulk import and export of loans and their schedules
+# Everything streams in batches: loans are read by loan_id (keyset) EXPORT_BATCH_SIZE at a time, schedules are calculated
+# SCHEDULE_EXPORT_BATCH_SIZE loans at a time with the vectorized calculator, and imports are written IMPORT_BATCH_SIZE rows
+# per transaction. Memory stays bounded by the batch sizes, not by the number of loans.
+#
+#     python -m src.db.loan_transfer export-loans loans.csv
+#     python -m src.db.loan_transfer export-schedules schedules.ndjson
+#     python -m src.db.loan_transfer import-loans loans.parquet
+#
+# The format follows the file extension (.csv, .ndjson or .parquet). Parquet needs pyarrow (`pip install pyarrow`).
+
+logger = logging.getLogger(__name__)
+
+EXPORT_BATCH_SIZE = 5000
+SCHEDULE_EXPORT_BATCH_SIZE = 500
+IMPORT_BATCH_SIZE = 5000
+MAX_IMPORT_ERRORS = 1000
+
+LOAN_FIELDS = ('loan_id', 'user_id', 'loan_amount', 'annual_interest_rate', 'loan_term_months')
+LOAN_SCHEDULE_FIELDS = ('loan_id', 'month', 'remaining_balance', 'monthly_payment')
+
+class LoanTransferFormat(str, Enum):
+    csv = "csv"
+    ndjson = "ndjson"
+    parquet = "parquet"
+
+def iterate_loan_batches(
+    session: Session,
+    user_id: Optional[int] = None,
+    batch_size: int = EXPORT_BATCH_SIZE
+) -> Iterator[List[Loan]]:
+    """Yields every loan (of a user, if given) ordered by loan_id, `batch_size` loans per query"""
+    after_loan_id = None
+    while True:
+        statement = select(Loan).order_by(col(Loan.loan_id)).limit(batch_size)
+        if user_id is not None:
+            statement = statement.where(col(Loan.user_id) == user_id)
+        if after_loan_id is not None:
+            statement = statement.where(col(Loan.loan_id) > after_loan_id)
+
+        loans = session.exec(statement).all()
+        if not loans:
+            return
+        yield loans
+        after_loan_id = loans[-1].loan_id
+        # Loans of a finished batch are not needed anymore
+        session.expunge_all()
+
+def iterate_loan_row_batches(
+    session: Session,
+    user_id: Optional[int] = None,
+    batch_size: int = EXPORT_BATCH_SIZE
+) -> Iterator[List[Dict]]:
+    """Yields the loans as LOAN_FIELDS rows, a batch at a time"""
+    for loans in iterate_loan_batches(session, user_id, batch_size):
+        yield [{field: getattr(loan, field) for field in LOAN_FIELDS} for loan in loans]
+
+def format_cents(cents: int) -> str:
+    """Formats integer cents as a dollar amount with 2 decimal places (ex. 2882047 -> 28820.47)"""
+    sign = "-" if cents < 0 else ""
+    dollars, cents = divmod(abs(cents), 100)
+    return f"{sign}{dollars}.{cents:02d}"
+
+def get_loan_schedule_error(loan: Loan) -> Optional[str]:
+    """Checks that the schedule of a loan can be calculated, ex. a 0% rate divides by zero in the payment formula
+
+    Returns
+    -------
+    Optional[str]
+        why the schedule cannot be calculated, None if it can
+    """
+    try:
+        if loan.loan_term_months < 1:
+            raise ValueError(f"Loan term of {loan.loan_term_months} months")
+        if loan.annual_interest_rate <= 0:
+            raise ValueError(f"Annual interest rate of {loan.annual_interest_rate}%")
+        LoanAmortizationCalculator.to_cents(loan.loan_amount)
+        LoanAmortizationCalculator.to_scaled_rate(loan.annual_interest_rate)
+        LoanAmortizationCalculator.calculate_total_monthly_payment(loan.loan_amount, loan.loan_term_months, loan.annual_interest_rate / 100)
+    except (ArithmeticError, TypeError, ValueError) as error:
+        return str(error) or type(error).__name__
+    return None
+
+def iterate_loan_schedule_row_batches(
+    session: Session,
+    user_id: Optional[int] = None,
+    batch_size: int = SCHEDULE_EXPORT_BATCH_SIZE,
+    skipped_loans: Optional[List[Tuple[int, str]]] = None
+) -> Iterator[List[Dict]]:
+    """Yields the schedule of every loan as LOAN_SCHEDULE_FIELDS rows, one batch of loans at a time.
+    Each batch is calculated in integer cents by BatchLoanAmortizationCalculator, which matches the API's schedules to the cent.
+
+    A loan whose schedule cannot be calculated (see `get_loan_schedule_error`) is left out instead of failing the export.
+    It is logged, and added to `skipped_loans` as (loan_id, reason) when a list is given.
+    """
+    for loans in iterate_loan_batches(session, user_id, batch_size):
+        calculable_loans = []
+        for loan in loans:
+            error = get_loan_schedule_error(loan)
+            if error is None:
+                calculable_loans.append(loan)
+                continue
+            logger.warning("Skipped the schedule of loan %s in the export: %s", loan.loan_id, error)
+            if skipped_loans is not None:
+                skipped_loans.append((loan.loan_id, error))
+
+        if not calculable_loans:
+            continue
+
+        loan_schedules = BatchLoanAmortizationCalculator.calculate_loan_schedules(
+            [loan.loan_amount for loan in calculable_loans],
+            [loan.loan_term_months for loan in calculable_loans],
+            [loan.annual_interest_rate for loan in calculable_loans]
+        )
+        remaining_balances = loan_schedules.remaining_balance.tolist()
+        monthly_payments = loan_schedules.monthly_payment.tolist()
+
+        yield [
+            {
+                'loan_id': loan.loan_id,
+                'month': month,
+                'remaining_balance': format_cents(remaining_balances[index][month - 1]),
+                'monthly_payment': format_cents(monthly_payments[index]),
+            }
+            for index, loan in enumerate(calculable_loans)
+            for month in range(1, loan.loan_term_months + 1)
+        ]
+
+def encode_row_batches(
+    row_batches: Iterable[List[Dict]],
+    fields: Sequence[str],
+    format: LoanTransferFormat
+) -> Iterator[str]:
+    """Encodes batches of rows as CSV (with a header line) or NDJSON, one chunk of text per batch"""
+    if format == LoanTransferFormat.parquet:
+        raise ValueError("Parquet cannot be streamed as text, use write_parquet")
+
+    if format == LoanTransferFormat.csv:
+        yield ",".join(fields) + "\n"
+
+    for rows in row_batches:
+        if format == LoanTransferFormat.csv:
+            yield "".join(",".join(str(row[field]) for field in fields) + "\n" for row in rows)
+        else:
+            yield "".join(
+                json.dumps({field: str(row[field]) if isinstance(row[field], Decimal) else row[field] for field in fields}) + "\n"
+                for row in rows
+            )
+
+def write_parquet(row_batches: Iterable[List[Dict]], fields: Sequence[str], path: str) -> int:
+    """Writes batches of rows to a Parquet file, one row group per batch. Amounts are stored as strings, to stay exact
+
+    Returns
+    -------
+    int
+        the number of rows written
+    """
+    import pyarrow
+    import pyarrow.parquet
+
+    written = 0
+    writer = None
+    try:
+        for rows in row_batches:
+            table = pyarrow.Table.from_pydict({
+                field: [str(row[field]) if isinstance(row[field], Decimal) else row[field] for row in rows]
+                for field in fields
+            })
+            if writer is None:
+                writer = pyarrow.parquet.ParquetWriter(path, table.schema)
+            writer.write_table(table)
+            written += len(rows)
+    finally:
+        if writer is not None:
+            writer.close()
+    return written
+
+def parse_rows(
+    lines: Iterable[str],
+    format: LoanTransferFormat,
+    fieldnames: Optional[Sequence[str]] = None,
+    start: int = 1
+) -> Iterator[Tuple[int, Optional[Dict]]]:
+    """Parses CSV or NDJSON lines into rows. Blank lines are skipped.
+    CSV reads its header from the first line, unless `fieldnames` is given (ex. for the later batches of a stream)
+
+    Yields
+    ------
+    Tuple[int, Optional[Dict]]
+        (line, row), lines are numbered from `start` without the CSV header. The row is None if an NDJSON line is not valid JSON
+    """
+    lines = (line for line in lines if line.strip())
+    if format == LoanTransferFormat.csv:
+        yield from enumerate(csv.DictReader(lines, fieldnames=fieldnames), start=start)
+        return
+
+    for line_number, line in enumerate(lines, start=start):
+        try:
+            yield line_number, json.loads(line, parse_float=Decimal)
+        except json.JSONDecodeError:
+            yield line_number, None
+
+async def iterate_line_batches(chunks: AsyncIterator[bytes], batch_size: int = IMPORT_BATCH_SIZE) -> AsyncIterator[List[str]]:
+    """Splits a stream of bytes (ex. a request body) into batches of non-blank lines, without reading the whole stream"""
+    buffer = b""
+    lines = []
+    async for chunk in chunks:
+        buffer += chunk
+        *complete_lines, buffer = buffer.split(b"\n")
+        lines.extend(line.decode() for line in complete_lines if line.strip())
+        while len(lines) >= batch_size:
+            yield lines[:batch_size]
+            lines = lines[batch_size:]
+
+    if buffer.strip():
+        lines.append(buffer.decode())
+    if lines:
+        yield lines
+
+def read_parquet(path: str, batch_size: int = IMPORT_BATCH_SIZE) -> Iterator[Tuple[int, Dict]]:
+    """Reads the rows of a Parquet file, a record batch at a time
+
+    Yields
+    ------
+    Tuple[int, Dict]
+        (row number from 1, row)
+    """
+    import pyarrow.parquet
+
+    line_number = 0
+    for record_batch in pyarrow.parquet.ParquetFile(path).iter_batches(batch_size=batch_size):
+        for row in record_batch.to_pylist():
+            line_number += 1
+            yield line_number, row
+
+def parse_loan_row(row: Optional[Dict]) -> Dict:
+    """Converts an imported row to the columns of a Loan
+
+    Raises
+    ------
+    ValueError
+        if a field is missing or invalid
+
+    Returns
+    -------
+    Dict
+    """
+    if not isinstance(row, dict):
+        raise ValueError("Not a JSON object")
+
+    try:
+        loan = {
+            'user_id': int(row['user_id']),
+            'loan_amount': Decimal(str(row['loan_amount'])),
+            'annual_interest_rate': Decimal(str(row['annual_interest_rate'])),
+            'loan_term_months': int(row['loan_term_months']),
+        }
+        if row.get('loan_id') not in (None, ""):
+            loan['loan_id'] = int(row['loan_id'])
+    except KeyError as error:
+        raise ValueError(f"Missing field {error}")
+    except (TypeError, ValueError, InvalidOperation):
+        raise ValueError("Invalid number")
+
+    # Loans must be representable by the exact (cents) calculators, or their schedules could not be exported
+    LoanAmortizationCalculator.to_cents(loan['loan_amount'])
+    LoanAmortizationCalculator.to_scaled_rate(loan['annual_interest_rate'])
+    if loan['loan_amount'] <= 0 or loan['annual_interest_rate'] <= 0 or loan['loan_term_months'] < 1:
+        raise ValueError("loan_amount, annual_interest_rate and loan_term_months must be positive")
+    return loan
+
+def import_loan_batch(session: Session, rows: List[Tuple[int, Dict]]) -> Tuple[int, List[LoanImportError]]:
+    """Validates and inserts a batch of imported rows in one transaction.
+    Users and loan ids are checked with one IN query each, as in POST /loans/create/bulk/
+
+    Returns
+    -------
+    Tuple[int, List[LoanImportError]]
+        (loans imported, errors)
+    """
+    errors = []
+    loans = []
+    for line_number, row in rows:
+        try:
+            loans.append((line_number, parse_loan_row(row)))
+        except ValueError as error:
+            errors.append(LoanImportError(line=line_number, detail=f"Invalid loan. {error}"))
+
+    user_ids = {loan['user_id'] for _, loan in loans}
+    existing_user_ids = set(session.exec(select(User.user_id).where(col(User.user_id).in_(user_ids))).all())
+
+    requested_loan_ids = {loan['loan_id'] for _, loan in loans if 'loan_id' in loan}
+    existing_loan_ids = set(session.exec(select(Loan.loan_id).where(col(Loan.loan_id).in_(requested_loan_ids))).all())
+
+    # Rows with and without a loan_id are inserted separately, so every row of a statement has the same columns
+    loans_with_ids = []
+    loans_without_ids = []
+    for line_number, loan in loans:
+        if loan['user_id'] not in existing_user_ids:
+            errors.append(LoanImportError(line=line_number, detail="Cannot create Loan for non-existent user"))
+        elif 'loan_id' in loan and loan['loan_id'] in existing_loan_ids:
+            errors.append(LoanImportError(line=line_number, detail=f"Loan {loan['loan_id']} already exists"))
+        elif 'loan_id' in loan:
+            existing_loan_ids.add(loan['loan_id'])
+            loans_with_ids.append(loan)
+        else:
+            loans_without_ids.append(loan)
+
+    for batch in (loans_with_ids, loans_without_ids):
+        if batch:
+            session.execute(insert(Loan), batch)
+    session.commit()
+
+    errors.sort(key=lambda error: error.line)
+    return len(loans_with_ids) + len(loans_without_ids), errors
+
+def import_loans(
+    session: Session,
+    rows: Iterable[Tuple[int, Dict]],
+    batch_size: int = IMPORT_BATCH_SIZE
+) -> LoanImportResult:
+    """Imports rows (see `parse_rows` and `read_parquet`) `batch_size` at a time, committing every batch.
+    Invalid rows are reported and do not stop the import
+
+    Returns
+    -------
+    LoanImportResult
+    """
+    result = LoanImportResult(imported=0, error_count=0, errors=[])
+    batch = []
+
+    def flush():
+        imported, errors = import_loan_batch(session, batch)
+        record_batch_result(result, imported, errors)
+        batch.clear()
+
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= batch_size:
+            flush()
+    if batch:
+        flush()
+
+    return result
+
+def record_batch_result(result: LoanImportResult, imported: int, errors: List[LoanImportError]):
+    """Adds the outcome of one batch to the import result, keeping at most MAX_IMPORT_ERRORS errors"""
+    result.imported += imported
+    result.error_count += len(errors)
+    result.errors.extend(errors[:MAX_IMPORT_ERRORS - len(result.errors)])
+
+def get_format(path: str) -> LoanTransferFormat:
+    """Picks the format from a file extension
+
+    Raises
+    ------
+    ValueError
+        if the extension is not .csv, .ndjson or .parquet
+    """
+    extension = path.rsplit(".", 1)[-1].lower()
+    try:
+        return LoanTransferFormat(extension)
+    except ValueError:
+        raise ValueError(f"Unknown format .{extension}, use .csv, .ndjson or .parquet")
+
+def main():
+    parser = argparse.ArgumentParser(description="Import and export loans and loan schedules")
+    parser.add_argument("command", choices=["export-loans", "export-schedules", "import-loans"])
+    parser.add_argument("path", help="file to read or write, the format follows the extension (.csv, .ndjson, .parquet)")
+    parser.add_argument("--user-id", type=int, help="only export the loans of this user")
+    args = parser.parse_args()
+
+    format = get_format(args.path)
+    skipped_loans = []
+    create_db_and_tables()
+
+    with Session(engine) as session:
+        if args.command == "import-loans":
+            if format == LoanTransferFormat.parquet:
+                rows = read_parquet(args.path)
+                result = import_loans(session, rows)
+            else:
+                with open(args.path, newline="") as file:
+                    result = import_loans(session, parse_rows(file, format))
+            print(f"Imported {result.imported} loans, {result.error_count} rows rejected")
+            for error in result.errors:
+                print(f"Line {error.line}: {error.detail}", file=sys.stderr)
+            if result.error_count:
+                raise SystemExit(1)
+            return
+
+        if args.command == "export-loans":
+            row_batches, fields = iterate_loan_row_batches(session, args.user_id), LOAN_FIELDS
+        else:
+            row_batches, fields = iterate_loan_schedule_row_batches(session, args.user_id, skipped_loans=skipped_loans), LOAN_SCHEDULE_FIELDS
+
+        if format == LoanTransferFormat.parquet:
+            written = write_parquet(row_batches, fields, args.path)
+        else:
+            written = 0
+            with open(args.path, "w", newline="") as file:
+                for chunk in encode_row_batches(row_batches, fields, format):
+                    file.write(chunk)
+                    written += chunk.count("\n")
+            if format == LoanTransferFormat.csv:
+                written -= 1
+        print(f"Exported {written} rows to {args.path}")
+        for loan_id, error in skipped_loans:
+            print(f"Skipped loan {loan_id}: {error}", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
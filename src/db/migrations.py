@@ -0,0 +1,67 @@
+from typing import List
+from sqlalchemy import UniqueConstraint, inspect
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import SQLModel
+
+# Schema migrations for existing database files
+# SQLModel.metadata.create_all only creates missing tables, so indexes and unique constraints added to a model later
+# never reach a database.db created before them. `migrate_db` adds them to existing tables.
+# SQLite cannot add a constraint to an existing table, so unique constraints are added as unique indexes, which enforce the same rule.
+#
+#     python -m src.db.migrations
+
+def migrate_db(engine: Engine) -> List[str]:
+    """Creates the indexes and unique constraints declared on the models that are missing from existing tables
+
+    Raises
+    ------
+    RuntimeError
+        if existing rows violate a new unique constraint. The duplicates have to be resolved by hand
+
+    Returns
+    -------
+    List[str]
+        the names of the indexes created
+    """
+    created = []
+    inspector = inspect(engine)
+
+    with engine.begin() as connection:
+        for table in SQLModel.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+
+            existing = {index['name'] for index in inspector.get_indexes(table.name)}
+            existing |= {constraint['name'] for constraint in inspector.get_unique_constraints(table.name)}
+
+            for index in table.indexes:
+                if index.name in existing:
+                    continue
+                try:
+                    index.create(connection)
+                except IntegrityError as error:
+                    raise RuntimeError(f"Cannot create unique index {index.name}: {table.name} has duplicate rows") from error
+                created.append(index.name)
+
+            for constraint in table.constraints:
+                if not isinstance(constraint, UniqueConstraint) or constraint.name in existing:
+                    continue
+                columns = ", ".join(column.name for column in constraint.columns)
+                try:
+                    connection.exec_driver_sql(f"CREATE UNIQUE INDEX {constraint.name} ON {table.name} ({columns})")
+                except IntegrityError as error:
+                    raise RuntimeError(f"Cannot create unique index {constraint.name}: {table.name} has duplicate rows") from error
+                created.append(constraint.name)
+
+    return created
+
+def main():
+    from src.db.initialize import engine
+    from src.sqlmodel.models import loan, loan_schedule, loan_share, user # registers every model on SQLModel.metadata
+
+    created = migrate_db(engine)
+    print(f"Created indexes: {', '.join(created)}" if created else "Database is up to date")
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,54 @@
-from typing import List
-from fastapi import APIRouter, HTTPException, status
-from sqlmodel import Session, select, col
-from src.db.initialize import engine
+import csv
+import hashlib
+import json
+from enum import Enum
+from itertools import islice
+from decimal import Decimal
+from typing import Iterator, List, Optional
+import numpy as np
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response, status
+from fastapi.responses import JSONResponse, StreamingResponse
+from sqlalchemy import literal, true, union_all
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import Session, insert, select, col
+from sqlmodel.ext.asyncio.session import AsyncSession
+from src.db.async_initialize import get_async_session
+from src.db.loan_schedules import materialize_loan_schedule
+from src.db.loan_transfer import (
+    IMPORT_BATCH_SIZE,
+    LOAN_FIELDS,
+    LOAN_SCHEDULE_FIELDS,
+    LoanTransferFormat,
+    encode_row_batches,
+    get_loan_schedule_error,
+    import_loan_batch,
+    iterate_line_batches,
+    iterate_loan_row_batches,
+    iterate_loan_schedule_row_batches,
+    parse_rows,
+    record_batch_result
+)
+from src.db.initialize import engine, get_session
+from src.sqlmodel.models.accessible_loan import AccessibleLoan, LoanAccessType
 from src.sqlmodel.models.loan import Loan
-from src.sqlmodel.models.loan_schedule import LoanSchedule
+from src.sqlmodel.models.loan_bulk_create import LoanBulkCreateError, LoanBulkCreateResult
+from src.sqlmodel.models.loan_import import LoanImportResult
+from src.sqlmodel.models.loan_schedule import LoanSchedule, MaterializedLoanSchedule
+from src.sqlmodel.models.loan_schedule_batch import LoanScheduleBatchError, LoanScheduleBatchResult
 from src.sqlmodel.models.loan_share import LoanShare
+from src.sqlmodel.models.loan_summary import MonthlyLoanSummary
+from src.sqlmodel.models.payoff_threshold import PayoffThresholdBatchResult, PayoffThresholdError, PayoffThresholdRequest, PayoffThresholdResult
+from src.sqlmodel.models.portfolio_summary import PortfolioLoanError, PortfolioLoanSummary, PortfolioSummary
+from src.sqlmodel.models.prepayment import PrepaymentScenariosRequest, PrepaymentScenariosResult
+from src.sqlmodel.models.rate_reset import AdjustableRateScheduleRequest
 from src.sqlmodel.models.user import User
+from src.utils.adjustable_rate_calculation import AdjustableRateLoanCalculator
+from src.utils.batch_loan_amortization_calculation import BatchLoanAmortizationCalculator
+from src.utils.fast_json import MoneyEncoding, ResponseLayout, encode_columns, fast_json_response, rows_to_columns
 from src.utils.loan_amortization_calculation import LoanAmortizationCalculator
+from src.utils.loan_schedule_cache import loan_schedule_cache
+from src.utils.payoff_threshold_calculation import CentsLoanSchedule, PayoffThresholdCalculator
+from src.utils.prepayment_calculation import PrepaymentCalculator
 
 # Under normal circumstances, these routes would be protected by some kind of AuthGuard
 # Since Authentication/Authorization was out of scope for this challenge and due to time constraints
@@ -18,118 +60,765 @@ loan_router = APIRouter(
 
 # Create a loan
 @loan_router.post("/create/", response_model=Loan)
-def create_loan(loan: Loan):
-    with Session(engine) as session:
-        statement = select(User).where(col(User.user_id) == loan.user_id)
-        results = session.exec(statement).all()
+def create_loan(
+    loan: Loan,
+    materialize_schedule: bool = False,
+    session: Session = Depends(get_session)
+):
+    statement = select(User).where(col(User.user_id) == loan.user_id)
+    results = session.exec(statement).all()
+
+    if not results:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Cannot create Loan for non-existent user") 
+
+    session.add(loan)
+
+    # Stores the schedule in the loan_schedule table, in the same transaction as the loan
+    if materialize_schedule:
+        session.flush()
+        materialize_loan_schedule(session, loan)
+
+    session.commit()
+    session.refresh(loan)
+    return loan
+
+# Columns the loans table requires (NOT NULL) besides the generated loan_id
+LOAN_REQUIRED_FIELDS = [column.name for column in Loan.__table__.columns if not column.nullable and not column.primary_key]
 
-        if not results:
-            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Cannot create Loan for non-existent user") 
+# Create many loans at once
+# Users and loan ids are validated with one set-based query each and every valid loan is inserted in a single transaction.
+# Invalid rows are reported by their index in the request and do not abort the rest of the batch.
+# If the insert still fails (ex. a loan_id created by a concurrent request), the rows are inserted one by one
+# so only the offending rows are reported.
+@loan_router.post("/create/bulk/", response_model=LoanBulkCreateResult)
+def create_loans(loans: List[Loan], session: Session = Depends(get_session)):
+    user_ids = {loan.user_id for loan in loans}
+    existing_user_ids = set(session.exec(select(User.user_id).where(col(User.user_id).in_(user_ids))).all())
 
-        session.add(loan)
-        session.commit()
-        session.refresh(loan)
-        return loan
+    requested_loan_ids = {loan.loan_id for loan in loans if loan.loan_id is not None}
+    existing_loan_ids = set(session.exec(select(Loan.loan_id).where(col(Loan.loan_id).in_(requested_loan_ids))).all())
+
+    rows = []
+    row_indexes = []
+    errors = []
+    for index, loan in enumerate(loans):
+        missing_fields = [field for field in LOAN_REQUIRED_FIELDS if getattr(loan, field) is None]
+        if missing_fields:
+            errors.append(LoanBulkCreateError(index=index, detail=f"Missing required fields: {', '.join(missing_fields)}"))
+        elif loan.user_id not in existing_user_ids:
+            errors.append(LoanBulkCreateError(index=index, detail="Cannot create Loan for non-existent user"))
+        elif loan.loan_id in existing_loan_ids:
+            errors.append(LoanBulkCreateError(index=index, detail=f"Loan {loan.loan_id} already exists"))
+        else:
+            if loan.loan_id is not None:
+                existing_loan_ids.add(loan.loan_id)
+            rows.append({
+                field: getattr(loan, field)
+                for field in Loan.model_fields
+                if getattr(loan, field) is not None
+            })
+            row_indexes.append(index)
+
+    loan_ids = [None] * len(loans)
+    if rows:
+        statement = insert(Loan).returning(col(Loan.loan_id), sort_by_parameter_order=True)
+        try:
+            for index, loan_id in zip(row_indexes, session.scalars(statement, rows)):
+                loan_ids[index] = loan_id
+            session.commit()
+        except IntegrityError:
+            session.rollback()
+            loan_ids = [None] * len(loans)
+            for index, row in zip(row_indexes, rows):
+                try:
+                    with session.begin_nested():
+                        loan_ids[index] = session.scalars(insert(Loan).values(**row).returning(col(Loan.loan_id))).one()
+                except IntegrityError:
+                    detail = f"Loan {row['loan_id']} already exists" if 'loan_id' in row else "Cannot create Loan"
+                    errors.append(LoanBulkCreateError(index=index, detail=detail))
+            session.commit()
+            errors.sort(key=lambda error: error.index)
+
+    return LoanBulkCreateResult(loan_ids=loan_ids, errors=errors)
+
+# Page size of /loans/all/ when no limit is given, and the largest limit accepted
+LOANS_PAGE_SIZE = 100
+MAX_LOANS_PAGE_SIZE = 1000
 
 # Fetch all loans for a user
+# Loans are paginated by loan_id (keyset): pass the X-Next-Cursor header of a response as `after_loan_id` to fetch the next page.
+# `fields` limits each loan to the given fields. The user's existence is checked in the same query through an outer join.
 @loan_router.get("/all/", response_model=List[Loan])
 async def fetch_all_user_loans(
-    user_id: int
+    user_id: int,
+    response: Response,
+    after_loan_id: Optional[int] = None,
+    limit: int = Query(default=LOANS_PAGE_SIZE, ge=1, le=MAX_LOANS_PAGE_SIZE),
+    fields: Optional[List[str]] = Query(default=None),
+    session: AsyncSession = Depends(get_async_session)
 ):
-    with Session(engine) as session:
-        user_statement = select(User).where(col(User.user_id) == user_id)
-        user_results = session.exec(user_statement).all()
+    if fields is not None and not set(fields) <= Loan.model_fields.keys():
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Cannot fetch all loans. Unknown fields: {', '.join(sorted(set(fields) - Loan.model_fields.keys()))}")
+
+    loan_join = col(Loan.user_id) == col(User.user_id)
+    if after_loan_id is not None:
+        loan_join &= col(Loan.loan_id) > after_loan_id
+
+    columns = [col(Loan.loan_id)] + [getattr(Loan, field) for field in fields or Loan.model_fields if field != 'loan_id']
+    statement = (
+        select(col(User.user_id).label('existing_user_id'), *columns)
+        .outerjoin(Loan, loan_join)
+        .where(col(User.user_id) == user_id)
+        .order_by(col(Loan.loan_id))
+        .limit(limit + 1)
+    )
+    results = (await session.exec(statement)).all()
 
-        if not user_results:
-            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Cannot fetch all loans. User does not exist.")
+    if not results:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Cannot fetch all loans. User does not exist.")
 
-        statement = select(Loan).where(col(Loan.user_id) == user_id)
-        results = session.exec(statement).all()
-        return results
+    # A user without loans (on this page) comes back as a single row without a loan
+    rows = [row._mapping for row in results if row.loan_id is not None]
+
+    headers = {}
+    if len(rows) > limit:
+        rows = rows[:limit]
+        headers["X-Next-Cursor"] = str(rows[-1]['loan_id'])
+
+    if fields is None:
+        response.headers.update(headers)
+        return [Loan(**{field: row[field] for field in Loan.model_fields}) for row in rows]
+
+    return JSONResponse(
+        content=[
+            {field: str(row[field]) if isinstance(row[field], Decimal) else row[field] for field in fields}
+            for row in rows
+        ],
+        headers=headers
+    )
+
+# Fetch owned and shared loans for a user
+# Owned loans and loans shared with the user through LoanShare come back from one UNION ALL query, each marked by its access type.
+# The user's existence is checked in the same query through an outer join.
+@loan_router.get("/accessible/", response_model=List[AccessibleLoan])
+async def fetch_all_accessible_user_loans(
+    user_id: int,
+    session: AsyncSession = Depends(get_async_session)
+):
+    loan_columns = [getattr(Loan, field) for field in Loan.model_fields]
+    owned_loans = (
+        select(*loan_columns, literal(LoanAccessType.owned.value).label('access_type'))
+        .where(col(Loan.user_id) == user_id)
+    )
+    shared_loans = (
+        select(*loan_columns, literal(LoanAccessType.shared.value).label('access_type'))
+        .join(LoanShare, col(LoanShare.loan_id) == col(Loan.loan_id))
+        .where(col(LoanShare.target_user_id) == user_id)
+    )
+    accessible_loans = union_all(owned_loans, shared_loans).subquery()
+
+    statement = (
+        select(col(User.user_id).label('existing_user_id'), accessible_loans)
+        .outerjoin(accessible_loans, true())
+        .where(col(User.user_id) == user_id)
+        .order_by(accessible_loans.c.loan_id)
+    )
+    results = (await session.exec(statement)).all()
+
+    if not results:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Cannot fetch all loans. User does not exist.")
+
+    return [row._mapping for row in results if row.loan_id is not None]
+
+# Schedules and summaries only depend on the loan's terms, so they can be cached by clients and CDNs
+LOAN_SCHEDULE_CACHE_CONTROL = "public, max-age=3600"
+
+# Money fields of schedule and summary rows, for responses encoded with `fast_json_response`
+LOAN_SCHEDULE_MONEY_FIELDS = ('remaining_balance', 'monthly_payment')
+LOAN_SUMMARY_MONEY_FIELDS = ('current_principal_balance', 'total_principal_paid', 'total_interest_paid')
+
+def loan_schedule_etag(loan: Loan, *parts) -> str:
+    """Builds a strong ETag from the loan's terms and whatever else shapes the response (ex. month, source of the rows)"""
+    terms = ":".join(str(part) for part in (loan.loan_amount, loan.loan_term_months, loan.annual_interest_rate, loan_schedule_cache.engine.value, *parts))
+    return '"' + hashlib.sha256(terms.encode()).hexdigest()[:32] + '"'
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Checks an If-None-Match header against an ETag, using the weak comparison required for If-None-Match"""
+    if if_none_match is None:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return any(tag.strip().removeprefix("W/") == etag for tag in if_none_match.split(","))
 
 # Fetch a loan schedule
+# Responses carry an ETag and a matching If-None-Match gets a 304 before the schedule is read or calculated
+# Passing `layout` (rows or columns) opts into the fast encoding: no per-row validation, money as strings or cents (`money`)
 @loan_router.get("/schedule/", response_model=List[LoanSchedule])
 async def fetch_loan_schedule(
-    loan_id: int
+    loan_id: int,
+    response: Response,
+    layout: Optional[ResponseLayout] = None,
+    money: MoneyEncoding = MoneyEncoding.string,
+    if_none_match: Optional[str] = Header(default=None),
+    session: AsyncSession = Depends(get_async_session)
 ):
+    # Loads the loan together with its materialized schedule rows, if any, in a single query
+    statement = (
+        select(Loan, MaterializedLoanSchedule)
+        .outerjoin(MaterializedLoanSchedule, col(MaterializedLoanSchedule.loan_id) == col(Loan.loan_id))
+        .where(col(Loan.loan_id) == loan_id)
+        .order_by(col(MaterializedLoanSchedule.month))
+    )
+    results = (await session.exec(statement)).all()
+
+    if not results:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Loan schedule does not exist") 
+
+    loan, materialized_loan_schedule = results[0]
+
+    headers = {
+        "ETag": loan_schedule_etag(loan, "materialized" if materialized_loan_schedule is not None else "calculated", layout and layout.value, layout and money.value),
+        "Cache-Control": LOAN_SCHEDULE_CACHE_CONTROL,
+    }
+    if etag_matches(if_none_match, headers["ETag"]):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    response.headers.update(headers)
+
+    if materialized_loan_schedule is not None:
+        if layout is not None:
+            columns = {
+                'month': [row.month for _, row in results],
+                'remaining_balance': [row.remaining_balance for _, row in results],
+                'monthly_payment': [row.monthly_payment for _, row in results],
+            }
+            return fast_json_response(encode_columns(columns, LOAN_SCHEDULE_MONEY_FIELDS, layout, money), headers)
+        return [row for _, row in results]
+
+    loan_schedule = loan_schedule_cache.get_loan_schedule(
+        loan.loan_amount,
+        loan.loan_term_months,
+        loan.annual_interest_rate
+    )
+
+    # The cached schedule is already stored by column, so no row is built
+    if layout is not None:
+        return fast_json_response(encode_columns(loan_schedule.to_columns(), LOAN_SCHEDULE_MONEY_FIELDS, layout, money), headers)
+
+    return loan_schedule.to_loan_schedule()
+
+# Largest number of loan ids accepted by /loans/schedule/batch/
+MAX_LOAN_SCHEDULE_BATCH_SIZE = 1000
+
+# Fetch the schedules of many loans at once
+# Loans and their materialized rows are loaded with one IN query, and loans with identical terms share one calculated schedule.
+# The distinct terms are calculated together in one vectorized pass (exact cents). The route is synchronous,
+# so the calculation runs in the threadpool instead of blocking the event loop.
+# Unknown loan ids are reported in `errors` and do not fail the rest of the batch.
+# Passing `layout` opts into the fast encoding of every schedule, as for /loans/schedule/.
+@loan_router.get("/schedule/batch/", response_model=LoanScheduleBatchResult)
+def fetch_loan_schedules(
+    loan_ids: List[int] = Query(min_length=1, max_length=MAX_LOAN_SCHEDULE_BATCH_SIZE),
+    layout: Optional[ResponseLayout] = None,
+    money: MoneyEncoding = MoneyEncoding.string,
+    session: Session = Depends(get_session)
+):
+    statement = (
+        select(Loan, MaterializedLoanSchedule)
+        .outerjoin(MaterializedLoanSchedule, col(MaterializedLoanSchedule.loan_id) == col(Loan.loan_id))
+        .where(col(Loan.loan_id).in_(set(loan_ids)))
+        .order_by(col(Loan.loan_id), col(MaterializedLoanSchedule.month))
+    )
+    results = session.exec(statement).all()
+
+    loans = {}
+    materialized_loan_schedules = {}
+    for loan, materialized_loan_schedule in results:
+        loans[loan.loan_id] = loan
+        if materialized_loan_schedule is not None:
+            materialized_loan_schedules.setdefault(loan.loan_id, []).append(materialized_loan_schedule.model_dump(exclude={'loan_id'}))
+
+    terms_by_loan_id = {
+        loan_id: (loan.loan_amount, loan.loan_term_months, loan.annual_interest_rate)
+        for loan_id, loan in loans.items()
+        if loan_id not in materialized_loan_schedules
+    }
+    distinct_terms = list(dict.fromkeys(terms_by_loan_id.values()))
+    loan_schedules_by_terms = {}
+    if distinct_terms:
+        batch_loan_schedule = BatchLoanAmortizationCalculator.calculate_loan_schedules(*zip(*distinct_terms))
+        loan_schedules_by_terms = {
+            terms: batch_loan_schedule.to_loan_schedule(index)
+            for index, terms in enumerate(distinct_terms)
+        }
+
+    schedules = {}
+    for loan_id in loans:
+        if loan_id in materialized_loan_schedules:
+            schedules[loan_id] = materialized_loan_schedules[loan_id]
+        else:
+            schedules[loan_id] = loan_schedules_by_terms[terms_by_loan_id[loan_id]]
+
+    errors = [
+        LoanScheduleBatchError(loan_id=loan_id, detail="Loan schedule does not exist")
+        for loan_id in dict.fromkeys(loan_ids)
+        if loan_id not in loans
+    ]
+
+    if layout is not None:
+        encoded_schedules = {}
+        for loan_id, loan_schedule in schedules.items():
+            if id(loan_schedule) not in encoded_schedules:
+                encoded_schedules[id(loan_schedule)] = encode_columns(rows_to_columns(loan_schedule, LoanSchedule.model_fields), LOAN_SCHEDULE_MONEY_FIELDS, layout, money)
+        return fast_json_response({
+            'schedules': {loan_id: encoded_schedules[id(loan_schedule)] for loan_id, loan_schedule in schedules.items()},
+            'errors': [error.model_dump() for error in errors],
+        })
+
+    return LoanScheduleBatchResult(schedules=schedules, errors=errors)
+
+# Text formats of the streamed routes: schedules, and the loan import and exports
+class StreamFormat(str, Enum):
+    ndjson = "ndjson"
+    csv = "csv"
+
+# Number of schedule rows sent per chunk of a streamed response
+LOAN_SCHEDULE_STREAM_CHUNK_SIZE = 120
+
+def encode_loan_schedule_stream(
+    loan_schedule: Iterator[LoanSchedule],
+    format: StreamFormat
+) -> Iterator[str]:
+    """Encodes schedule rows as NDJSON or CSV lines, a chunk of rows at a time"""
+    if format == StreamFormat.csv:
+        yield "month,remaining_balance,monthly_payment\n"
+
+    while chunk := list(islice(loan_schedule, LOAN_SCHEDULE_STREAM_CHUNK_SIZE)):
+        if format == StreamFormat.csv:
+            yield "".join(f"{row['month']},{row['remaining_balance']},{row['monthly_payment']}\n" for row in chunk)
+        else:
+            yield "".join(
+                json.dumps({
+                    'month': row['month'],
+                    'remaining_balance': str(row['remaining_balance']),
+                    'monthly_payment': str(row['monthly_payment']),
+                }) + "\n"
+                for row in chunk
+            )
+
+# Stream a loan schedule as NDJSON or CSV
+# Rows are calculated while the response is sent, so memory per request does not grow with the loan term
+@loan_router.get("/schedule/stream/")
+def stream_loan_schedule(
+    loan_id: int,
+    format: StreamFormat = StreamFormat.ndjson,
+    session: Session = Depends(get_session)
+):
+    statement = select(Loan).where(col(Loan.loan_id) == loan_id)
+    results = session.exec(statement).all()
+
+    if not results:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Loan schedule does not exist") 
+
+    loan = results[0]
+
+    loan_schedule = LoanAmortizationCalculator.iterate_loan_schedule(
+        loan.loan_amount,
+        loan.loan_term_months,
+        loan.annual_interest_rate
+    )
+
+    if format == StreamFormat.csv:
+        return StreamingResponse(
+            encode_loan_schedule_stream(loan_schedule, format),
+            media_type="text/csv",
+            headers={"Content-Disposition": f'attachment; filename="loan_{loan_id}_schedule.csv"'}
+        )
+
+    return StreamingResponse(encode_loan_schedule_stream(loan_schedule, format), media_type="application/x-ndjson")
+
+# Import loans from a CSV (with a header line) or NDJSON request body
+# The body is read as a stream and written IMPORT_BATCH_SIZE rows per transaction, so memory does not grow with the file.
+# Rows are validated like /loans/create/bulk/ and reported by their line. Batches committed before an error are kept.
+@loan_router.post("/import/", response_model=LoanImportResult)
+async def import_loans(
+    request: Request,
+    format: StreamFormat = StreamFormat.ndjson,
+    session: AsyncSession = Depends(get_async_session)
+):
+    transfer_format = LoanTransferFormat(format.value)
+    result = LoanImportResult(imported=0, error_count=0, errors=[])
+    fieldnames = None
+    line_number = 1
+
+    async for lines in iterate_line_batches(request.stream(), IMPORT_BATCH_SIZE):
+        if transfer_format == LoanTransferFormat.csv and fieldnames is None:
+            fieldnames = next(csv.reader([lines.pop(0)]))
+
+        rows = list(parse_rows(lines, transfer_format, fieldnames, start=line_number))
+        if not rows:
+            continue
+        line_number += len(rows)
+
+        imported, errors = await session.run_sync(import_loan_batch, rows)
+        record_batch_result(result, imported, errors)
+
+    return result
+
+def stream_row_batches(iterate_row_batches, fields, format: LoanTransferFormat, user_id: Optional[int]) -> Iterator[str]:
+    """Encodes the row batches of an export while the response is sent.
+    The generator opens its own session, since the request's session may be closed before the response is done streaming
+    """
     with Session(engine) as session:
-        statement = select(Loan).where(col(Loan.loan_id) == loan_id)
-        results = session.exec(statement).all()
+        yield from encode_row_batches(iterate_row_batches(session, user_id), fields, format)
+
+def export_response(iterate_row_batches, fields, format: StreamFormat, user_id: Optional[int], filename: str) -> StreamingResponse:
+    transfer_format = LoanTransferFormat(format.value)
+    content = stream_row_batches(iterate_row_batches, fields, transfer_format, user_id)
+
+    if transfer_format == LoanTransferFormat.csv:
+        return StreamingResponse(
+            content,
+            media_type="text/csv",
+            headers={"Content-Disposition": f'attachment; filename="{filename}.csv"'}
+        )
+    return StreamingResponse(content, media_type="application/x-ndjson")
+
+# Export all loans (or a user's loans) as CSV or NDJSON
+# Loans are read by loan_id in batches while the response is sent, so memory does not grow with the number of loans.
+@loan_router.get("/export/")
+def export_loans(
+    format: StreamFormat = StreamFormat.ndjson,
+    user_id: Optional[int] = None
+):
+    return export_response(iterate_loan_row_batches, LOAN_FIELDS, format, user_id, "loans")
+
+# Export the schedules of all loans (or of a user's loans) as CSV or NDJSON, one row per loan and month
+# Schedules are calculated a batch of loans at a time with the vectorized calculator while the response is sent.
+@loan_router.get("/schedule/export/")
+def export_loan_schedules(
+    format: StreamFormat = StreamFormat.ndjson,
+    user_id: Optional[int] = None
+):
+    return export_response(iterate_loan_schedule_row_batches, LOAN_SCHEDULE_FIELDS, format, user_id, "loan_schedules")
 
-        if not results:
-            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Loan schedule does not exist") 
+# Fetch the schedule of a loan under a list of rate resets (adjustable-rate loan)
+# The balance is re-amortized at every reset. Segments are cached, so repricing with a different future reset reuses the earlier segments.
+@loan_router.post("/schedule/adjustable/", response_model=List[LoanSchedule])
+def fetch_adjustable_rate_loan_schedule(
+    adjustable_rate_schedule_request: AdjustableRateScheduleRequest,
+    layout: Optional[ResponseLayout] = None,
+    money: MoneyEncoding = MoneyEncoding.string,
+    session: Session = Depends(get_session)
+):
+    loan = session.get(Loan, adjustable_rate_schedule_request.loan_id)
 
-        loan = results[0]
+    if loan is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Loan schedule does not exist")
 
-        loan_schedule = LoanAmortizationCalculator.calculate_loan_schedule(
+    try:
+        loan_schedule = AdjustableRateLoanCalculator.calculate_loan_schedule(
             loan.loan_amount,
             loan.loan_term_months,
-            loan.annual_interest_rate
+            loan.annual_interest_rate,
+            adjustable_rate_schedule_request.rate_resets
         )
+    except ValueError as error:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Cannot calculate loan schedule. {error}")
 
-        return loan_schedule
+    if layout is not None:
+        return fast_json_response(encode_columns(rows_to_columns(loan_schedule, LoanSchedule.model_fields), LOAN_SCHEDULE_MONEY_FIELDS, layout, money))
+
+    return loan_schedule
 
 # Fetch a loan summary for a specific month
+# Responses carry an ETag and a matching If-None-Match gets a 304 before the summary is calculated
 @loan_router.get('/summary/')
 def fetch_loan_summary(
     loan_id: int,
-    month: int
+    month: int,
+    response: Response,
+    if_none_match: Optional[str] = Header(default=None),
+    session: Session = Depends(get_session)
 ):
-    with Session(engine) as session:
-        statement = select(Loan).where(col(Loan.loan_id) == loan_id)
-        results = session.exec(statement).all()
+    # Loads the loan together with its materialized schedule row for the month, if any, in a single query
+    statement = (
+        select(Loan, MaterializedLoanSchedule)
+        .outerjoin(
+            MaterializedLoanSchedule,
+            (col(MaterializedLoanSchedule.loan_id) == col(Loan.loan_id)) & (col(MaterializedLoanSchedule.month) == month)
+        )
+        .where(col(Loan.loan_id) == loan_id)
+    )
+    results = session.exec(statement).all()
+
+    if not results:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Loan summary does not exist") 
+
+    loan, materialized_loan_schedule = results[0]
 
-        if not results:
-            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Loan summary does not exist") 
+    if month-1 < 0 or month > loan.loan_term_months:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Loan summary for month: {month} does not exist") 
 
-        loan = results[0]
+    headers = {
+        "ETag": loan_schedule_etag(loan, month, "materialized" if materialized_loan_schedule is not None else "calculated"),
+        "Cache-Control": LOAN_SCHEDULE_CACHE_CONTROL,
+    }
+    if etag_matches(if_none_match, headers["ETag"]):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    response.headers.update(headers)
 
-        loan_schedule = LoanAmortizationCalculator.calculate_loan_schedule(
+    if materialized_loan_schedule is not None:
+        loan_schedule_for_given_month = materialized_loan_schedule.model_dump(exclude={'loan_id'})
+    else:
+        loan_schedule_for_given_month = loan_schedule_cache.get_loan_schedule_for_month(
             loan.loan_amount,
             loan.loan_term_months,
-            loan.annual_interest_rate
+            loan.annual_interest_rate,
+            month
         )
 
-        if month-1 < 0 or month > len(loan_schedule):
-            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Loan summary for month: {month} does not exist") 
+    loan_summary = LoanAmortizationCalculator.calculate_loan_summary(
+        loan.loan_amount,
+        loan_schedule_for_given_month
+    )
+
+    return loan_summary
+
+# Fetch the loan summaries of a range of months, every `step` months
+# The schedule is read once and every summary comes from running totals, instead of one /summary/ call per month.
+@loan_router.get('/summary/range/')
+def fetch_loan_summaries(
+    loan_id: int,
+    start_month: int = 1,
+    end_month: Optional[int] = None,
+    step: int = Query(default=1, ge=1),
+    layout: Optional[ResponseLayout] = None,
+    money: MoneyEncoding = MoneyEncoding.string,
+    session: Session = Depends(get_session)
+):
+    loan = session.get(Loan, loan_id)
+
+    if loan is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Loan summary does not exist")
+
+    if end_month is None:
+        end_month = loan.loan_term_months
 
-        loan_schedule_for_given_month = loan_schedule[month-1]
+    if start_month < 1 or end_month > loan.loan_term_months or start_month > end_month:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Loan summary for months: {start_month} to {end_month} does not exist")
 
-        loan_summary = LoanAmortizationCalculator.calculate_loan_summary(
+    statement = (
+        select(MaterializedLoanSchedule)
+        .where(col(MaterializedLoanSchedule.loan_id) == loan_id)
+        .where(col(MaterializedLoanSchedule.month) <= end_month)
+        .order_by(col(MaterializedLoanSchedule.month))
+    )
+    loan_schedule = [row.model_dump(exclude={'loan_id'}) for row in session.exec(statement).all()]
+
+    if not loan_schedule:
+        loan_schedule = loan_schedule_cache.get_loan_schedule(
             loan.loan_amount,
-            loan_schedule_for_given_month
+            loan.loan_term_months,
+            loan.annual_interest_rate
+        ).to_loan_schedule()
+
+    loan_summaries = LoanAmortizationCalculator.calculate_loan_summaries(
+        loan.loan_amount,
+        loan_schedule,
+        start_month,
+        end_month,
+        step
+    )
+
+    if layout is not None:
+        return fast_json_response(encode_columns(rows_to_columns(loan_summaries, MonthlyLoanSummary.model_fields), LOAN_SUMMARY_MONEY_FIELDS, layout, money))
+
+    return loan_summaries
+
+# Calculate the payoff month and interest saved of extra payment scenarios on a loan
+# The regular schedule comes from the cache once, and every scenario only recalculates the months from its first extra payment.
+@loan_router.post("/prepayment/scenarios/", response_model=PrepaymentScenariosResult)
+def calculate_prepayment_scenarios(
+    prepayment_scenarios_request: PrepaymentScenariosRequest,
+    session: Session = Depends(get_session)
+):
+    loan = session.get(Loan, prepayment_scenarios_request.loan_id)
+
+    if loan is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Cannot calculate prepayment scenarios. Loan does not exist.")
+
+    loan_schedule = loan_schedule_cache.get_loan_schedule(
+        loan.loan_amount,
+        loan.loan_term_months,
+        loan.annual_interest_rate
+    )
+    baseline = PrepaymentCalculator.calculate_baseline(loan.loan_amount, loan_schedule)
+
+    return PrepaymentScenariosResult(
+        baseline_payoff_month=baseline[0],
+        baseline_total_interest_paid=baseline[1],
+        scenarios=[
+            PrepaymentCalculator.calculate_prepayment_summary(
+                loan.loan_amount,
+                loan.annual_interest_rate,
+                loan_schedule,
+                scenario.extra_payments,
+                baseline
+            )
+            for scenario in prepayment_scenarios_request.scenarios
+        ]
+    )
+
+# Find the first month each loan crosses a threshold, ex. the month the balance first drops to $X or below
+# Loans are loaded with one IN query and their schedules are calculated together in integer cents, in a local batch
+# that does not touch the shared schedule cache. Every query is then a binary search over its loan's balances.
+# The route is synchronous, so the calculation runs in the threadpool instead of blocking the event loop.
+# Queries on unknown loans, or loans without a schedule (ex. a 0% rate), are reported in `errors` by their index
+# and do not fail the rest of the batch.
+@loan_router.post("/payoff/threshold/", response_model=PayoffThresholdBatchResult)
+def find_payoff_threshold_months(
+    payoff_threshold_request: PayoffThresholdRequest,
+    session: Session = Depends(get_session)
+):
+    loan_ids = {query.loan_id for query in payoff_threshold_request.queries}
+    loans = {loan.loan_id: loan for loan in session.exec(select(Loan).where(col(Loan.loan_id).in_(loan_ids))).all()}
+    loan_schedule_errors = {loan_id: get_loan_schedule_error(loan) for loan_id, loan in loans.items()}
+
+    loan_indexes = {}
+    terms = []
+    for loan_id, loan in loans.items():
+        if loan_schedule_errors[loan_id] is None:
+            loan_indexes[loan_id] = len(terms)
+            terms.append((loan.loan_amount, loan.loan_term_months, loan.annual_interest_rate))
+    if terms:
+        batch_loan_schedule = BatchLoanAmortizationCalculator.calculate_loan_schedules(*zip(*terms))
+
+    def to_decimal(cents) -> Decimal:
+        return Decimal(int(cents)).scaleb(-2)
+
+    results = []
+    errors = []
+    for index, query in enumerate(payoff_threshold_request.queries):
+        loan = loans.get(query.loan_id)
+        if loan is None:
+            errors.append(PayoffThresholdError(index=index, detail="Cannot find payoff threshold. Loan does not exist."))
+            continue
+        if loan_schedule_errors[loan.loan_id] is not None:
+            errors.append(PayoffThresholdError(index=index, detail=f"Cannot find payoff threshold. {loan_schedule_errors[loan.loan_id]}"))
+            continue
+
+        loan_index = loan_indexes[loan.loan_id]
+        loan_schedule = CentsLoanSchedule(
+            monthly_payment=int(batch_loan_schedule.monthly_payment[loan_index]),
+            remaining_balances=batch_loan_schedule.remaining_balance[loan_index, :loan.loan_term_months]
         )
+        loan_amount = LoanAmortizationCalculator.to_cents(loan.loan_amount)
+        month = PayoffThresholdCalculator.find_threshold_month(loan_amount, loan_schedule, query.metric, LoanAmortizationCalculator.to_cents(query.threshold))
+        results.append(PayoffThresholdResult(
+            loan_id=loan.loan_id,
+            metric=query.metric,
+            threshold=query.threshold,
+            month=month,
+            value=None if month is None else to_decimal(PayoffThresholdCalculator.get_metric_value(loan_amount, loan_schedule, query.metric, month))
+        ))
+
+    return PayoffThresholdBatchResult(results=results, errors=errors)
+
+# Fetch the totals of all of a user's loans at a specific month
+# Every loan is loaded in one query and their balances at the month are calculated in one vectorized batch.
+# Loans whose term ends before the month are reported at their last month.
+# Loans whose schedule cannot be calculated (ex. a 0% rate) are left out of the totals and reported in `errors`.
+@loan_router.get("/portfolio/summary/", response_model=PortfolioSummary)
+def fetch_portfolio_summary(
+    user_id: int,
+    month: int,
+    session: Session = Depends(get_session)
+):
+    if month < 1:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Portfolio summary for month: {month} does not exist")
+
+    statement = (
+        select(col(User.user_id).label('existing_user_id'), Loan)
+        .outerjoin(Loan, col(Loan.user_id) == col(User.user_id))
+        .where(col(User.user_id) == user_id)
+        .order_by(col(Loan.loan_id))
+    )
+    results = session.exec(statement).all()
 
-        return loan_summary
+    if not results:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Cannot fetch portfolio summary. User does not exist.")
+
+    loans = []
+    errors = []
+    for _, loan in results:
+        if loan is None:
+            continue
+        loan_schedule_error = get_loan_schedule_error(loan)
+        if loan_schedule_error is None:
+            loans.append(loan)
+        else:
+            errors.append(PortfolioLoanError(loan_id=loan.loan_id, detail=loan_schedule_error))
+
+    loan_amounts = [loan.loan_amount for loan in loans]
+    term_months = [loan.loan_term_months for loan in loans]
+    months = np.minimum(month, np.asarray(term_months, dtype=np.int64))
+
+    remaining_balances, total_monthly_payments = BatchLoanAmortizationCalculator.calculate_remaining_balances_at_months(
+        loan_amounts,
+        term_months,
+        [loan.annual_interest_rate for loan in loans],
+        months
+    )
+    total_principal_paid = BatchLoanAmortizationCalculator.to_cents(loan_amounts) - remaining_balances
+    total_interest_paid = total_monthly_payments * months - total_principal_paid
+
+    def to_decimal(cents) -> Decimal:
+        return Decimal(int(cents)).scaleb(-2)
+
+    return PortfolioSummary(
+        month=month,
+        loan_count=len(loans),
+        current_principal_balance=to_decimal(remaining_balances.sum()),
+        total_principal_paid=to_decimal(total_principal_paid.sum()),
+        total_interest_paid=to_decimal(total_interest_paid.sum()),
+        loans=[
+            PortfolioLoanSummary(
+                loan_id=loan.loan_id,
+                month=int(months[index]),
+                current_principal_balance=to_decimal(remaining_balances[index]),
+                total_principal_paid=to_decimal(total_principal_paid[index]),
+                total_interest_paid=to_decimal(total_interest_paid[index])
+            )
+            for index, loan in enumerate(loans)
+        ],
+        errors=errors
+    )
 
 # Share loan with another user
 @loan_router.post("/share/", response_model=LoanShare)
 async def create_share_loan(
-    loan_share: LoanShare
+    loan_share: LoanShare,
+    session: AsyncSession = Depends(get_async_session)
 ):
     if loan_share.source_user_id == loan_share.target_user_id:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Cannot share loan. Source and Target user are the same.") 
 
-    with Session(engine) as session:
-        source_user_statement = select(User).where(col(User.user_id) == loan_share.source_user_id)
-        results = session.exec(source_user_statement).all()
-
-        if not results:
-            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Cannot share loan. Source user does not exist.") 
+    user_statement = select(User.user_id).where(col(User.user_id).in_([loan_share.source_user_id, loan_share.target_user_id]))
+    user_ids = (await session.exec(user_statement)).all()
 
-        target_user_statement = select(User).where(col(User.user_id) == loan_share.target_user_id)
-        results = session.exec(target_user_statement).all()
+    if loan_share.source_user_id not in user_ids:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Cannot share loan. Source user does not exist.") 
 
-        if not results:
-            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Cannot share loan. Target user does not exist.") 
-        
-        loan_statement = select(LoanShare).where(col(Loan.loan_id) == loan_share.loan_id)
-        results = session.exec(loan_statement).all()
+    if loan_share.target_user_id not in user_ids:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Cannot share loan. Target user does not exist.") 
 
-        if results:
-            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Duplicate loan found. Source and Target Users are already sharing this loan")
+    # The unique constraint on (loan_id, target_user_id) rejects duplicate shares atomically
+    session.add(loan_share)
+    try:
+        await session.commit()
+    except IntegrityError:
+        await session.rollback()
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Duplicate loan found. Source and Target Users are already sharing this loan")
 
-        session.add(loan_share)
-        session.commit()
-        session.refresh(loan_share)
-        return loan_share
\ No newline at end of file
+    await session.refresh(loan_share)
+    return loan_share
\ No newline at end of file
@@ -0,0 +1,16 @@
+from enum import Enum
+from typing import Optional
+from decimal import Decimal
+from sqlmodel import SQLModel
+
+class LoanAccessType(str, Enum):
+    owned = "owned"
+    shared = "shared"
+
+class AccessibleLoan(SQLModel):
+    loan_id: int
+    user_id: Optional[int]
+    loan_amount: Decimal
+    annual_interest_rate: Decimal
+    loan_term_months: int
+    access_type: LoanAccessType
\ No newline at end of file
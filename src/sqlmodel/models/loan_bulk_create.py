@@ -0,0 +1,11 @@
+from typing import List, Optional
+from sqlmodel import SQLModel
+
+class LoanBulkCreateError(SQLModel):
+    index: int
+    detail: str
+
+class LoanBulkCreateResult(SQLModel):
+    # Assigned loan_id for each loan of the request, in order. None for loans that failed
+    loan_ids: List[Optional[int]]
+    errors: List[LoanBulkCreateError]
@@ -0,0 +1,13 @@
+from typing import List
+from sqlmodel import SQLModel
+
+class LoanImportError(SQLModel):
+    # Line of the input (1 is the first data line, after the CSV header)
+    line: int
+    detail: str
+
+class LoanImportResult(SQLModel):
+    imported: int
+    error_count: int
+    # The first MAX_IMPORT_ERRORS errors, so a bad file cannot grow the response without bound
+    errors: List[LoanImportError]
\ No newline at end of file
@@ -1,7 +1,15 @@
 from decimal import Decimal
-from sqlmodel import SQLModel
+from sqlmodel import Field, SQLModel
 
 class LoanSchedule(SQLModel):
     month: int
     remaining_balance: Decimal
-    monthly_payment: Decimal
\ No newline at end of file
+    monthly_payment: Decimal
+
+class MaterializedLoanSchedule(SQLModel, table=True):
+    __tablename__ = "loan_schedule"
+
+    loan_id: int = Field(foreign_key="loan.loan_id", primary_key=True)
+    month: int = Field(primary_key=True)
+    remaining_balance: Decimal = Field(decimal_places=2)
+    monthly_payment: Decimal = Field(decimal_places=2)
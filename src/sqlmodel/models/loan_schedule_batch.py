@@ -0,0 +1,12 @@
+from typing import Dict, List
+from sqlmodel import SQLModel
+from src.sqlmodel.models.loan_schedule import LoanSchedule
+
+class LoanScheduleBatchError(SQLModel):
+    loan_id: int
+    detail: str
+
+class LoanScheduleBatchResult(SQLModel):
+    # Schedule of every requested loan that exists, keyed by loan_id
+    schedules: Dict[int, List[LoanSchedule]]
+    errors: List[LoanScheduleBatchError]
\ No newline at end of file
@@ -1,7 +1,14 @@
 from typing import Optional
+from sqlalchemy import Index, UniqueConstraint
 from sqlmodel import Field, SQLModel
 
 class LoanShare(SQLModel, table=True):
+    __table_args__ = (
+        UniqueConstraint("loan_id", "target_user_id", name="uq_loanshare_loan_id_target_user_id"),
+        # Serves "loans shared with a user" as one index range scan joined to loan by primary key
+        Index("ix_loanshare_target_user_id_loan_id", "target_user_id", "loan_id"),
+    )
+
     loan_share_id: Optional[int] = Field(default=None, primary_key=True)
     source_user_id: int = Field(default=None, foreign_key="user.user_id")
     target_user_id: int = Field(default=None, foreign_key="user.user_id")
@@ -4,4 +4,7 @@ from sqlmodel import SQLModel
 class LoanSummary(SQLModel):
     current_principal_balance: Decimal
     total_principal_paid: Decimal
-    total_interest_paid: Decimal
\ No newline at end of file
+    total_interest_paid: Decimal
+
+class MonthlyLoanSummary(LoanSummary):
+    month: int
\ No newline at end of file
@@ -0,0 +1,39 @@
+from enum import Enum
+from typing import List, Optional
+from decimal import Decimal
+from sqlmodel import Field, SQLModel
+
+class ThresholdMetric(str, Enum):
+    # First month the remaining balance is at or below the threshold
+    remaining_balance = "remaining_balance"
+    # First month the aggregate interest paid is at or above the threshold
+    total_interest_paid = "total_interest_paid"
+    # First month the aggregate principal paid is at or above the threshold
+    total_principal_paid = "total_principal_paid"
+
+class PayoffThresholdQuery(SQLModel):
+    loan_id: int
+    metric: ThresholdMetric = ThresholdMetric.remaining_balance
+    threshold: Decimal = Field(ge=0, decimal_places=2)
+
+class PayoffThresholdRequest(SQLModel):
+    queries: List[PayoffThresholdQuery] = Field(min_length=1, max_length=10000)
+
+class PayoffThresholdResult(SQLModel):
+    loan_id: int
+    metric: ThresholdMetric
+    threshold: Decimal
+    # 0 when the threshold is already met before the first payment, None when it is never met within the term
+    month: Optional[int]
+    # Value of the metric at `month`, as reported by /loans/summary/
+    value: Optional[Decimal]
+
+class PayoffThresholdError(SQLModel):
+    # Index of the query in the request
+    index: int
+    detail: str
+
+class PayoffThresholdBatchResult(SQLModel):
+    # One result per valid query, in request order
+    results: List[PayoffThresholdResult]
+    errors: List[PayoffThresholdError]
\ No newline at end of file
@@ -0,0 +1,19 @@
+from typing import List
+from sqlmodel import SQLModel
+from src.sqlmodel.models.loan_summary import LoanSummary
+
+class PortfolioLoanSummary(LoanSummary):
+    loan_id: int
+    month: int
+
+class PortfolioLoanError(SQLModel):
+    loan_id: int
+    detail: str
+
+class PortfolioSummary(LoanSummary):
+    month: int
+    # Number of loans in the totals
+    loan_count: int
+    loans: List[PortfolioLoanSummary]
+    # Loans whose schedule cannot be calculated (ex. a 0% rate), left out of the totals
+    errors: List[PortfolioLoanError]
\ No newline at end of file
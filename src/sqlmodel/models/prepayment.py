@@ -0,0 +1,29 @@
+from typing import List, Optional
+from decimal import Decimal
+from sqlmodel import Field, SQLModel
+
+class ExtraPayment(SQLModel):
+    # Extra principal paid at `month`. When recurring, paid every month from `month` until `end_month` (or payoff)
+    amount: Decimal = Field(gt=0, decimal_places=2)
+    month: int = Field(ge=1)
+    recurring: bool = False
+    end_month: Optional[int] = None
+
+class PrepaymentScenario(SQLModel):
+    extra_payments: List[ExtraPayment]
+
+class PrepaymentScenariosRequest(SQLModel):
+    loan_id: int
+    scenarios: List[PrepaymentScenario] = Field(min_length=1, max_length=10000)
+
+class PrepaymentSummary(SQLModel):
+    payoff_month: int
+    months_saved: int
+    total_interest_paid: Decimal
+    interest_saved: Decimal
+    total_extra_paid: Decimal
+
+class PrepaymentScenariosResult(SQLModel):
+    baseline_payoff_month: int
+    baseline_total_interest_paid: Decimal
+    scenarios: List[PrepaymentSummary]
\ No newline at end of file
@@ -0,0 +1,12 @@
+from typing import List
+from decimal import Decimal
+from sqlmodel import Field, SQLModel
+
+class RateReset(SQLModel):
+    # The annual interest rate applies from `effective_month` until the next reset
+    effective_month: int = Field(ge=1)
+    annual_interest_rate: Decimal = Field(gt=0, decimal_places=4)
+
+class AdjustableRateScheduleRequest(SQLModel):
+    loan_id: int
+    rate_resets: List[RateReset]
\ No newline at end of file
@@ -5,5 +5,5 @@ class User(SQLModel, table=True):
     user_id: Optional[int] = Field(default=None, primary_key=True)
     first_name: str
     last_name: str
-    email: str
+    email: str = Field(unique=True, index=True)
     password: str
\ No newline at end of file
@@ -0,0 +1,193 @@
+import os
+from decimal import Decimal
+from functools import lru_cache
+from typing import List, Sequence, Tuple
+from src.sqlmodel.models.loan_schedule import LoanSchedule
+from src.sqlmodel.models.rate_reset import RateReset
+from src.utils.loan_amortization_calculation import LoanAmortizationCalculator
+from src.utils.metrics import timed_calculation
+
+# Entries of the segment caches. A cached balance run holds up to term_months Decimals, about 40 KB for 360 months,
+# so the default bounds the cache to about 10 MB per worker
+SEGMENT_CACHE_SIZE = int(os.environ.get("ADJUSTABLE_RATE_SEGMENT_CACHE_SIZE", 256))
+
+class AdjustableRateLoanCalculator():
+    '''
+    The AdjustableRateLoanCalculator calculates the schedules of adjustable-rate loans (ARM).
+    At every rate reset the remaining balance is re-amortized over the remaining term at the new rate.
+
+    The schedule is split into segments, one per rate. A segment only depends on its starting balance,
+    the remaining term and its rate, so the balances from a segment's start to the end of the term are cached
+    and sliced to the segment's length: changing or moving a future reset reuses every earlier segment
+    and only recalculates from the changed segment onward.
+
+    Methods
+    -------
+    get_rate_segments(annual_interest_rate, term_months, rate_resets)
+        Returns the (start month, rate) of every segment
+    calculate_segment_payment(principal_balance, remaining_months, annual_interest_rate)
+        Calculates the re-amortized total monthly payment of a segment (cached)
+    calculate_remaining_balances(principal_balance, remaining_months, annual_interest_rate)
+        Calculates the payment and the remaining balances until the end of the term at one rate (cached)
+    calculate_segment(principal_balance, remaining_months, annual_interest_rate, segment_months)
+        Calculates the payment and the remaining balances of a segment
+    calculate_loan_schedule(principal_loan_balance, term_months, annual_interest_rate, rate_resets)
+        Calculates the loan amortization schedule across every segment
+    '''
+
+    @staticmethod
+    def get_rate_segments(
+        annual_interest_rate: Decimal,
+        term_months: int,
+        rate_resets: Sequence[RateReset]
+    ) -> List[Tuple[int, Decimal]]:
+        """Orders the rate resets into segments. The first segment starts at month 1 with the loan's rate,
+        unless a reset is effective at month 1.
+
+        Raises
+        ------
+        ValueError
+            if a reset is past the term or two resets share an effective month
+
+        Returns
+        -------
+        List[Tuple[int, Decimal]]
+            [(start month, annual interest rate), ...]
+        """
+        segments = {1: annual_interest_rate}
+        effective_months = set()
+
+        for rate_reset in sorted(rate_resets, key=lambda rate_reset: rate_reset.effective_month):
+            if rate_reset.effective_month > term_months:
+                raise ValueError(f"Rate reset at month {rate_reset.effective_month} is past the loan term of {term_months} months")
+            if rate_reset.effective_month in effective_months:
+                raise ValueError(f"More than one rate reset at month {rate_reset.effective_month}")
+            effective_months.add(rate_reset.effective_month)
+            segments[rate_reset.effective_month] = rate_reset.annual_interest_rate
+
+        return sorted(segments.items())
+
+    @staticmethod
+    @lru_cache(maxsize=SEGMENT_CACHE_SIZE)
+    def calculate_segment_payment(
+        principal_balance: Decimal,
+        remaining_months: int,
+        annual_interest_rate: Decimal
+    ) -> Decimal:
+        """Calculates the total monthly payment that pays off `principal_balance` over the remaining term at the segment's rate
+
+        Returns
+        -------
+        Decimal
+            the total monthly payment rounded to 2 decimal places(ex. 100.00)
+        """
+        return LoanAmortizationCalculator.calculate_total_monthly_payment(
+            principal_balance,
+            remaining_months,
+            annual_interest_rate / 100
+        )
+
+    @staticmethod
+    @lru_cache(maxsize=SEGMENT_CACHE_SIZE)
+    def calculate_remaining_balances(
+        principal_balance: Decimal,
+        remaining_months: int,
+        annual_interest_rate: Decimal
+    ) -> Tuple[Decimal, Tuple[Decimal, ...]]:
+        """Calculates the rest of the schedule at one rate, with the same steps as `LoanAmortizationCalculator.calculate_loan_schedule`
+
+        Returns
+        -------
+        Tuple[Decimal, Tuple[Decimal, ...]]
+            (total monthly payment, remaining balance of every month until the end of the term)
+        """
+        if principal_balance == 0:
+            return Decimal('0.00'), (Decimal(0),) * remaining_months
+
+        annual_interest_rate_decimal = annual_interest_rate / 100
+        total_monthly_payment = AdjustableRateLoanCalculator.calculate_segment_payment(
+            principal_balance,
+            remaining_months,
+            annual_interest_rate
+        )
+
+        remaining_balances = []
+        for _ in range(remaining_months):
+            principal_balance = LoanAmortizationCalculator.calculate_next_principal_balance(
+                total_monthly_payment,
+                principal_balance,
+                annual_interest_rate_decimal
+            )
+            remaining_balances.append(principal_balance)
+
+        return total_monthly_payment, tuple(remaining_balances)
+
+    @staticmethod
+    def calculate_segment(
+        principal_balance: Decimal,
+        remaining_months: int,
+        annual_interest_rate: Decimal,
+        segment_months: int
+    ) -> Tuple[Decimal, Tuple[Decimal, ...]]:
+        """Calculates one segment of the schedule: the first `segment_months` of `calculate_remaining_balances`
+
+        Returns
+        -------
+        Tuple[Decimal, Tuple[Decimal, ...]]
+            (total monthly payment, remaining balance of every month of the segment)
+        """
+        total_monthly_payment, remaining_balances = AdjustableRateLoanCalculator.calculate_remaining_balances(
+            principal_balance,
+            remaining_months,
+            annual_interest_rate
+        )
+        return total_monthly_payment, remaining_balances[:segment_months]
+
+    @staticmethod
+    @timed_calculation
+    def calculate_loan_schedule(
+        principal_loan_balance: Decimal,
+        term_months: int,
+        annual_interest_rate: Decimal,
+        rate_resets: Sequence[RateReset]
+    ) -> List[LoanSchedule]:
+        """Calculates the loan amortization schedule of an adjustable-rate loan.
+        Without rate resets, the schedule matches `LoanAmortizationCalculator.calculate_loan_schedule`.
+
+        Returns
+        -------
+        List[LoanSchedule]
+            [
+                {
+                    month: n
+                    remaining_balance: $xxxx (remaining principal balance),
+                    monthly_payment: $xxx (total payment of the month's segment)
+                },
+                ...
+            ]
+        """
+        segments = AdjustableRateLoanCalculator.get_rate_segments(annual_interest_rate, term_months, rate_resets)
+        segment_ends = [start_month for start_month, _ in segments[1:]] + [term_months + 1]
+
+        loan_schedule = []
+        principal_balance = principal_loan_balance
+
+        for (start_month, segment_annual_interest_rate), end_month in zip(segments, segment_ends):
+            total_monthly_payment, remaining_balances = AdjustableRateLoanCalculator.calculate_segment(
+                principal_balance,
+                term_months - start_month + 1,
+                segment_annual_interest_rate,
+                end_month - start_month
+            )
+
+            loan_schedule.extend(
+                {
+                    'month': month,
+                    'remaining_balance': remaining_balance,
+                    'monthly_payment': total_monthly_payment,
+                }
+                for month, remaining_balance in enumerate(remaining_balances, start=start_month)
+            )
+            principal_balance = remaining_balances[-1]
+
+        return loan_schedule
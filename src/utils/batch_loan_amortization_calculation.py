@@ -0,0 +1,509 @@
+from dataclasses import dataclass
+from decimal import Decimal
+from typing import List, Sequence, Tuple
+import numpy as np
+from src.sqlmodel.models.loan_schedule import LoanSchedule
+from src.utils.loan_amortization_calculation import RATE_SCALE, LoanAmortizationCalculator
+
+# Longest term `solve_term_months` searches, 100 years
+MAX_SOLVED_TERM_MONTHS = 1200
+
+@dataclass(frozen=True)
+class BatchLoanSchedule():
+    '''
+    Amortization schedules for many loans at once.
+
+    Row `i` of `remaining_balance` holds the schedule of the i-th loan, column `j` holds month `j + 1`.
+    Months past a loan's own term are 0. When `exact` is True, money is stored as integer cents (int64),
+    otherwise as float dollars.
+    '''
+    month: np.ndarray
+    remaining_balance: np.ndarray
+    monthly_payment: np.ndarray
+    term_months: np.ndarray
+    exact: bool
+
+    def to_loan_schedule(self, index: int) -> List[LoanSchedule]:
+        """Converts the schedule of a single loan to the format returned by `LoanAmortizationCalculator.calculate_loan_schedule`,
+        where a paid off balance is Decimal(0)
+
+        Returns
+        -------
+        List[LoanSchedule]
+        """
+        term_months = int(self.term_months[index])
+        monthly_payment = self._to_decimal(self.monthly_payment[index])
+
+        return [
+            {
+                'month': month,
+                'remaining_balance': self._to_decimal(self.remaining_balance[index, month - 1]) if self.remaining_balance[index, month - 1] else Decimal(0),
+                'monthly_payment': monthly_payment,
+            }
+            for month in range(1, term_months + 1)
+        ]
+
+    def _to_decimal(self, value) -> Decimal:
+        if self.exact:
+            return Decimal(int(value)).scaleb(-2)
+        return round(Decimal(float(value)), 2)
+
+
+class BatchLoanAmortizationCalculator():
+    '''
+    The BatchLoanAmortizationCalculator calculates the amortization schedules of many loans in one vectorized pass.
+    Each month is a single set of NumPy operations over every loan, instead of one Python loop per loan.
+
+    Two modes are supported:
+    - exact: money as integer cents and rates as scaled integers. Matches the `Decimal` rounding of
+      `LoanAmortizationCalculator.calculate_loan_schedule` to the cent.
+    - float: float64 arithmetic. Faster, but can be off by a cent here and there.
+
+    Methods
+    -------
+    calculate_loan_schedules(principal_loan_balances, term_months, annual_interest_rates, exact=True)
+        Calculates the loan amortization schedule of every loan
+    calculate_remaining_balances_at_months(principal_loan_balances, term_months, annual_interest_rates, months)
+        Calculates the remaining balance of every loan at a given month
+
+    The inverse solvers answer quotes backwards from a total monthly payment, for many quotes at once:
+    solve_annual_interest_rates(principal_loan_balances, term_months, total_monthly_payments, tolerance=1e-9)
+        Calculates the rate at which each loan has the given payment (safeguarded Newton)
+    solve_principal_loan_balances(total_monthly_payments, term_months, annual_interest_rates, exact=True)
+        Calculates the largest principal each payment can pay off
+    solve_term_months(principal_loan_balances, annual_interest_rates, total_monthly_payments, exact=True, max_term_months=MAX_SOLVED_TERM_MONTHS)
+        Calculates the shortest term each payment can pay off
+    '''
+
+    @staticmethod
+    def divide_round_half_even(
+        numerator: np.ndarray,
+        denominator: int
+    ) -> np.ndarray:
+        """Divides integers and rounds the quotient to the nearest integer, ties to even.
+        This is the rounding `round(Decimal, 2)` applies when the values are expressed in cents.
+
+        Returns
+        -------
+        np.ndarray
+            the rounded quotients as int64
+        """
+        quotient, remainder = np.divmod(numerator, denominator)
+        twice_remainder = 2 * remainder
+        round_up = (twice_remainder > denominator) | ((twice_remainder == denominator) & (quotient % 2 == 1))
+        return quotient + round_up
+
+    @staticmethod
+    def to_cents(
+        values: Sequence[Decimal]
+    ) -> np.ndarray:
+        """Converts dollar amounts to integer cents
+
+        Raises
+        ------
+        ValueError
+            if an amount has fractions of a cent
+
+        Returns
+        -------
+        np.ndarray
+            the amounts in cents as int64
+        """
+        return np.array([LoanAmortizationCalculator.to_cents(value) for value in values], dtype=np.int64)
+
+    @staticmethod
+    def to_scaled_rates(
+        annual_interest_rates: Sequence[Decimal]
+    ) -> np.ndarray:
+        """Converts annual interest rates (percentages) to integers scaled by RATE_SCALE
+
+        Raises
+        ------
+        ValueError
+            if a rate has more decimal places than RATE_SCALE can represent
+
+        Returns
+        -------
+        np.ndarray
+            the scaled rates as int64
+        """
+        return np.array([LoanAmortizationCalculator.to_scaled_rate(annual_interest_rate) for annual_interest_rate in annual_interest_rates], dtype=np.int64)
+
+    @staticmethod
+    def calculate_total_monthly_payments_cents(
+        principal_loan_balances: Sequence[Decimal],
+        term_months: Sequence[int],
+        annual_interest_rates: Sequence[Decimal]
+    ) -> np.ndarray:
+        """Calculates the total monthly payment of every loan in cents.
+        Payments are computed once per distinct (amount, term, rate) with the `Decimal` calculator,
+        so they match the scalar path exactly.
+
+        Returns
+        -------
+        np.ndarray
+            the total monthly payments in cents as int64
+        """
+        payments = {}
+        payments_cents = []
+        for principal_loan_balance, term, annual_interest_rate in zip(principal_loan_balances, term_months, annual_interest_rates):
+            key = (Decimal(str(principal_loan_balance)), int(term), Decimal(str(annual_interest_rate)))
+            if key not in payments:
+                total_monthly_payment = LoanAmortizationCalculator.calculate_total_monthly_payment(key[0], key[1], key[2] / 100)
+                payments[key] = int(total_monthly_payment * 100)
+            payments_cents.append(payments[key])
+        return np.array(payments_cents, dtype=np.int64)
+
+    @staticmethod
+    def calculate_loan_schedules(
+        principal_loan_balances: Sequence[Decimal],
+        term_months: Sequence[int],
+        annual_interest_rates: Sequence[Decimal],
+        exact: bool = True
+    ) -> BatchLoanSchedule:
+        """Calculates the loan amortization schedules of many loans
+
+        Every month applies the same steps as `LoanAmortizationCalculator.calculate_loan_schedule`:
+            Monthly Principal Payment = Total Monthly Payment - (Outstanding Loan Balance x (Interest Rate / 12 Months))
+            New Principal Balance = Principal Balance - Monthly Principal Payment (0 once it drops below the principal payment)
+
+        Returns
+        -------
+        BatchLoanSchedule
+        """
+        if exact:
+            return BatchLoanAmortizationCalculator._calculate_loan_schedules_cents(
+                principal_loan_balances,
+                term_months,
+                annual_interest_rates
+            )
+        return BatchLoanAmortizationCalculator._calculate_loan_schedules_float(
+            principal_loan_balances,
+            term_months,
+            annual_interest_rates
+        )
+
+    @staticmethod
+    def calculate_remaining_balances_at_months(
+        principal_loan_balances: Sequence[Decimal],
+        term_months: Sequence[int],
+        annual_interest_rates: Sequence[Decimal],
+        months: Sequence[int]
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Calculates the remaining balance of every loan at its own month, matching
+        `LoanAmortizationCalculator.calculate_loan_schedule_for_month` to the cent.
+        Only the months up to the largest requested month are calculated, and no schedule is kept in memory.
+
+        Returns
+        -------
+        Tuple[np.ndarray, np.ndarray]
+            (remaining balances in cents, total monthly payments in cents), both int64
+        """
+        months = np.asarray(months, dtype=np.int64)
+        principal_balances = BatchLoanAmortizationCalculator.to_cents(principal_loan_balances)
+        scaled_rates = BatchLoanAmortizationCalculator.to_scaled_rates(annual_interest_rates)
+        total_monthly_payments = BatchLoanAmortizationCalculator.calculate_total_monthly_payments_cents(
+            principal_loan_balances,
+            term_months,
+            annual_interest_rates
+        )
+
+        denominator = 1200 * RATE_SCALE
+        scaled_total_monthly_payments = total_monthly_payments * denominator
+        remaining_balances = principal_balances.copy()
+
+        for month in range(1, int(months.max(initial=0)) + 1):
+            monthly_principal_payments = BatchLoanAmortizationCalculator.divide_round_half_even(
+                scaled_total_monthly_payments - principal_balances * scaled_rates,
+                denominator
+            )
+            principal_balances = principal_balances - monthly_principal_payments
+            principal_balances[principal_balances < monthly_principal_payments] = 0
+            remaining_balances = np.where(months >= month, principal_balances, remaining_balances)
+
+        return remaining_balances, total_monthly_payments
+
+    @staticmethod
+    def calculate_annuity_factors(
+        monthly_interest_rates: np.ndarray,
+        terms: np.ndarray
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Calculates the total monthly payment per dollar of principal and its derivative by the monthly rate
+            i = monthly interest rate, n = term in months, v = (1 + i)^-n
+            factor = i * (1 + i)^n / ((1 + i)^n - 1) = i / (1 - v)
+            d factor / di = ((1 - v) - i * n * v / (1 + i)) / (1 - v)^2
+
+        Returns
+        -------
+        Tuple[np.ndarray, np.ndarray]
+            (factors, derivatives) as float64
+        """
+        one_minus_v = -np.expm1(-terms * np.log1p(monthly_interest_rates))
+        v = 1 - one_minus_v
+        factors = monthly_interest_rates / one_minus_v
+        derivatives = (one_minus_v - monthly_interest_rates * terms * v / (1 + monthly_interest_rates)) / one_minus_v ** 2
+        return factors, derivatives
+
+    @staticmethod
+    def calculate_payment_ratio(
+        term_months: int,
+        annual_interest_rate: Decimal
+    ) -> Decimal:
+        """Calculates the total monthly payment per dollar of principal exactly as
+        `LoanAmortizationCalculator.calculate_total_monthly_payment`, before the payment is rounded to cents
+
+        Returns
+        -------
+        Decimal
+        """
+        annual_interest_rate_decimal = annual_interest_rate / 100
+        return (
+            LoanAmortizationCalculator.get_amortized_numerator(annual_interest_rate_decimal, term_months)
+            / LoanAmortizationCalculator.get_amortized_denominator(annual_interest_rate_decimal, term_months)
+        )
+
+    @staticmethod
+    def solve_annual_interest_rates(
+        principal_loan_balances: Sequence[Decimal],
+        term_months: Sequence[int],
+        total_monthly_payments: Sequence[Decimal],
+        tolerance: float = 1e-9,
+        max_iterations: int = 100
+    ) -> np.ndarray:
+        """Calculates the annual interest rate at which each loan's total monthly payment is the given payment,
+        the inverse of `LoanAmortizationCalculator.calculate_total_monthly_payment`.
+
+        Newton's method runs on every quote at once. Each quote keeps a bracket around its root, and a step that
+        leaves the bracket is replaced by bisection, so every quote converges. Iterations stop once every step is
+        below `tolerance` (in percentage points of the annual rate), or after `max_iterations`.
+        A payment that is not above principal / term has no positive rate.
+
+        Returns
+        -------
+        np.ndarray
+            the annual interest rates as percentages (ex. 6.5) in float64, NaN where no positive rate exists
+        """
+        principal_balances = np.asarray(principal_loan_balances, dtype=np.float64)
+        terms = np.asarray(term_months, dtype=np.float64)
+        payments = np.asarray(total_monthly_payments, dtype=np.float64)
+
+        solvable = (principal_balances > 0) & (terms > 0) & (payments * terms > principal_balances)
+        principal_balances = np.where(solvable, principal_balances, 1.0)
+        terms = np.where(solvable, terms, 1.0)
+        payments = np.where(solvable, payments, 2.0)
+
+        # factor(i) > i, so the rate is below payment / principal. For small rates factor(i) ~ 1/n + i(n + 1)/2n
+        low = np.zeros_like(payments)
+        high = payments / principal_balances
+        monthly_interest_rates = np.clip(
+            (payments / principal_balances - 1 / terms) * 2 * terms / (terms + 1),
+            high * 1e-6,
+            high
+        )
+
+        for _ in range(max_iterations):
+            factors, derivatives = BatchLoanAmortizationCalculator.calculate_annuity_factors(monthly_interest_rates, terms)
+            residuals = principal_balances * factors - payments
+            high = np.where(residuals > 0, monthly_interest_rates, high)
+            low = np.where(residuals <= 0, monthly_interest_rates, low)
+
+            next_monthly_interest_rates = monthly_interest_rates - residuals / (principal_balances * derivatives)
+            outside = ~((next_monthly_interest_rates > low) & (next_monthly_interest_rates < high))
+            next_monthly_interest_rates = np.where(outside, (low + high) / 2, next_monthly_interest_rates)
+
+            steps = np.abs(next_monthly_interest_rates - monthly_interest_rates) * 1200
+            monthly_interest_rates = next_monthly_interest_rates
+            if steps.max(initial=0) < tolerance:
+                break
+
+        return np.where(solvable, monthly_interest_rates * 1200, np.nan)
+
+    @staticmethod
+    def solve_principal_loan_balances(
+        total_monthly_payments: Sequence[Decimal],
+        term_months: Sequence[int],
+        annual_interest_rates: Sequence[Decimal],
+        exact: bool = True
+    ) -> np.ndarray:
+        """Calculates the largest principal whose total monthly payment does not exceed the given payment
+            Principal = Total Monthly Payment / factor, factor = i * (1 + i)^n / ((1 + i)^n - 1)
+
+        The estimate is vectorized. When `exact` is True, each estimate is then moved to the last cent whose payment,
+        calculated as `LoanAmortizationCalculator.calculate_total_monthly_payment`, is within the budget.
+        The payment rounding means principals a fraction of a cent apart can share a payment, so this is a maximum, not a unique answer.
+        The payment formula is undefined at a 0% (or negative) rate or a term below 1 month, so those quotes have no principal.
+
+        Returns
+        -------
+        np.ndarray
+            the largest principals in cents as int64, -1 where the rate is not positive or the term is below 1 month
+        """
+        payments = np.asarray(total_monthly_payments, dtype=np.float64)
+        terms = np.asarray(term_months, dtype=np.int64)
+        monthly_interest_rates = np.asarray(annual_interest_rates, dtype=np.float64) / 1200
+        solvable = (monthly_interest_rates > 0) & (terms > 0)
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            factors, _ = BatchLoanAmortizationCalculator.calculate_annuity_factors(monthly_interest_rates, terms)
+            # A payment rounds down to the budget until it reaches half a cent above it
+            principal_balances = np.where(solvable, np.floor((payments + 0.005) / factors * 100), -1).astype(np.int64)
+
+        if not exact:
+            return principal_balances
+
+        payment_ratios = {}
+        for index, (total_monthly_payment, term, annual_interest_rate) in enumerate(zip(total_monthly_payments, term_months, annual_interest_rates)):
+            if not solvable[index]:
+                continue
+            key = (int(term), Decimal(str(annual_interest_rate)))
+            if key not in payment_ratios:
+                payment_ratios[key] = BatchLoanAmortizationCalculator.calculate_payment_ratio(*key)
+            payment_ratio = payment_ratios[key]
+            total_monthly_payment = Decimal(str(total_monthly_payment))
+
+            principal_balance = int(principal_balances[index])
+            while round(Decimal(principal_balance + 1).scaleb(-2) * payment_ratio, 2) <= total_monthly_payment:
+                principal_balance += 1
+            while principal_balance > 0 and round(Decimal(principal_balance).scaleb(-2) * payment_ratio, 2) > total_monthly_payment:
+                principal_balance -= 1
+            principal_balances[index] = principal_balance
+
+        return principal_balances
+
+    @staticmethod
+    def solve_term_months(
+        principal_loan_balances: Sequence[Decimal],
+        annual_interest_rates: Sequence[Decimal],
+        total_monthly_payments: Sequence[Decimal],
+        exact: bool = True,
+        max_term_months: int = MAX_SOLVED_TERM_MONTHS
+    ) -> np.ndarray:
+        """Calculates the shortest term, up to `max_term_months`, whose total monthly payment does not exceed the given payment
+            n = -log(1 - Principal x i / Total Monthly Payment) / log(1 + i)
+
+        The estimate is vectorized. When `exact` is True, the estimate is only a starting point: the term is bracketed
+        with the payment calculated as `LoanAmortizationCalculator.calculate_total_monthly_payment` (a longer term never costs more),
+        doubling the term until it is within the budget, then bisected to the shortest such term.
+        The float estimate is not trusted to reject a quote: close to the first month's interest, the rounded payment
+        of a long term can still be within a budget the float formula finds too small.
+        The payment formula is undefined at a 0% (or negative) rate, so those quotes have no term.
+
+        Returns
+        -------
+        np.ndarray
+            the terms in months as int64, 0 where no term up to `max_term_months` pays off the loan or the rate is not positive
+        """
+        principal_balances = np.asarray(principal_loan_balances, dtype=np.float64)
+        monthly_interest_rates = np.asarray(annual_interest_rates, dtype=np.float64) / 1200
+        payments = np.asarray(total_monthly_payments, dtype=np.float64)
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            estimates = np.ceil(-np.log1p(-principal_balances * monthly_interest_rates / payments) / np.log1p(monthly_interest_rates) - 1e-9)
+            # NaN and infinite estimates fail the comparison: the payment does not exceed the first month's interest
+            estimated = (monthly_interest_rates > 0) & (payments > principal_balances * monthly_interest_rates) & (estimates <= max_term_months)
+            terms = np.where(estimated, np.maximum(estimates, 1), 0).astype(np.int64)
+
+        if not exact:
+            return terms
+
+        for index, (principal_loan_balance, annual_interest_rate, total_monthly_payment) in enumerate(zip(principal_loan_balances, annual_interest_rates, total_monthly_payments)):
+            if not monthly_interest_rates[index] > 0:
+                continue
+            principal_loan_balance = Decimal(str(principal_loan_balance))
+            annual_interest_rate = Decimal(str(annual_interest_rate))
+            total_monthly_payment = Decimal(str(total_monthly_payment))
+
+            def is_affordable(term: int) -> bool:
+                return LoanAmortizationCalculator.calculate_total_monthly_payment(principal_loan_balance, term, annual_interest_rate / 100) <= total_monthly_payment
+
+            # Bracket the shortest affordable term in (low, high], starting from the estimate
+            low, high = 0, max(int(terms[index]), 1)
+            while not is_affordable(high):
+                if high == max_term_months:
+                    high = None
+                    break
+                low, high = high, min(high * 2, max_term_months)
+            if high is None:
+                terms[index] = 0
+                continue
+
+            while high - low > 1:
+                middle = (low + high) // 2
+                if is_affordable(middle):
+                    high = middle
+                else:
+                    low = middle
+            terms[index] = high
+
+        return terms
+
+    @staticmethod
+    def _calculate_loan_schedules_cents(
+        principal_loan_balances: Sequence[Decimal],
+        term_months: Sequence[int],
+        annual_interest_rates: Sequence[Decimal]
+    ) -> BatchLoanSchedule:
+        terms = np.asarray(term_months, dtype=np.int64)
+        max_term = int(terms.max(initial=0))
+        principal_balances = BatchLoanAmortizationCalculator.to_cents(principal_loan_balances)
+        scaled_rates = BatchLoanAmortizationCalculator.to_scaled_rates(annual_interest_rates)
+        total_monthly_payments = BatchLoanAmortizationCalculator.calculate_total_monthly_payments_cents(
+            principal_loan_balances,
+            term_months,
+            annual_interest_rates
+        )
+
+        # interest (cents) = balance (cents) * rate / 100 / 12 = balance * scaled rate / denominator
+        denominator = 1200 * RATE_SCALE
+        scaled_total_monthly_payments = total_monthly_payments * denominator
+        remaining_balances = np.zeros((len(terms), max_term), dtype=np.int64)
+
+        for month in range(max_term):
+            monthly_principal_payments = BatchLoanAmortizationCalculator.divide_round_half_even(
+                scaled_total_monthly_payments - principal_balances * scaled_rates,
+                denominator
+            )
+            principal_balances = principal_balances - monthly_principal_payments
+            principal_balances[principal_balances < monthly_principal_payments] = 0
+            remaining_balances[:, month] = principal_balances
+
+        remaining_balances[np.arange(1, max_term + 1) > terms[:, None]] = 0
+
+        return BatchLoanSchedule(
+            month=np.arange(1, max_term + 1),
+            remaining_balance=remaining_balances,
+            monthly_payment=total_monthly_payments,
+            term_months=terms,
+            exact=True
+        )
+
+    @staticmethod
+    def _calculate_loan_schedules_float(
+        principal_loan_balances: Sequence[Decimal],
+        term_months: Sequence[int],
+        annual_interest_rates: Sequence[Decimal]
+    ) -> BatchLoanSchedule:
+        terms = np.asarray(term_months, dtype=np.int64)
+        max_term = int(terms.max(initial=0))
+        principal_balances = np.asarray(principal_loan_balances, dtype=np.float64)
+        monthly_interest_rates = np.asarray(annual_interest_rates, dtype=np.float64) / 100 / 12
+
+        growth = (1 + monthly_interest_rates) ** terms
+        total_monthly_payments = np.round(principal_balances * (monthly_interest_rates * growth) / (growth - 1), 2)
+        remaining_balances = np.zeros((len(terms), max_term), dtype=np.float64)
+
+        for month in range(max_term):
+            monthly_principal_payments = np.round(total_monthly_payments - principal_balances * monthly_interest_rates, 2)
+            principal_balances = np.round(principal_balances - monthly_principal_payments, 2)
+            principal_balances[principal_balances < monthly_principal_payments] = 0
+            remaining_balances[:, month] = principal_balances
+
+        remaining_balances[np.arange(1, max_term + 1) > terms[:, None]] = 0
+
+        return BatchLoanSchedule(
+            month=np.arange(1, max_term + 1),
+            remaining_balance=remaining_balances,
+            monthly_payment=total_monthly_payments,
+            term_months=terms,
+            exact=False
+        )
@@ -0,0 +1,61 @@
+import json
+from decimal import Decimal
+from enum import Enum
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Sequence, Union
+from fastapi.responses import Response
+
+# High-throughput JSON responses for schedule-heavy endpoints
+# Rows are encoded straight to JSON, skipping pydantic validation and serialization of every row.
+# Money is encoded either as a string with 2 decimal places ("28820.47") or as integer cents (2882047),
+# and rows can be sent as a list of objects or as a compact columnar object: { "month": [...], "remaining_balance": [...] }
+
+class ResponseLayout(str, Enum):
+    rows = "rows"
+    columns = "columns"
+
+class MoneyEncoding(str, Enum):
+    string = "string"
+    cents = "cents"
+
+def encode_money(value: Decimal, money_encoding: MoneyEncoding):
+    """Encodes an amount of money as a string with 2 decimal places or as integer cents"""
+    if money_encoding == MoneyEncoding.cents:
+        return int(round(Decimal(value) * 100))
+    return format(value, ".2f")
+
+def encode_columns(
+    columns: Mapping[str, Sequence],
+    money_fields: Iterable[str],
+    layout: ResponseLayout,
+    money_encoding: MoneyEncoding
+) -> Union[Dict[str, list], List[dict]]:
+    """Encodes equally long columns ({ field: values }) to JSON-ready columns or rows
+
+    Returns
+    -------
+    Union[Dict[str, list], List[dict]]
+        the columns when `layout` is columns, otherwise one dict per row
+    """
+    money_fields = set(money_fields)
+    encoded_columns = {
+        field: [encode_money(value, money_encoding) for value in values] if field in money_fields else list(values)
+        for field, values in columns.items()
+    }
+
+    if layout == ResponseLayout.columns:
+        return encoded_columns
+
+    fields = list(encoded_columns)
+    return [dict(zip(fields, row)) for row in zip(*encoded_columns.values())]
+
+def rows_to_columns(rows: Sequence[Mapping], fields: Sequence[str]) -> Dict[str, list]:
+    """Transposes rows (ex. LoanSchedule dicts) to { field: values }"""
+    return {field: [row[field] for row in rows] for field in fields}
+
+def fast_json_response(content: Any, headers: Optional[Mapping[str, str]] = None) -> Response:
+    """Serializes already JSON-ready content with the C encoder of the standard library, without whitespace"""
+    return Response(
+        content=json.dumps(content, separators=(",", ":")),
+        media_type="application/json",
+        headers=headers
+    )
@@ -1,7 +1,20 @@
 from decimal import Decimal
-from typing import List
+from enum import Enum
+from itertools import islice
+from typing import Iterable, Iterator, List
 from src.sqlmodel.models.loan_schedule import LoanSchedule
-from src.sqlmodel.models.loan_summary import LoanSummary
+from src.sqlmodel.models.loan_summary import LoanSummary, MonthlyLoanSummary
+from src.utils.metrics import timed_calculation
+
+# Annual interest rates are percentages with up to 4 decimal places (ex. 3.1250),
+# so they can be represented exactly as integers scaled by RATE_SCALE
+RATE_SCALE = 10000
+
+class CalculationEngine(str, Enum):
+    # Every step in Decimal, rounding with round(..., 2)
+    decimal = "decimal"
+    # Money as integer cents and rates as integers scaled by RATE_SCALE, with the same rounding as the Decimal engine
+    cents = "cents"
 
 class LoanAmortizationCalculator():
     '''
@@ -122,55 +135,270 @@ class LoanAmortizationCalculator():
         return ((1 + monthly_interest_rate) ** term_months) - 1
 
     @staticmethod
-    def calculate_loan_schedule(
+    def calculate_next_principal_balance(
+        total_monthly_payment: Decimal,
+        principal_balance: Decimal,
+        annual_interest_rate_decimal: Decimal
+    ) -> Decimal:
+        """Calculates the remaining principal balance after a single monthly payment
+         New Principal Balance = Principal Balance - Monthly Principal Payment
+
+        Once the new balance drops below the monthly principal payment, the remainder is
+        folded into the final payment and the balance becomes 0.
+
+        Returns
+        -------
+        Decimal
+            the remaining principal balance after the payment
+        """
+        monthly_principal_payment = LoanAmortizationCalculator.calculate_monthly_principal_payment(
+            total_monthly_payment,
+            principal_balance,
+            annual_interest_rate_decimal
+        )
+
+        new_principal_balance = principal_balance - monthly_principal_payment
+
+        if new_principal_balance < monthly_principal_payment:
+            new_principal_balance = 0
+
+        return new_principal_balance
+
+    @staticmethod
+    def divide_round_half_even(
+        numerator: int,
+        denominator: int
+    ) -> int:
+        """Divides integers and rounds the quotient to the nearest integer, ties to even.
+        This is the rounding `round(Decimal, 2)` applies when the values are expressed in cents.
+
+        Returns
+        -------
+        int
+        """
+        quotient, remainder = divmod(numerator, denominator)
+        twice_remainder = 2 * remainder
+        if twice_remainder > denominator or (twice_remainder == denominator and quotient % 2 == 1):
+            return quotient + 1
+        return quotient
+
+    @staticmethod
+    def to_cents(
+        amount: Decimal
+    ) -> int:
+        """Converts a dollar amount to integer cents
+
+        Raises
+        ------
+        ValueError
+            if the amount has fractions of a cent
+
+        Returns
+        -------
+        int
+        """
+        scaled = Decimal(str(amount)) * 100
+        if scaled != scaled.to_integral_value():
+            raise ValueError(f"Amount {amount} has fractions of a cent")
+        return int(scaled)
+
+    @staticmethod
+    def to_scaled_rate(
+        annual_interest_rate: Decimal
+    ) -> int:
+        """Converts an annual interest rate (percentage) to an integer scaled by RATE_SCALE
+
+        Raises
+        ------
+        ValueError
+            if the rate has more decimal places than RATE_SCALE can represent
+
+        Returns
+        -------
+        int
+        """
+        scaled = Decimal(str(annual_interest_rate)) * RATE_SCALE
+        if scaled != scaled.to_integral_value():
+            raise ValueError(f"Annual interest rate {annual_interest_rate} has too many decimal places")
+        return int(scaled)
+
+    @staticmethod
+    def iterate_principal_balances_cents(
         principal_loan_balance: Decimal,
-        term_months: int,
+        total_monthly_payment: Decimal,
         annual_interest_rate: Decimal
-    ) -> List[LoanSchedule]:
-        """Calculates the loan amortization schedule
+    ) -> Iterator[int]:
+        """Yields the remaining principal balance in cents after every monthly payment, without end.
+        Each step is `calculate_next_principal_balance` in integer arithmetic:
+            Monthly Principal Payment (cents) = Total Monthly Payment (cents) - Balance (cents) x Scaled Rate / (1200 x RATE_SCALE)
+
+        Yields
+        ------
+        int
+            the remaining principal balance in cents
+        """
+        principal_balance = LoanAmortizationCalculator.to_cents(principal_loan_balance)
+        scaled_rate = LoanAmortizationCalculator.to_scaled_rate(annual_interest_rate)
+        denominator = 1200 * RATE_SCALE
+        scaled_total_monthly_payment = LoanAmortizationCalculator.to_cents(total_monthly_payment) * denominator
+
+        while True:
+            monthly_principal_payment = LoanAmortizationCalculator.divide_round_half_even(
+                scaled_total_monthly_payment - principal_balance * scaled_rate,
+                denominator
+            )
+            principal_balance -= monthly_principal_payment
+
+            if principal_balance < monthly_principal_payment:
+                principal_balance = 0
+
+            yield principal_balance
+
+    @staticmethod
+    @timed_calculation
+    def calculate_loan_schedule_for_month(
+        principal_loan_balance: Decimal,
+        term_months: int,
+        annual_interest_rate: Decimal,
+        month: int,
+        engine: CalculationEngine = CalculationEngine.decimal
+    ) -> LoanSchedule:
+        """Calculates a single entry of the loan amortization schedule
+
+        The total monthly payment comes from the closed-form annuity formula, then the balance is
+        carried forward with the same cent rounding as `calculate_loan_schedule`, stopping at the
+        requested month. The result matches `calculate_loan_schedule(...)[month - 1]` to the cent
+        and its cost depends on `month`, not on the loan term.
+        `engine` selects Decimal or integer-cents arithmetic, both give the same result.
 
         Returns
         -------
-        List[LoanSchedule]
-            [
-                {
-                    month: n
-                    remaining_balance: $xxxx (remaining principal balance),
-                    monthly_payment: $xxx (total payment = principal_due + interest_payment)
-                },
-                ...
-            ]
+        LoanSchedule
+            {
+                month: n
+                remaining_balance: $xxxx (remaining principal balance),
+                monthly_payment: $xxx (total payment = principal_due + interest_payment)
+            }
         """
-        results = []
         annual_interest_rate_decimal = annual_interest_rate / 100
         principal_balance = principal_loan_balance
         total_monthly_payment = LoanAmortizationCalculator.calculate_total_monthly_payment(principal_loan_balance, term_months, annual_interest_rate_decimal)
 
-        for month in range(1, term_months + 1):
+        if engine == CalculationEngine.cents:
+            principal_balances = LoanAmortizationCalculator.iterate_principal_balances_cents(
+                principal_loan_balance,
+                total_monthly_payment,
+                annual_interest_rate
+            )
+            principal_balance = next(islice(principal_balances, month - 1, None)) if month > 0 else LoanAmortizationCalculator.to_cents(principal_loan_balance)
+            return {
+                'month': month,
+                'remaining_balance': Decimal(principal_balance).scaleb(-2),
+                'monthly_payment': total_monthly_payment,
+            }
 
-            monthly_principal_payment = LoanAmortizationCalculator.calculate_monthly_principal_payment(
+        for _ in range(month):
+            if principal_balance == 0:
+                break
+
+            principal_balance = LoanAmortizationCalculator.calculate_next_principal_balance(
                 total_monthly_payment,
                 principal_balance,
                 annual_interest_rate_decimal
             )
 
-            new_principal_balance = principal_balance - monthly_principal_payment
+        return {
+            'month': month,
+            'remaining_balance': principal_balance,
+            'monthly_payment': total_monthly_payment,
+        }
+
+    @staticmethod
+    @timed_calculation
+    def iterate_loan_schedule(
+        principal_loan_balance: Decimal,
+        term_months: int,
+        annual_interest_rate: Decimal,
+        engine: CalculationEngine = CalculationEngine.decimal
+    ) -> Iterator[LoanSchedule]:
+        """Calculates the loan amortization schedule one month at a time.
+        Memory stays constant no matter how long the term is.
+        `engine` selects Decimal or integer-cents arithmetic, both give the same schedule.
 
-            if new_principal_balance < monthly_principal_payment:
-                monthly_principal_payment += new_principal_balance
-                new_principal_balance = 0
+        Yields
+        ------
+        LoanSchedule
+            {
+                month: n
+                remaining_balance: $xxxx (remaining principal balance),
+                monthly_payment: $xxx (total payment = principal_due + interest_payment)
+            }
+        """
+        annual_interest_rate_decimal = annual_interest_rate / 100
+        principal_balance = principal_loan_balance
+        total_monthly_payment = LoanAmortizationCalculator.calculate_total_monthly_payment(principal_loan_balance, term_months, annual_interest_rate_decimal)
 
-            results.append(
-                {
+        if engine == CalculationEngine.cents:
+            principal_balances = LoanAmortizationCalculator.iterate_principal_balances_cents(
+                principal_loan_balance,
+                total_monthly_payment,
+                annual_interest_rate
+            )
+            for month, principal_balance in zip(range(1, term_months + 1), principal_balances):
+                yield {
                     'month': month,
-                    'remaining_balance': new_principal_balance,
+                    'remaining_balance': Decimal(principal_balance).scaleb(-2),
                     'monthly_payment': total_monthly_payment,
                 }
+            return
+
+        for month in range(1, term_months + 1):
+
+            new_principal_balance = LoanAmortizationCalculator.calculate_next_principal_balance(
+                total_monthly_payment,
+                principal_balance,
+                annual_interest_rate_decimal
             )
+
+            yield {
+                'month': month,
+                'remaining_balance': new_principal_balance,
+                'monthly_payment': total_monthly_payment,
+            }
             principal_balance = new_principal_balance
-        return results
 
     @staticmethod
+    @timed_calculation
+    def calculate_loan_schedule(
+        principal_loan_balance: Decimal,
+        term_months: int,
+        annual_interest_rate: Decimal,
+        engine: CalculationEngine = CalculationEngine.decimal
+    ) -> List[LoanSchedule]:
+        """Calculates the loan amortization schedule
+        `engine` selects Decimal or integer-cents arithmetic, both give the same schedule.
+
+        Returns
+        -------
+        List[LoanSchedule]
+            [
+                {
+                    month: n
+                    remaining_balance: $xxxx (remaining principal balance),
+                    monthly_payment: $xxx (total payment = principal_due + interest_payment)
+                },
+                ...
+            ]
+        """
+        return list(LoanAmortizationCalculator.iterate_loan_schedule(
+            principal_loan_balance,
+            term_months,
+            annual_interest_rate,
+            engine
+        ))
+
+    @staticmethod
+    @timed_calculation
     def calculate_loan_summary(
         loan_amount: Decimal,
         loan_schedule: LoanSchedule
@@ -193,4 +421,57 @@ class LoanAmortizationCalculator():
             'current_principal_balance': loan_schedule['remaining_balance'],
             'total_principal_paid': total_principal_paid,
             'total_interest_paid': total_interest_paid
-        }
\ No newline at end of file
+        }
+
+    @staticmethod
+    @timed_calculation
+    def calculate_loan_summaries(
+        loan_amount: Decimal,
+        loan_schedule: Iterable[LoanSchedule],
+        start_month: int,
+        end_month: int,
+        step: int = 1
+    ) -> List[MonthlyLoanSummary]:
+        """Calculates the loan summary of every `step`-th month from `start_month` to `end_month` (inclusive)
+        in a single pass over the schedule, keeping running totals of the principal and payments.
+        Each summary matches `calculate_loan_summary` for the same month.
+
+        `loan_schedule` must start at month 1 and may be a generator (ex. `iterate_loan_schedule`),
+        it is not read past `end_month`.
+
+        Returns
+        -------
+        List[MonthlyLoanSummary]
+            [
+                {
+                    month: n
+                    current_principal_balance: Current principal balance at month n
+                    total_principal_paid: The aggregate amount of principal paid by month n
+                    total_interest_paid: The aggregate amount of interest paid by month n
+                },
+                ...
+            ]
+        """
+        loan_summaries = []
+        principal_balance = loan_amount
+        total_principal_paid = Decimal(0)
+        total_paid = Decimal(0)
+
+        for row in loan_schedule:
+            month = row['month']
+            if month > end_month:
+                break
+
+            total_principal_paid += principal_balance - row['remaining_balance']
+            total_paid += row['monthly_payment']
+            principal_balance = row['remaining_balance']
+
+            if month >= start_month and (month - start_month) % step == 0:
+                loan_summaries.append({
+                    'month': month,
+                    'current_principal_balance': principal_balance,
+                    'total_principal_paid': round(total_principal_paid, 2),
+                    'total_interest_paid': round(total_paid - total_principal_paid, 2)
+                })
+
+        return loan_summaries
\ No newline at end of file
@@ -0,0 +1,195 @@
+import os
+from collections import OrderedDict
+from decimal import Decimal
+from threading import Lock
+from typing import Dict, List, NamedTuple, Sequence, Tuple
+from src.sqlmodel.models.loan_schedule import LoanSchedule
+from src.utils.loan_amortization_calculation import CalculationEngine, LoanAmortizationCalculator
+
+DEFAULT_LOAN_SCHEDULE_CACHE_SIZE = 1024
+
+class CachedLoanSchedule(NamedTuple):
+    '''
+    Immutable, compact form of a loan schedule.
+    The monthly payment is the same every month, so only the remaining balances are stored per month.
+    '''
+    monthly_payment: Decimal
+    remaining_balances: Tuple[Decimal, ...]
+
+    def to_loan_schedule(self) -> List[LoanSchedule]:
+        """Expands the cached schedule into a new list, safe for the caller to modify
+
+        Returns
+        -------
+        List[LoanSchedule]
+        """
+        return [
+            {
+                'month': month,
+                'remaining_balance': remaining_balance,
+                'monthly_payment': self.monthly_payment,
+            }
+            for month, remaining_balance in enumerate(self.remaining_balances, start=1)
+        ]
+
+    def to_columns(self) -> Dict[str, Sequence]:
+        """Returns the cached schedule by column, without building a row per month
+
+        Returns
+        -------
+        Dict[str, Sequence]
+            { month: [...], remaining_balance: [...], monthly_payment: [...] }
+        """
+        return {
+            'month': range(1, len(self.remaining_balances) + 1),
+            'remaining_balance': self.remaining_balances,
+            'monthly_payment': [self.monthly_payment] * len(self.remaining_balances),
+        }
+
+    def loan_schedule_for_month(self, month: int) -> LoanSchedule:
+        """Returns the schedule entry of a single month
+
+        Returns
+        -------
+        LoanSchedule
+        """
+        return {
+            'month': month,
+            'remaining_balance': self.remaining_balances[month - 1],
+            'monthly_payment': self.monthly_payment,
+        }
+
+
+class LoanScheduleCache():
+    '''
+    Process-wide cache of loan schedules keyed by loan terms: (loan_amount, loan_term_months, annual_interest_rate).
+    A schedule only depends on these terms, so loans with identical terms share an entry.
+    The least recently used entry is evicted once `max_size` entries are stored.
+    Schedules are calculated with `engine` (see CalculationEngine), every engine gives the same schedule.
+
+    Methods
+    -------
+    get_loan_schedule(principal_loan_balance, term_months, annual_interest_rate)
+        Returns the cached schedule, calculating and storing it on a miss
+    get_loan_schedule_for_month(principal_loan_balance, term_months, annual_interest_rate, month)
+        Returns a single month from the cached schedule, calculating only that month on a miss
+    stats()
+        Returns the hit/miss/eviction counters
+    clear()
+        Removes every entry and resets the counters
+    '''
+
+    def __init__(self, max_size: int = DEFAULT_LOAN_SCHEDULE_CACHE_SIZE, engine: CalculationEngine = CalculationEngine.decimal):
+        self.max_size = max_size
+        self.engine = engine
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _lookup(self, key: tuple):
+        with self._lock:
+            cached_loan_schedule = self._entries.get(key)
+            if cached_loan_schedule is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self._entries.move_to_end(key)
+            return cached_loan_schedule
+
+    def _store(self, key: tuple, cached_loan_schedule: CachedLoanSchedule):
+        with self._lock:
+            self._entries[key] = cached_loan_schedule
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def get_loan_schedule(
+        self,
+        principal_loan_balance: Decimal,
+        term_months: int,
+        annual_interest_rate: Decimal
+    ) -> CachedLoanSchedule:
+        """Returns the loan schedule for the given terms, calculating and storing it on a miss
+
+        Returns
+        -------
+        CachedLoanSchedule
+        """
+        key = (principal_loan_balance, term_months, annual_interest_rate)
+        cached_loan_schedule = self._lookup(key)
+
+        if cached_loan_schedule is None:
+            loan_schedule = LoanAmortizationCalculator.calculate_loan_schedule(
+                principal_loan_balance,
+                term_months,
+                annual_interest_rate,
+                self.engine
+            )
+            cached_loan_schedule = CachedLoanSchedule(
+                monthly_payment=loan_schedule[0]['monthly_payment'] if loan_schedule else Decimal(0),
+                remaining_balances=tuple(row['remaining_balance'] for row in loan_schedule)
+            )
+            self._store(key, cached_loan_schedule)
+
+        return cached_loan_schedule
+
+    def get_loan_schedule_for_month(
+        self,
+        principal_loan_balance: Decimal,
+        term_months: int,
+        annual_interest_rate: Decimal,
+        month: int
+    ) -> LoanSchedule:
+        """Returns a single month of the loan schedule for the given terms.
+        On a miss only that month is calculated and nothing is stored, since a full schedule
+        would cost more than the lookup itself.
+
+        Returns
+        -------
+        LoanSchedule
+        """
+        key = (principal_loan_balance, term_months, annual_interest_rate)
+        cached_loan_schedule = self._lookup(key)
+
+        if cached_loan_schedule is None:
+            return LoanAmortizationCalculator.calculate_loan_schedule_for_month(
+                principal_loan_balance,
+                term_months,
+                annual_interest_rate,
+                month,
+                self.engine
+            )
+
+        return cached_loan_schedule.loan_schedule_for_month(month)
+
+    def stats(self) -> Dict[str, int]:
+        """Returns the cache counters
+
+        Returns
+        -------
+        Dict[str, int]
+            { size, max_size, hits, misses, evictions }
+        """
+        with self._lock:
+            return {
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+            }
+
+    def clear(self):
+        """Removes every entry and resets the counters"""
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+
+
+# CALCULATION_ENGINE=cents moves the application's schedules to the integer-cents engine
+loan_schedule_cache = LoanScheduleCache(engine=CalculationEngine(os.environ.get("CALCULATION_ENGINE", CalculationEngine.decimal.value)))
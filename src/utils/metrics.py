@@ -0,0 +1,237 @@
+import inspect
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from functools import wraps
+from threading import Lock
+from typing import Callable, Dict, List, Optional, Tuple
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Low-overhead request metrics exposed in the Prometheus text format
+# Per request, MetricsMiddleware records the latency, the number of SQL statements and the time spent in the database
+# (hooked into the engines by `instrument_engine`) and the time spent in LoanAmortizationCalculator (`timed_calculation`).
+# Counters for the current request live in a ContextVar, so the hooks never take a lock; the registry only locks once per request.
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SQL_STATEMENT_BUCKETS = (0, 1, 2, 3, 5, 10, 25, 50, 100)
+
+class Histogram():
+    '''
+    Cumulative histogram with fixed bucket upper bounds, as defined by Prometheus.
+    Not thread-safe on its own, MetricsRegistry guards it.
+    '''
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def render(self, name: str, labels: str) -> List[str]:
+        """Renders the histogram as Prometheus text lines
+
+        Returns
+        -------
+        List[str]
+        """
+        lines = []
+        cumulative = 0
+        for bucket, count in zip(self.buckets, self.counts):
+            cumulative += count
+            lines.append(f'{name}_bucket{{{labels},le="{bucket}"}} {cumulative}')
+        lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {self.count}')
+        lines.append(f'{name}_sum{{{labels}}} {self.sum}')
+        lines.append(f'{name}_count{{{labels}}} {self.count}')
+        return lines
+
+
+class RequestMetrics():
+    '''
+    Counters for a single request, filled by the SQL and calculator hooks
+    '''
+    __slots__ = ('sql_statements', 'db_seconds', 'calculator_seconds', 'calculator_depth')
+
+    def __init__(self):
+        self.sql_statements = 0
+        self.db_seconds = 0.0
+        self.calculator_seconds = 0.0
+        self.calculator_depth = 0
+
+
+current_request_metrics: ContextVar[Optional[RequestMetrics]] = ContextVar("current_request_metrics", default=None)
+
+HISTOGRAMS = {
+    'http_request_duration_seconds': ("Request latency in seconds", LATENCY_BUCKETS),
+    'http_request_sql_statements': ("SQL statements executed per request", SQL_STATEMENT_BUCKETS),
+    'http_request_db_duration_seconds': ("Time spent executing SQL per request in seconds", LATENCY_BUCKETS),
+    'http_request_calculator_duration_seconds': ("Time spent in LoanAmortizationCalculator per request in seconds", LATENCY_BUCKETS),
+}
+
+class MetricsRegistry():
+    '''
+    Per-route histograms of every request recorded by MetricsMiddleware
+
+    Methods
+    -------
+    record(method, route, status_code, duration_seconds, request_metrics)
+        Adds a finished request to the histograms
+    render(gauges)
+        Returns every metric in the Prometheus text format
+    '''
+
+    def __init__(self):
+        self._lock = Lock()
+        self._histograms: Dict[str, Dict[str, Histogram]] = {name: {} for name in HISTOGRAMS}
+
+    def _observe(self, name: str, labels: str, value: float):
+        histograms = self._histograms[name]
+        histogram = histograms.get(labels)
+        if histogram is None:
+            histogram = histograms[labels] = Histogram(HISTOGRAMS[name][1])
+        histogram.observe(value)
+
+    def record(
+        self,
+        method: str,
+        route: str,
+        status_code: int,
+        duration_seconds: float,
+        request_metrics: RequestMetrics
+    ):
+        route_labels = f'method="{method}",route="{route}"'
+        with self._lock:
+            self._observe('http_request_duration_seconds', f'{route_labels},status="{status_code}"', duration_seconds)
+            self._observe('http_request_sql_statements', route_labels, request_metrics.sql_statements)
+            self._observe('http_request_db_duration_seconds', route_labels, request_metrics.db_seconds)
+            self._observe('http_request_calculator_duration_seconds', route_labels, request_metrics.calculator_seconds)
+
+    def render(self, gauges: Optional[Dict[str, Tuple[str, float]]] = None) -> str:
+        """Renders every histogram, plus the given gauges ({ name: (help, value) }), in the Prometheus text format
+
+        Returns
+        -------
+        str
+        """
+        lines = []
+        with self._lock:
+            for name, (description, _) in HISTOGRAMS.items():
+                lines.append(f"# HELP {name} {description}")
+                lines.append(f"# TYPE {name} histogram")
+                for labels, histogram in sorted(self._histograms[name].items()):
+                    lines.extend(histogram.render(name, labels))
+
+        for name, (description, value) in (gauges or {}).items():
+            lines.append(f"# HELP {name} {description}")
+            lines.append(f"# TYPE {name} {'counter' if name.endswith('_total') else 'gauge'}")
+            lines.append(f"{name} {value}")
+
+        return "\n".join(lines) + "\n"
+
+    def clear(self):
+        with self._lock:
+            self._histograms = {name: {} for name in HISTOGRAMS}
+
+
+metrics_registry = MetricsRegistry()
+
+class MetricsMiddleware():
+    '''
+    ASGI middleware recording every HTTP request in a MetricsRegistry.
+    Requests are labelled by their route template (ex. /loans/schedule/), never the raw path, to keep the number of series bounded.
+    '''
+
+    def __init__(self, app, registry: MetricsRegistry = metrics_registry):
+        self.app = app
+        self.registry = registry
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_metrics = RequestMetrics()
+        token = current_request_metrics.set(request_metrics)
+        status_code = 500
+        start = time.perf_counter()
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            duration_seconds = time.perf_counter() - start
+            current_request_metrics.reset(token)
+            route = scope.get("route")
+            self.registry.record(
+                scope["method"],
+                route.path if route is not None else "unmatched",
+                status_code,
+                duration_seconds,
+                request_metrics
+            )
+
+def instrument_engine(engine: Engine):
+    """Counts SQL statements and database time of the current request on every statement the engine executes"""
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if current_request_metrics.get() is not None:
+            conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        request_metrics = current_request_metrics.get()
+        if request_metrics is not None and conn.info.get("query_start"):
+            request_metrics.sql_statements += 1
+            request_metrics.db_seconds += time.perf_counter() - conn.info["query_start"].pop()
+
+def timed_calculation(function: Callable) -> Callable:
+    """Decorator adding the time spent in `function` to the current request's calculator time.
+    Nested timed calls are only counted once, by the outermost call. Generator functions are timed per item.
+    """
+    def start() -> Optional[RequestMetrics]:
+        request_metrics = current_request_metrics.get()
+        if request_metrics is not None:
+            request_metrics.calculator_depth += 1
+        return request_metrics
+
+    def stop(request_metrics: Optional[RequestMetrics], started: float):
+        if request_metrics is not None:
+            request_metrics.calculator_depth -= 1
+            if request_metrics.calculator_depth == 0:
+                request_metrics.calculator_seconds += time.perf_counter() - started
+
+    if inspect.isgeneratorfunction(function):
+        @wraps(function)
+        def timed_generator(*args, **kwargs):
+            iterator = function(*args, **kwargs)
+            while True:
+                request_metrics = start()
+                started = time.perf_counter()
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    return
+                finally:
+                    stop(request_metrics, started)
+                yield item
+        return timed_generator
+
+    @wraps(function)
+    def timed_function(*args, **kwargs):
+        request_metrics = start()
+        started = time.perf_counter()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            stop(request_metrics, started)
+    return timed_function
@@ -0,0 +1,136 @@
+from bisect import bisect_left
+from decimal import Decimal
+from typing import Callable, NamedTuple, Optional, Union
+import numpy as np
+from src.sqlmodel.models.payoff_threshold import ThresholdMetric
+from src.utils.loan_schedule_cache import CachedLoanSchedule
+
+class CentsLoanSchedule(NamedTuple):
+    '''
+    Schedule of a loan in integer cents, ex. a row of a `BatchLoanSchedule`.
+    It has the fields of `CachedLoanSchedule`, so the calculator accepts either one.
+    '''
+    monthly_payment: int
+    remaining_balances: np.ndarray
+
+class PayoffThresholdCalculator():
+    '''
+    The PayoffThresholdCalculator finds the first month a loan crosses a threshold,
+    ex. "in which month does the balance first drop below $X?"
+
+    Any month's balance, principal paid and interest paid can be read in O(1) from the schedule,
+    and each of them only moves in one direction, so the month is found by binary search in O(log n)
+    instead of scanning the schedule.
+
+    Money is in Decimal dollars with a `CachedLoanSchedule` and in integer cents with a `CentsLoanSchedule`.
+    The loan amount and the threshold must be in the same unit as the schedule.
+
+    Methods
+    -------
+    get_metric_value(loan_amount, loan_schedule, metric, month)
+        Calculates the balance, aggregate principal paid or aggregate interest paid at a month
+    get_payoff_month(loan_schedule)
+        Finds the first month the remaining balance is 0
+    find_threshold_month(loan_amount, loan_schedule, metric, threshold)
+        Finds the first month the metric crosses the threshold
+    '''
+
+    @staticmethod
+    def get_metric_value(
+        loan_amount: Union[Decimal, int],
+        loan_schedule: Union[CachedLoanSchedule, CentsLoanSchedule],
+        metric: ThresholdMetric,
+        month: int
+    ) -> Union[Decimal, int]:
+        """Calculates the metric at `month` (0 is before the first payment), with the same formulas
+        as `LoanAmortizationCalculator.calculate_loan_summary`
+
+        Returns
+        -------
+        Union[Decimal, int]
+            in the unit of the schedule
+        """
+        remaining_balance = loan_schedule.remaining_balances[month - 1] if month > 0 else loan_amount
+        if metric == ThresholdMetric.remaining_balance:
+            return remaining_balance
+
+        total_principal_paid = round(loan_amount - remaining_balance, 2)
+        if metric == ThresholdMetric.total_principal_paid:
+            return total_principal_paid
+        return round(loan_schedule.monthly_payment * month - total_principal_paid, 2)
+
+    @staticmethod
+    def get_payoff_month(
+        loan_schedule: Union[CachedLoanSchedule, CentsLoanSchedule]
+    ) -> Optional[int]:
+        """Finds the first month the remaining balance is 0. Balances never increase, so this is a binary search
+
+        Returns
+        -------
+        Optional[int]
+            the payoff month, None if a balance is left at the end of the term
+        """
+        index = bisect_left(loan_schedule.remaining_balances, True, key=lambda remaining_balance: remaining_balance == 0)
+        return index + 1 if index < len(loan_schedule.remaining_balances) else None
+
+    @staticmethod
+    def find_first_month(
+        is_reached: Callable[[int], bool],
+        first_month: int,
+        last_month: int
+    ) -> Optional[int]:
+        """Binary search for the first month in [first_month, last_month] where `is_reached` is True.
+        `is_reached` must stay True once it is True
+
+        Returns
+        -------
+        Optional[int]
+            None if `is_reached` is False for every month
+        """
+        low, high = first_month, last_month + 1
+        while low < high:
+            middle = (low + high) // 2
+            if is_reached(middle):
+                high = middle
+            else:
+                low = middle + 1
+        return low if low <= last_month else None
+
+    @staticmethod
+    def find_threshold_month(
+        loan_amount: Union[Decimal, int],
+        loan_schedule: Union[CachedLoanSchedule, CentsLoanSchedule],
+        metric: ThresholdMetric,
+        threshold: Union[Decimal, int]
+    ) -> Optional[int]:
+        """Finds the first month the remaining balance is at or below `threshold`, or the aggregate principal
+        or interest paid is at or above `threshold`. Month 0 means the threshold is met before the first payment.
+
+        The balance and the principal paid are monotonic over the whole term. The interest paid is monotonic
+        before and after the payoff month, where the final payment can clear more than a regular principal payment,
+        so it is searched in those two ranges.
+
+        Returns
+        -------
+        Optional[int]
+            the month, None if the threshold is not met within the term
+        """
+        def get_metric_value(month: int) -> Union[Decimal, int]:
+            return PayoffThresholdCalculator.get_metric_value(loan_amount, loan_schedule, metric, month)
+
+        term_months = len(loan_schedule.remaining_balances)
+
+        if metric == ThresholdMetric.remaining_balance:
+            return PayoffThresholdCalculator.find_first_month(lambda month: get_metric_value(month) <= threshold, 0, term_months)
+
+        def is_reached(month: int) -> bool:
+            return get_metric_value(month) >= threshold
+
+        if metric == ThresholdMetric.total_principal_paid:
+            return PayoffThresholdCalculator.find_first_month(is_reached, 0, term_months)
+
+        payoff_month = PayoffThresholdCalculator.get_payoff_month(loan_schedule) or term_months + 1
+        month = PayoffThresholdCalculator.find_first_month(is_reached, 0, payoff_month - 1)
+        if month is None:
+            month = PayoffThresholdCalculator.find_first_month(is_reached, payoff_month, term_months)
+        return month
@@ -0,0 +1,170 @@
+from decimal import Decimal
+from typing import Dict, Optional, Sequence, Tuple
+from src.sqlmodel.models.prepayment import ExtraPayment, PrepaymentSummary
+from src.utils.loan_amortization_calculation import LoanAmortizationCalculator
+from src.utils.loan_schedule_cache import CachedLoanSchedule
+from src.utils.metrics import timed_calculation
+
+class PrepaymentCalculator():
+    '''
+    The PrepaymentCalculator answers what-if questions about extra principal payments,
+    ex. "payoff month and interest saved if I add $X from month K".
+
+    The total monthly payment stays the same, extra payments only shorten the loan. Interest is counted as in
+    `LoanAmortizationCalculator.calculate_loan_summary`: every regular payment until the loan is paid off, minus
+    the principal it retired. In the final month the whole payment is counted, so the totals match /loans/summary/
+    at the payoff month.
+
+    Every month before the first extra payment is identical to the regular schedule, so a scenario starts
+    from the cached balance of the month before its first extra payment and only the following months are recalculated.
+
+    Methods
+    -------
+    get_extra_payments_by_month(extra_payments, term_months)
+        Expands one-time and recurring extra payments to { month: amount }
+    calculate_baseline(loan_amount, loan_schedule)
+        Calculates the payoff month and total interest of the regular schedule
+    calculate_prepayment_summary(loan_amount, annual_interest_rate, loan_schedule, extra_payments, baseline=None)
+        Calculates the payoff month and interest saved of a scenario
+    '''
+
+    @staticmethod
+    def get_extra_payments_by_month(
+        extra_payments: Sequence[ExtraPayment],
+        term_months: int
+    ) -> Dict[int, Decimal]:
+        """Expands one-time and recurring extra payments to the total extra payment of each month.
+        Recurring payments without an end_month are paid until the end of the term.
+
+        Returns
+        -------
+        Dict[int, Decimal]
+            { month: extra payment }
+        """
+        extra_payments_by_month: Dict[int, Decimal] = {}
+        for extra_payment in extra_payments:
+            if extra_payment.recurring:
+                end_month = extra_payment.end_month or term_months
+            else:
+                end_month = extra_payment.month
+
+            for month in range(extra_payment.month, min(end_month, term_months) + 1):
+                extra_payments_by_month[month] = extra_payments_by_month.get(month, Decimal(0)) + Decimal(str(extra_payment.amount))
+
+        return extra_payments_by_month
+
+    @staticmethod
+    def get_interest_paid_before_month(
+        loan_amount: Decimal,
+        loan_schedule: CachedLoanSchedule,
+        month: int
+    ) -> Decimal:
+        """Calculates the interest paid by the regular schedule before `month`, from the cached balances,
+        with the formula of `LoanAmortizationCalculator.calculate_loan_summary`:
+            Interest Paid = Total Monthly Payment x (Month - 1) - (Loan Amount - Remaining Balance)
+
+        Returns
+        -------
+        Decimal
+        """
+        principal_balance = loan_schedule.remaining_balances[month - 2] if month > 1 else loan_amount
+        return loan_schedule.monthly_payment * (month - 1) - (loan_amount - principal_balance)
+
+    @staticmethod
+    def calculate_baseline(
+        loan_amount: Decimal,
+        loan_schedule: CachedLoanSchedule
+    ) -> Tuple[int, Decimal]:
+        """Calculates the payoff month and the total interest of the regular schedule.
+        The total interest matches `LoanAmortizationCalculator.calculate_loan_summary` at the payoff month
+
+        Returns
+        -------
+        Tuple[int, Decimal]
+            (payoff month, total interest paid)
+        """
+        payoff_month = next(
+            (month for month, remaining_balance in enumerate(loan_schedule.remaining_balances, start=1) if remaining_balance == 0),
+            len(loan_schedule.remaining_balances)
+        )
+        total_interest_paid = PrepaymentCalculator.get_interest_paid_before_month(loan_amount, loan_schedule, payoff_month + 1)
+        return payoff_month, round(total_interest_paid, 2)
+
+    @staticmethod
+    @timed_calculation
+    def calculate_prepayment_summary(
+        loan_amount: Decimal,
+        annual_interest_rate: Decimal,
+        loan_schedule: CachedLoanSchedule,
+        extra_payments: Sequence[ExtraPayment],
+        baseline: Optional[Tuple[int, Decimal]] = None
+    ) -> PrepaymentSummary:
+        """Calculates the payoff month and the interest saved by a scenario of extra payments.
+        Each month, the extra payment is applied after the regular payment and is capped at the remaining balance.
+        Pass the result of `calculate_baseline` as `baseline` when running many scenarios on the same loan.
+
+        Returns
+        -------
+        PrepaymentSummary
+            {
+                payoff_month: month the loan is paid off
+                months_saved: months paid off before the regular schedule
+                total_interest_paid: The aggregate amount of interest paid until payoff
+                interest_saved: The interest saved compared to the regular schedule
+                total_extra_paid: The aggregate amount of extra payments actually applied
+            }
+        """
+        if baseline is None:
+            baseline = PrepaymentCalculator.calculate_baseline(loan_amount, loan_schedule)
+        baseline_payoff_month, baseline_total_interest_paid = baseline
+
+        term_months = len(loan_schedule.remaining_balances)
+        extra_payments_by_month = PrepaymentCalculator.get_extra_payments_by_month(extra_payments, term_months)
+        first_month = min(extra_payments_by_month, default=None)
+
+        # Extra payments after the payoff month change nothing
+        if first_month is None or first_month > baseline_payoff_month:
+            return {
+                'payoff_month': baseline_payoff_month,
+                'months_saved': 0,
+                'total_interest_paid': baseline_total_interest_paid,
+                'interest_saved': Decimal('0.00'),
+                'total_extra_paid': Decimal('0.00')
+            }
+
+        annual_interest_rate_decimal = annual_interest_rate / 100
+        total_monthly_payment = loan_schedule.monthly_payment
+        principal_balance = loan_schedule.remaining_balances[first_month - 2] if first_month > 1 else loan_amount
+        total_interest_paid = PrepaymentCalculator.get_interest_paid_before_month(loan_amount, loan_schedule, first_month)
+        total_extra_paid = Decimal(0)
+        payoff_month = term_months
+
+        for month in range(first_month, term_months + 1):
+            monthly_principal_payment = LoanAmortizationCalculator.calculate_monthly_principal_payment(
+                total_monthly_payment,
+                principal_balance,
+                annual_interest_rate_decimal
+            )
+            next_principal_balance = principal_balance - monthly_principal_payment
+            if next_principal_balance < monthly_principal_payment:
+                next_principal_balance = 0
+
+            # The part of the regular payment that did not retire principal is interest, including in the final month
+            total_interest_paid += total_monthly_payment - (principal_balance - next_principal_balance)
+            principal_balance = next_principal_balance
+
+            extra_payment = min(extra_payments_by_month.get(month, 0), principal_balance)
+            principal_balance -= extra_payment
+            total_extra_paid += extra_payment
+
+            if principal_balance == 0:
+                payoff_month = month
+                break
+
+        return {
+            'payoff_month': payoff_month,
+            'months_saved': baseline_payoff_month - payoff_month,
+            'total_interest_paid': round(total_interest_paid, 2),
+            'interest_saved': round(baseline_total_interest_paid - total_interest_paid, 2),
+            'total_extra_paid': round(total_extra_paid, 2)
+        }
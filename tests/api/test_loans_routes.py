@@ -1,9 +1,15 @@
+import json
+from decimal import Decimal
 from fastapi.testclient import TestClient
 from sqlmodel import Session, col, select
 from main import app
+from src.routers import loans as loans_router
 from src.db.initialize import engine
 from src.sqlmodel.models.loan import Loan
+from src.sqlmodel.models.loan_schedule import MaterializedLoanSchedule
+from src.sqlmodel.models.loan_share import LoanShare
 from src.sqlmodel.models.user import User
+from src.utils.loan_schedule_cache import loan_schedule_cache
 
 client = TestClient(app)
 
@@ -223,4 +229,1174 @@ def test_fetch_loan_summary():
 
         session.delete(user)  
         session.delete(loan)  
-        session.commit()
\ No newline at end of file
+        session.commit()
+
+def test_fetch_loan_summaries():
+    # Create a User
+    response = client.post(
+        "/signup/",
+        json={
+            "user_id": 1337,
+            "first_name": "John",
+            "last_name": "Wick",
+            "email": "johnwick@gmail.com",
+            "password": "123"
+        },
+    )
+    assert response.status_code == 200
+
+    # Create a Loan
+    response = client.post(
+        "/loans/create/",
+        json={
+            "user_id": 1337,
+            "loan_id": 999999,
+            "loan_amount": 30000.00,
+            "annual_interest_rate": 3,
+            "loan_term_months": 48
+        },
+    )
+    assert response.status_code == 200
+
+    # Fetch a range of loan summaries
+    response = client.get(
+        "/loans/summary/range/?loan_id=999999&start_month=2&end_month=12&step=5",
+    )
+    assert response.status_code == 200
+    assert [loan_summary["month"] for loan_summary in response.json()] == [2, 7, 12]
+    assert response.json()[0] == {
+        "month": 2,
+        "current_principal_balance": 28820.47,
+        "total_principal_paid": 1179.53,
+        "total_interest_paid": 148.53
+    }
+    for loan_summary in response.json():
+        assert loan_summary == {
+            "month": loan_summary["month"],
+            **client.get(f"/loans/summary/?loan_id=999999&month={loan_summary['month']}").json()
+        }
+
+    response = client.get(
+        "/loans/summary/range/?loan_id=999999",
+    )
+    assert len(response.json()) == 48
+
+    response = client.get(
+        "/loans/summary/range/?loan_id=999999&start_month=10&end_month=49",
+    )
+    assert response.status_code == 404
+    assert response.json() == {"detail": "Loan summary for months: 10 to 49 does not exist"}
+
+    # The test creates an actual user & loan inside our SQLite DB, so removing them after running test
+    # Would not do this in real application
+    with Session(engine) as session:
+        user = session.exec(select(User).where(col(User.user_id) == 1337)).one()
+        loan = session.exec(select(Loan).where(col(Loan.loan_id) == 999999)).one()
+
+        session.delete(loan)
+        session.delete(user)
+        session.commit()
+
+def test_loans_create_materialized_schedule():
+    # Create a User
+    response = client.post(
+        "/signup/",
+        json={
+            "user_id": 1337,
+            "first_name": "John",
+            "last_name": "Wick",
+            "email": "johnwick@gmail.com",
+            "password": "123"
+        },
+    )
+    assert response.status_code == 200
+
+    # Create a Loan and store its schedule
+    response = client.post(
+        "/loans/create/?materialize_schedule=true",
+        json={
+            "user_id": 1337,
+            "loan_id": 999999,
+            "loan_amount": 30000.00,
+            "annual_interest_rate": 3,
+            "loan_term_months": 48
+        },
+    )
+    assert response.status_code == 200
+
+    with Session(engine) as session:
+        statement = select(MaterializedLoanSchedule).where(col(MaterializedLoanSchedule.loan_id) == 999999)
+        assert len(session.exec(statement).all()) == 48
+
+    # Fetch loan schedule and summary from the stored rows
+    response = client.get(
+        "/loans/schedule/?loan_id=999999",
+    )
+    assert response.status_code == 200
+    assert len(response.json()) == 48
+    assert response.json()[1] == {
+        "month": 2,
+        "remaining_balance": "28820.47",
+        "monthly_payment": "664.03"
+    }
+
+    response = client.get(
+        "/loans/summary/?loan_id=999999&month=2",
+    )
+    assert response.status_code == 200
+    assert response.json() == {
+        "current_principal_balance": 28820.47,
+        "total_principal_paid": 1179.53,
+        "total_interest_paid": 148.53
+    }
+
+    # The test creates an actual user, loan & schedule inside our SQLite DB, so removing them after running test
+    # Would not do this in real application
+    with Session(engine) as session:
+        user = session.exec(select(User).where(col(User.user_id) == 1337)).one()
+        loan = session.exec(select(Loan).where(col(Loan.loan_id) == 999999)).one()
+        loan_schedule = session.exec(select(MaterializedLoanSchedule).where(col(MaterializedLoanSchedule.loan_id) == 999999)).all()
+
+        for row in loan_schedule:
+            session.delete(row)
+        session.delete(user)
+        session.delete(loan)
+        session.commit()
+
+def test_stream_loan_schedule():
+    # Create a User
+    response = client.post(
+        "/signup/",
+        json={
+            "user_id": 1337,
+            "first_name": "John",
+            "last_name": "Wick",
+            "email": "johnwick@gmail.com",
+            "password": "123"
+        },
+    )
+    assert response.status_code == 200
+
+    # Create a Loan
+    response = client.post(
+        "/loans/create/",
+        json={
+            "user_id": 1337,
+            "loan_id": 999999,
+            "loan_amount": 30000.00,
+            "annual_interest_rate": 3,
+            "loan_term_months": 480
+        },
+    )
+    assert response.status_code == 200
+
+    # Stream loan schedule as NDJSON
+    response = client.get(
+        "/loans/schedule/stream/?loan_id=999999",
+    )
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    lines = response.text.splitlines()
+    assert len(lines) == 480
+    assert json.loads(lines[0]) == client.get("/loans/schedule/?loan_id=999999").json()[0]
+
+    # Stream loan schedule as CSV
+    response = client.get(
+        "/loans/schedule/stream/?loan_id=999999&format=csv",
+    )
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/csv")
+    lines = response.text.splitlines()
+    assert len(lines) == 481
+    assert lines[0] == "month,remaining_balance,monthly_payment"
+    assert lines[480].startswith("480,0,")
+
+    # The test creates an actual user & loan inside our SQLite DB, so removing loan after running test
+    # Would not do this in real application
+    with Session(engine) as session:
+        user = session.exec(select(User).where(col(User.user_id) == 1337)).one()
+        loan = session.exec(select(Loan).where(col(Loan.loan_id) == 999999)).one()
+
+        session.delete(user)
+        session.delete(loan)
+        session.commit()
+
+def test_stream_loan_schedule_non_existent_loan():
+    response = client.get(
+        "/loans/schedule/stream/?loan_id=1234567890",
+    )
+    assert response.status_code == 404
+    assert response.json() == {"detail": "Loan schedule does not exist"}
+
+def test_loans_create_bulk():
+    # Create a User
+    response = client.post(
+        "/signup/",
+        json={
+            "user_id": 1337,
+            "first_name": "John",
+            "last_name": "Wick",
+            "email": "johnwick@gmail.com",
+            "password": "123"
+        },
+    )
+    assert response.status_code == 200
+
+    # Create Loans, one for a non-existent user and one with a duplicate loan_id
+    response = client.post(
+        "/loans/create/bulk/",
+        json=[
+            {"user_id": 1337, "loan_id": 999999, "loan_amount": 30000.00, "annual_interest_rate": 3, "loan_term_months": 48},
+            {"user_id": 109876654321, "loan_amount": 1000.00, "annual_interest_rate": 5, "loan_term_months": 12},
+            {"user_id": 1337, "loan_amount": 1000.00, "annual_interest_rate": 5, "loan_term_months": 12},
+            {"user_id": 1337, "loan_id": 999999, "loan_amount": 1000.00, "annual_interest_rate": 5, "loan_term_months": 12},
+        ],
+    )
+    assert response.status_code == 200
+    loan_ids = response.json()["loan_ids"]
+    assert loan_ids[0] == 999999
+    assert loan_ids[1] is None
+    assert loan_ids[2] is not None
+    assert loan_ids[3] is None
+    assert response.json()["errors"] == [
+        {"index": 1, "detail": "Cannot create Loan for non-existent user"},
+        {"index": 3, "detail": "Loan 999999 already exists"},
+    ]
+
+    response = client.get(
+        "/loans/all/?user_id=1337",
+    )
+    assert [loan["loan_id"] for loan in response.json()] == sorted([999999, loan_ids[2]])
+
+    # The test creates an actual user & loans inside our SQLite DB, so removing them after running test
+    # Would not do this in real application
+    with Session(engine) as session:
+        user = session.exec(select(User).where(col(User.user_id) == 1337)).one()
+        loans = session.exec(select(Loan).where(col(Loan.user_id) == 1337)).all()
+
+        for loan in loans:
+            session.delete(loan)
+        session.delete(user)
+        session.commit()
+
+def test_loans_create_bulk_reports_only_offending_rows(monkeypatch):
+    # Create a User
+    response = client.post(
+        "/signup/",
+        json={
+            "user_id": 1337,
+            "first_name": "John",
+            "last_name": "Wick",
+            "email": "johnwick@gmail.com",
+            "password": "123"
+        },
+    )
+    assert response.status_code == 200
+
+    # A concurrent request creates loan 999998 after the loan ids were checked, right before the insert
+    insert = loans_router.insert
+
+    def insert_after_concurrent_request(table):
+        monkeypatch.setattr(loans_router, "insert", insert)
+        with Session(engine) as session:
+            session.add(Loan(loan_id=999998, user_id=1337, loan_amount=Decimal('500.00'), annual_interest_rate=Decimal('2.00'), loan_term_months=6))
+            session.commit()
+        return insert(table)
+
+    monkeypatch.setattr(loans_router, "insert", insert_after_concurrent_request)
+
+    # Create Loans, one without an interest rate and one with the loan_id taken by the concurrent request
+    response = client.post(
+        "/loans/create/bulk/",
+        json=[
+            {"user_id": 1337, "loan_id": 999999, "loan_amount": 30000.00, "annual_interest_rate": 3, "loan_term_months": 48},
+            {"user_id": 1337, "loan_amount": 1000.00, "loan_term_months": 12},
+            {"user_id": 1337, "loan_id": 999998, "loan_amount": 1000.00, "annual_interest_rate": 5, "loan_term_months": 12},
+            {"user_id": 1337, "loan_id": 999997, "loan_amount": 1000.00, "annual_interest_rate": 5, "loan_term_months": 12},
+        ],
+    )
+    assert response.status_code == 200
+    assert response.json()["loan_ids"] == [999999, None, None, 999997]
+    assert response.json()["errors"] == [
+        {"index": 1, "detail": "Missing required fields: annual_interest_rate"},
+        {"index": 2, "detail": "Loan 999998 already exists"},
+    ]
+
+    response = client.get(
+        "/loans/all/?user_id=1337",
+    )
+    assert [loan["loan_id"] for loan in response.json()] == [999997, 999998, 999999]
+    assert response.json()[1]["loan_amount"] == "500.00"
+
+    # The test creates an actual user & loans inside our SQLite DB, so removing them after running test
+    # Would not do this in real application
+    with Session(engine) as session:
+        user = session.exec(select(User).where(col(User.user_id) == 1337)).one()
+        loans = session.exec(select(Loan).where(col(Loan.user_id) == 1337)).all()
+
+        for loan in loans:
+            session.delete(loan)
+        session.delete(user)
+        session.commit()
+
+def test_share_loan_same_user():
+    response = client.post(
+        "/loans/share/",
+        json={
+            "source_user_id": 1337,
+            "target_user_id": 1337,
+            "loan_id": 999999
+        },
+    )
+    assert response.status_code == 400
+    assert response.json() == {"detail": "Cannot share loan. Source and Target user are the same."}
+
+def test_share_loan_non_existent_user():
+    response = client.post(
+        "/loans/share/",
+        json={
+            "source_user_id": 109876654321,
+            "target_user_id": 1337,
+            "loan_id": 999999
+        },
+    )
+    assert response.status_code == 404
+    assert response.json() == {"detail": "Cannot share loan. Source user does not exist."}
+
+def test_share_loan():
+    # Create the source and target Users
+    for user_id, email in [(1337, "johnwick@gmail.com"), (1338, "helenwick@gmail.com")]:
+        response = client.post(
+            "/signup/",
+            json={
+                "user_id": user_id,
+                "first_name": "John",
+                "last_name": "Wick",
+                "email": email,
+                "password": "123"
+            },
+        )
+        assert response.status_code == 200
+
+    # Create a Loan
+    response = client.post(
+        "/loans/create/",
+        json={
+            "user_id": 1337,
+            "loan_id": 999999,
+            "loan_amount": 30000.00,
+            "annual_interest_rate": 3,
+            "loan_term_months": 48
+        },
+    )
+    assert response.status_code == 200
+
+    # Share the Loan, then share it again
+    response = client.post(
+        "/loans/share/",
+        json={
+            "source_user_id": 1337,
+            "target_user_id": 1338,
+            "loan_id": 999999
+        },
+    )
+    assert response.status_code == 200
+    assert response.json()["loan_id"] == 999999
+    assert response.json()["target_user_id"] == 1338
+
+    response = client.post(
+        "/loans/share/",
+        json={
+            "source_user_id": 1337,
+            "target_user_id": 1338,
+            "loan_id": 999999
+        },
+    )
+    assert response.status_code == 400
+    assert response.json() == {"detail": "Duplicate loan found. Source and Target Users are already sharing this loan"}
+
+    # The test creates actual users, a loan & a share inside our SQLite DB, so removing them after running test
+    # Would not do this in real application
+    with Session(engine) as session:
+        for loan_share in session.exec(select(LoanShare).where(col(LoanShare.loan_id) == 999999)).all():
+            session.delete(loan_share)
+        session.delete(session.exec(select(Loan).where(col(Loan.loan_id) == 999999)).one())
+        for user in session.exec(select(User).where(col(User.user_id).in_([1337, 1338]))).all():
+            session.delete(user)
+        session.commit()
+
+def test_fetch_all_user_loans_pagination():
+    # Create a User
+    response = client.post(
+        "/signup/",
+        json={
+            "user_id": 1337,
+            "first_name": "John",
+            "last_name": "Wick",
+            "email": "johnwick@gmail.com",
+            "password": "123"
+        },
+    )
+    assert response.status_code == 200
+
+    # A user without loans
+    response = client.get(
+        "/loans/all/?user_id=1337",
+    )
+    assert response.status_code == 200
+    assert response.json() == []
+
+    # Create Loans
+    response = client.post(
+        "/loans/create/bulk/",
+        json=[
+            {"user_id": 1337, "loan_id": loan_id, "loan_amount": 30000.00, "annual_interest_rate": 3, "loan_term_months": 48}
+            for loan_id in [999995, 999996, 999997, 999998, 999999]
+        ],
+    )
+    assert response.status_code == 200
+
+    # Page through the loans
+    response = client.get(
+        "/loans/all/?user_id=1337&limit=2",
+    )
+    assert response.status_code == 200
+    assert [loan["loan_id"] for loan in response.json()] == [999995, 999996]
+    assert response.json()[0] == {
+        "user_id": 1337,
+        "loan_id": 999995,
+        "loan_amount": "30000.00",
+        "annual_interest_rate": "3.00",
+        "loan_term_months": 48
+    }
+    assert response.headers["X-Next-Cursor"] == "999996"
+
+    response = client.get(
+        "/loans/all/?user_id=1337&limit=2&after_loan_id=999996",
+    )
+    assert [loan["loan_id"] for loan in response.json()] == [999997, 999998]
+
+    response = client.get(
+        "/loans/all/?user_id=1337&limit=2&after_loan_id=999998",
+    )
+    assert [loan["loan_id"] for loan in response.json()] == [999999]
+    assert "X-Next-Cursor" not in response.headers
+
+    # Only return some fields
+    response = client.get(
+        "/loans/all/?user_id=1337&limit=2&fields=loan_id&fields=loan_amount",
+    )
+    assert response.status_code == 200
+    assert response.json() == [
+        {"loan_id": 999995, "loan_amount": "30000.00"},
+        {"loan_id": 999996, "loan_amount": "30000.00"},
+    ]
+    assert response.headers["X-Next-Cursor"] == "999996"
+
+    response = client.get(
+        "/loans/all/?user_id=1337&fields=password",
+    )
+    assert response.status_code == 400
+
+    response = client.get(
+        "/loans/all/?user_id=1337&limit=100000",
+    )
+    assert response.status_code == 422
+
+    # The test creates an actual user & loans inside our SQLite DB, so removing them after running test
+    # Would not do this in real application
+    with Session(engine) as session:
+        for loan in session.exec(select(Loan).where(col(Loan.user_id) == 1337)).all():
+            session.delete(loan)
+        session.delete(session.exec(select(User).where(col(User.user_id) == 1337)).one())
+        session.commit()
+
+def test_fetch_all_accessible_user_loans():
+    # Create the source and target Users
+    for user_id, email in [(1337, "johnwick@gmail.com"), (1338, "helenwick@gmail.com")]:
+        response = client.post(
+            "/signup/",
+            json={
+                "user_id": user_id,
+                "first_name": "John",
+                "last_name": "Wick",
+                "email": email,
+                "password": "123"
+            },
+        )
+        assert response.status_code == 200
+
+    # Create a Loan for each User and share the first one with the second User
+    response = client.post(
+        "/loans/create/bulk/",
+        json=[
+            {"user_id": 1337, "loan_id": 999998, "loan_amount": 30000.00, "annual_interest_rate": 3, "loan_term_months": 48},
+            {"user_id": 1338, "loan_id": 999999, "loan_amount": 1000.00, "annual_interest_rate": 5, "loan_term_months": 12},
+        ],
+    )
+    assert response.status_code == 200
+
+    response = client.post(
+        "/loans/share/",
+        json={
+            "source_user_id": 1337,
+            "target_user_id": 1338,
+            "loan_id": 999998
+        },
+    )
+    assert response.status_code == 200
+
+    # Fetch owned and shared loans
+    response = client.get(
+        "/loans/accessible/?user_id=1338",
+    )
+    assert response.status_code == 200
+    assert response.json() == [
+        {
+            "loan_id": 999998,
+            "user_id": 1337,
+            "loan_amount": "30000.00",
+            "annual_interest_rate": "3.00",
+            "loan_term_months": 48,
+            "access_type": "shared"
+        },
+        {
+            "loan_id": 999999,
+            "user_id": 1338,
+            "loan_amount": "1000.00",
+            "annual_interest_rate": "5.00",
+            "loan_term_months": 12,
+            "access_type": "owned"
+        },
+    ]
+
+    response = client.get(
+        "/loans/accessible/?user_id=1337",
+    )
+    assert [(loan["loan_id"], loan["access_type"]) for loan in response.json()] == [(999998, "owned")]
+
+    # The test creates actual users, loans & a share inside our SQLite DB, so removing them after running test
+    # Would not do this in real application
+    with Session(engine) as session:
+        for loan_share in session.exec(select(LoanShare).where(col(LoanShare.loan_id) == 999998)).all():
+            session.delete(loan_share)
+        for loan in session.exec(select(Loan).where(col(Loan.loan_id).in_([999998, 999999]))).all():
+            session.delete(loan)
+        for user in session.exec(select(User).where(col(User.user_id).in_([1337, 1338]))).all():
+            session.delete(user)
+        session.commit()
+
+def test_fetch_all_accessible_user_loans_non_existent_user():
+    response = client.get(
+        "/loans/accessible/?user_id=109876654321",
+    )
+    assert response.status_code == 404
+    assert response.json() == {"detail": "Cannot fetch all loans. User does not exist."}
+
+def test_fetch_portfolio_summary():
+    # Create a User
+    response = client.post(
+        "/signup/",
+        json={
+            "user_id": 1337,
+            "first_name": "John",
+            "last_name": "Wick",
+            "email": "johnwick@gmail.com",
+            "password": "123"
+        },
+    )
+    assert response.status_code == 200
+
+    # Create Loans, the last one is paid off before month 24
+    response = client.post(
+        "/loans/create/bulk/",
+        json=[
+            {"user_id": 1337, "loan_id": 999999, "loan_amount": 30000.00, "annual_interest_rate": 3, "loan_term_months": 48},
+            {"user_id": 1337, "loan_id": 999998, "loan_amount": 250000.00, "annual_interest_rate": 6.5, "loan_term_months": 360},
+            {"user_id": 1337, "loan_id": 999997, "loan_amount": 1000.00, "annual_interest_rate": 5, "loan_term_months": 12},
+            {"user_id": 1337, "loan_id": 999996, "loan_amount": 1000.00, "annual_interest_rate": 0, "loan_term_months": 12},
+        ],
+    )
+    assert response.status_code == 200
+
+    response = client.get(
+        "/loans/portfolio/summary/?user_id=1337&month=24",
+    )
+    assert response.status_code == 200
+    portfolio_summary = response.json()
+    assert portfolio_summary["month"] == 24
+    assert portfolio_summary["loan_count"] == 3
+    # The loan at 0% has no schedule, it is reported and left out of the totals
+    assert portfolio_summary["errors"] == [{"loan_id": 999996, "detail": "Annual interest rate of 0.00%"}]
+    assert [loan["loan_id"] for loan in portfolio_summary["loans"]] == [999997, 999998, 999999]
+    assert [loan["month"] for loan in portfolio_summary["loans"]] == [12, 24, 24]
+
+    # Every loan matches its own summary, and the totals are their sums
+    totals = {"current_principal_balance": 0, "total_principal_paid": 0, "total_interest_paid": 0}
+    for loan in portfolio_summary["loans"]:
+        response = client.get(
+            f"/loans/summary/?loan_id={loan['loan_id']}&month={loan['month']}",
+        )
+        for key in totals:
+            assert Decimal(loan[key]) == round(Decimal(str(response.json()[key])), 2)
+            totals[key] += Decimal(loan[key])
+    for key, total in totals.items():
+        assert Decimal(portfolio_summary[key]) == total
+
+    response = client.get(
+        "/loans/portfolio/summary/?user_id=1337&month=0",
+    )
+    assert response.status_code == 404
+
+    response = client.get(
+        "/loans/portfolio/summary/?user_id=109876654321&month=1",
+    )
+    assert response.status_code == 404
+    assert response.json() == {"detail": "Cannot fetch portfolio summary. User does not exist."}
+
+    # The test creates an actual user & loans inside our SQLite DB, so removing them after running test
+    # Would not do this in real application
+    with Session(engine) as session:
+        user = session.exec(select(User).where(col(User.user_id) == 1337)).one()
+        loans = session.exec(select(Loan).where(col(Loan.user_id) == 1337)).all()
+
+        for loan in loans:
+            session.delete(loan)
+        session.delete(user)
+        session.commit()
+
+def test_calculate_prepayment_scenarios():
+    # Create a User
+    response = client.post(
+        "/signup/",
+        json={
+            "user_id": 1337,
+            "first_name": "John",
+            "last_name": "Wick",
+            "email": "johnwick@gmail.com",
+            "password": "123"
+        },
+    )
+    assert response.status_code == 200
+
+    # Create a Loan
+    response = client.post(
+        "/loans/create/",
+        json={
+            "user_id": 1337,
+            "loan_id": 999999,
+            "loan_amount": 30000.00,
+            "annual_interest_rate": 3,
+            "loan_term_months": 48
+        },
+    )
+    assert response.status_code == 200
+
+    # Run a scenario without extra payments, a recurring one and a one-time one
+    response = client.post(
+        "/loans/prepayment/scenarios/",
+        json={
+            "loan_id": 999999,
+            "scenarios": [
+                {"extra_payments": []},
+                {"extra_payments": [{"amount": 100, "month": 12, "recurring": True}]},
+                {"extra_payments": [{"amount": 5000, "month": 1}]},
+            ]
+        },
+    )
+    assert response.status_code == 200
+    result = response.json()
+    assert result["baseline_payoff_month"] == 48
+    assert result["scenarios"][0]["payoff_month"] == 48
+    # The baseline interest is the interest /loans/summary/ reports at the payoff month
+    summary = client.get("/loans/summary/?loan_id=999999&month=48").json()
+    assert Decimal(result["baseline_total_interest_paid"]) == Decimal(str(summary["total_interest_paid"]))
+    assert Decimal(result["scenarios"][0]["interest_saved"]) == 0
+    for prepayment_summary in result["scenarios"][1:]:
+        assert prepayment_summary["payoff_month"] < 48
+        assert prepayment_summary["months_saved"] == 48 - prepayment_summary["payoff_month"]
+        assert Decimal(prepayment_summary["interest_saved"]) > 0
+        assert Decimal(prepayment_summary["interest_saved"]) == Decimal(result["baseline_total_interest_paid"]) - Decimal(prepayment_summary["total_interest_paid"])
+
+    response = client.post(
+        "/loans/prepayment/scenarios/",
+        json={"loan_id": 109876654321, "scenarios": [{"extra_payments": []}]},
+    )
+    assert response.status_code == 404
+    assert response.json() == {"detail": "Cannot calculate prepayment scenarios. Loan does not exist."}
+
+    # The test creates an actual user & loan inside our SQLite DB, so removing them after running test
+    # Would not do this in real application
+    with Session(engine) as session:
+        user = session.exec(select(User).where(col(User.user_id) == 1337)).one()
+        loan = session.exec(select(Loan).where(col(Loan.loan_id) == 999999)).one()
+
+        session.delete(loan)
+        session.delete(user)
+        session.commit()
+
+def test_fetch_adjustable_rate_loan_schedule():
+    # Create a User
+    response = client.post(
+        "/signup/",
+        json={
+            "user_id": 1337,
+            "first_name": "John",
+            "last_name": "Wick",
+            "email": "johnwick@gmail.com",
+            "password": "123"
+        },
+    )
+    assert response.status_code == 200
+
+    # Create a Loan
+    response = client.post(
+        "/loans/create/",
+        json={
+            "user_id": 1337,
+            "loan_id": 999999,
+            "loan_amount": 30000.00,
+            "annual_interest_rate": 3,
+            "loan_term_months": 48
+        },
+    )
+    assert response.status_code == 200
+
+    # Without resets, the schedule is the fixed-rate schedule
+    response = client.post(
+        "/loans/schedule/adjustable/",
+        json={"loan_id": 999999, "rate_resets": []},
+    )
+    assert response.status_code == 200
+    assert response.json() == client.get("/loans/schedule/?loan_id=999999").json()
+
+    response = client.post(
+        "/loans/schedule/adjustable/",
+        json={"loan_id": 999999, "rate_resets": [{"effective_month": 13, "annual_interest_rate": 5.25}]},
+    )
+    assert response.status_code == 200
+    loan_schedule = response.json()
+    assert len(loan_schedule) == 48
+    assert loan_schedule[11]["monthly_payment"] == "664.03"
+    assert Decimal(loan_schedule[12]["monthly_payment"]) > Decimal("664.03")
+    assert Decimal(loan_schedule[-1]["remaining_balance"]) == 0
+
+    response = client.post(
+        "/loans/schedule/adjustable/",
+        json={"loan_id": 999999, "rate_resets": [{"effective_month": 49, "annual_interest_rate": 5.25}]},
+    )
+    assert response.status_code == 400
+    assert response.json() == {"detail": "Cannot calculate loan schedule. Rate reset at month 49 is past the loan term of 48 months"}
+
+    # The test creates an actual user & loan inside our SQLite DB, so removing them after running test
+    # Would not do this in real application
+    with Session(engine) as session:
+        user = session.exec(select(User).where(col(User.user_id) == 1337)).one()
+        loan = session.exec(select(Loan).where(col(Loan.loan_id) == 999999)).one()
+
+        session.delete(loan)
+        session.delete(user)
+        session.commit()
+
+def test_fetch_loan_schedules():
+    # Create a User
+    response = client.post(
+        "/signup/",
+        json={
+            "user_id": 1337,
+            "first_name": "John",
+            "last_name": "Wick",
+            "email": "johnwick@gmail.com",
+            "password": "123"
+        },
+    )
+    assert response.status_code == 200
+
+    # Create a Loan with a stored schedule and two Loans with identical terms
+    response = client.post(
+        "/loans/create/?materialize_schedule=true",
+        json={"user_id": 1337, "loan_id": 999999, "loan_amount": 30000.00, "annual_interest_rate": 3, "loan_term_months": 48},
+    )
+    assert response.status_code == 200
+    response = client.post(
+        "/loans/create/bulk/",
+        json=[
+            {"user_id": 1337, "loan_id": 999998, "loan_amount": 1000.00, "annual_interest_rate": 5, "loan_term_months": 12},
+            {"user_id": 1337, "loan_id": 999997, "loan_amount": 1000.00, "annual_interest_rate": 5, "loan_term_months": 12},
+        ],
+    )
+    assert response.status_code == 200
+
+    response = client.get(
+        "/loans/schedule/batch/?loan_ids=999999&loan_ids=999998&loan_ids=109876654321&loan_ids=999997&loan_ids=999998",
+    )
+    assert response.status_code == 200
+    schedules = response.json()["schedules"]
+    assert sorted(schedules) == ["999997", "999998", "999999"]
+    for loan_id, loan_schedule in schedules.items():
+        assert loan_schedule == client.get(f"/loans/schedule/?loan_id={loan_id}").json()
+    assert len(schedules["999999"]) == 48
+    assert response.json()["errors"] == [
+        {"loan_id": 109876654321, "detail": "Loan schedule does not exist"},
+    ]
+
+    response = client.get(
+        "/loans/schedule/batch/",
+    )
+    assert response.status_code == 422
+
+    # The test creates an actual user, loans & schedule inside our SQLite DB, so removing them after running test
+    # Would not do this in real application
+    with Session(engine) as session:
+        user = session.exec(select(User).where(col(User.user_id) == 1337)).one()
+        loans = session.exec(select(Loan).where(col(Loan.user_id) == 1337)).all()
+        loan_schedule = session.exec(select(MaterializedLoanSchedule).where(col(MaterializedLoanSchedule.loan_id) == 999999)).all()
+
+        for row in loan_schedule:
+            session.delete(row)
+        for loan in loans:
+            session.delete(loan)
+        session.delete(user)
+        session.commit()
+
+def test_loans_schedule_conditional_get():
+    # Create a User
+    response = client.post(
+        "/signup/",
+        json={
+            "user_id": 1337,
+            "first_name": "John",
+            "last_name": "Wick",
+            "email": "johnwick@gmail.com",
+            "password": "123"
+        },
+    )
+    assert response.status_code == 200
+
+    # Create a Loan
+    response = client.post(
+        "/loans/create/",
+        json={
+            "user_id": 1337,
+            "loan_id": 999999,
+            "loan_amount": 30000.00,
+            "annual_interest_rate": 3,
+            "loan_term_months": 48
+        },
+    )
+    assert response.status_code == 200
+
+    response = client.get(
+        "/loans/schedule/?loan_id=999999",
+    )
+    assert response.status_code == 200
+    assert response.headers["Cache-Control"] == "public, max-age=3600"
+    etag = response.headers["ETag"]
+
+    # A matching If-None-Match gets a 304 without calculating the schedule
+    loan_schedule_cache.clear()
+    response = client.get(
+        "/loans/schedule/?loan_id=999999",
+        headers={"If-None-Match": f'"stale", W/{etag}'},
+    )
+    assert response.status_code == 304
+    assert response.headers["ETag"] == etag
+    assert response.content == b""
+    assert loan_schedule_cache.stats()["misses"] == 0
+
+    response = client.get(
+        "/loans/summary/?loan_id=999999&month=2",
+    )
+    assert response.status_code == 200
+    summary_etag = response.headers["ETag"]
+    assert summary_etag != etag
+    assert client.get("/loans/summary/?loan_id=999999&month=3").headers["ETag"] != summary_etag
+
+    response = client.get(
+        "/loans/summary/?loan_id=999999&month=2",
+        headers={"If-None-Match": summary_etag},
+    )
+    assert response.status_code == 304
+
+    response = client.get(
+        "/loans/summary/?loan_id=999999&month=2",
+        headers={"If-None-Match": '"stale"'},
+    )
+    assert response.status_code == 200
+
+    # The test creates an actual user & loan inside our SQLite DB, so removing them after running test
+    # Would not do this in real application
+    with Session(engine) as session:
+        user = session.exec(select(User).where(col(User.user_id) == 1337)).one()
+        loan = session.exec(select(Loan).where(col(Loan.loan_id) == 999999)).one()
+
+        session.delete(loan)
+        session.delete(user)
+        session.commit()
+
+def test_loans_schedule_fast_encoding():
+    # Create a User
+    response = client.post(
+        "/signup/",
+        json={
+            "user_id": 1337,
+            "first_name": "John",
+            "last_name": "Wick",
+            "email": "johnwick@gmail.com",
+            "password": "123"
+        },
+    )
+    assert response.status_code == 200
+
+    # Create a Loan
+    response = client.post(
+        "/loans/create/",
+        json={
+            "user_id": 1337,
+            "loan_id": 999999,
+            "loan_amount": 30000.00,
+            "annual_interest_rate": 3,
+            "loan_term_months": 48
+        },
+    )
+    assert response.status_code == 200
+
+    loan_schedule = client.get("/loans/schedule/?loan_id=999999").json()
+
+    # Rows are the same as the default encoding, except that every amount has 2 decimal places
+    response = client.get(
+        "/loans/schedule/?loan_id=999999&layout=rows",
+    )
+    assert response.status_code == 200
+    assert response.headers["Content-Type"] == "application/json"
+    assert [{**row, "remaining_balance": Decimal(row["remaining_balance"])} for row in response.json()] == [
+        {**row, "remaining_balance": Decimal(row["remaining_balance"])} for row in loan_schedule
+    ]
+    assert response.json()[-1]["remaining_balance"] == "0.00"
+
+    response = client.get(
+        "/loans/schedule/?loan_id=999999&layout=columns&money=cents",
+    )
+    assert response.status_code == 200
+    columns = response.json()
+    assert columns["month"] == list(range(1, 49))
+    assert columns["remaining_balance"][1] == 2882047
+    assert columns["monthly_payment"] == [66403] * 48
+
+    response = client.get(
+        "/loans/schedule/batch/?loan_ids=999999&loan_ids=109876654321&layout=columns",
+    )
+    assert response.status_code == 200
+    assert response.json()["schedules"]["999999"]["remaining_balance"][1] == "28820.47"
+    assert response.json()["errors"] == [{"loan_id": 109876654321, "detail": "Loan schedule does not exist"}]
+
+    response = client.get(
+        "/loans/summary/range/?loan_id=999999&start_month=2&end_month=2&layout=columns",
+    )
+    assert response.status_code == 200
+    assert response.json() == {
+        "month": [2],
+        "current_principal_balance": ["28820.47"],
+        "total_principal_paid": ["1179.53"],
+        "total_interest_paid": ["148.53"],
+    }
+
+    # The test creates an actual user & loan inside our SQLite DB, so removing them after running test
+    # Would not do this in real application
+    with Session(engine) as session:
+        user = session.exec(select(User).where(col(User.user_id) == 1337)).one()
+        loan = session.exec(select(Loan).where(col(Loan.loan_id) == 999999)).one()
+
+        session.delete(loan)
+        session.delete(user)
+        session.commit()
+
+def test_import_and_export_loans():
+    # Create a User
+    response = client.post(
+        "/signup/",
+        json={
+            "user_id": 1337,
+            "first_name": "John",
+            "last_name": "Wick",
+            "email": "johnwick@gmail.com",
+            "password": "123"
+        },
+    )
+    assert response.status_code == 200
+
+    # Import loans from CSV, one row is invalid
+    response = client.post(
+        "/loans/import/?format=csv",
+        content=(
+            "loan_id,user_id,loan_amount,annual_interest_rate,loan_term_months\n"
+            "999999,1337,30000.00,3.00,48\n"
+            "999998,1234567890,1000.00,5.00,12\n"
+            "999998,1337,1000.00,5.00,12\n"
+        ),
+    )
+    assert response.status_code == 200
+    assert response.json() == {
+        "imported": 2,
+        "error_count": 1,
+        "errors": [{"line": 2, "detail": "Cannot create Loan for non-existent user"}]
+    }
+
+    # Import a loan from NDJSON
+    response = client.post(
+        "/loans/import/",
+        content='{"loan_id": 999997, "user_id": 1337, "loan_amount": "2500.50", "annual_interest_rate": 7.25, "loan_term_months": 6}\n',
+    )
+    assert response.status_code == 200
+    assert response.json()["imported"] == 1
+
+    # Export the user's loans as CSV
+    response = client.get(
+        "/loans/export/?format=csv&user_id=1337",
+    )
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/csv")
+    assert response.text.splitlines() == [
+        "loan_id,user_id,loan_amount,annual_interest_rate,loan_term_months",
+        "999997,1337,2500.50,7.25,6",
+        "999998,1337,1000.00,5.00,12",
+        "999999,1337,30000.00,3.00,48",
+    ]
+
+    # A loan at 0% has no schedule, it is left out of the schedule export instead of failing it
+    response = client.post(
+        "/loans/create/",
+        json={
+            "user_id": 1337,
+            "loan_id": 999996,
+            "loan_amount": 1000.00,
+            "annual_interest_rate": 0,
+            "loan_term_months": 12
+        },
+    )
+    assert response.status_code == 200
+
+    response = client.get(
+        "/loans/schedule/export/?format=csv&user_id=1337",
+    )
+    assert response.status_code == 200
+    lines = response.text.splitlines()
+    assert lines[0] == "loan_id,month,remaining_balance,monthly_payment"
+    assert len(lines) == 1 + 6 + 12 + 48
+    assert not any(line.startswith("999996,") for line in lines)
+
+    # Export the user's loan schedules as NDJSON, they match /loans/schedule/
+    response = client.get(
+        "/loans/schedule/export/?user_id=1337",
+    )
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert len(lines) == 6 + 12 + 48
+    assert [
+        (line["month"], Decimal(line["remaining_balance"]), Decimal(line["monthly_payment"]))
+        for line in lines if line["loan_id"] == 999999
+    ] == [
+        (row["month"], Decimal(row["remaining_balance"]), Decimal(row["monthly_payment"]))
+        for row in client.get("/loans/schedule/?loan_id=999999").json()
+    ]
+
+    # The test creates an actual user & loan inside our SQLite DB, so removing them after running test
+    # Would not do this in real application
+    with Session(engine) as session:
+        user = session.exec(select(User).where(col(User.user_id) == 1337)).one()
+        loans = session.exec(select(Loan).where(col(Loan.user_id) == 1337)).all()
+
+        for loan in loans:
+            session.delete(loan)
+        session.delete(user)
+        session.commit()
+
+def test_find_payoff_threshold_months():
+    # Create a User
+    response = client.post(
+        "/signup/",
+        json={
+            "user_id": 1337,
+            "first_name": "John",
+            "last_name": "Wick",
+            "email": "johnwick@gmail.com",
+            "password": "123"
+        },
+    )
+    assert response.status_code == 200
+
+    # Create a Loan
+    response = client.post(
+        "/loans/create/",
+        json={
+            "user_id": 1337,
+            "loan_id": 999999,
+            "loan_amount": 30000.00,
+            "annual_interest_rate": 3,
+            "loan_term_months": 48
+        },
+    )
+    assert response.status_code == 200
+
+    # Create a Loan at 0%, which has no schedule
+    response = client.post(
+        "/loans/create/",
+        json={
+            "user_id": 1337,
+            "loan_id": 999998,
+            "loan_amount": 1000.00,
+            "annual_interest_rate": 0,
+            "loan_term_months": 12
+        },
+    )
+    assert response.status_code == 200
+
+    # Query several thresholds of the loan, one of a loan that does not exist and one of the loan at 0%
+    loan_schedule_cache.clear()
+    response = client.post(
+        "/loans/payoff/threshold/",
+        json={
+            "queries": [
+                {"loan_id": 999999, "threshold": 24000},
+                {"loan_id": 999999, "metric": "total_interest_paid", "threshold": 1000},
+                {"loan_id": 1234567890, "threshold": 24000},
+                {"loan_id": 999999, "metric": "total_principal_paid", "threshold": 40000},
+                {"loan_id": 999998, "threshold": 500},
+            ]
+        },
+    )
+    assert response.status_code == 200
+    result = response.json()
+    assert result["errors"] == [
+        {"index": 2, "detail": "Cannot find payoff threshold. Loan does not exist."},
+        {"index": 4, "detail": "Cannot find payoff threshold. Annual interest rate of 0.00%"},
+    ]
+    # The schedules are calculated locally, without filling the shared schedule cache
+    assert loan_schedule_cache.stats()['size'] == 0
+    assert result["results"][2] == {"loan_id": 999999, "metric": "total_principal_paid", "threshold": "40000", "month": None, "value": None}
+
+    # The month matches /loans/summary/: the first month at or below the threshold, the month before is above it
+    balance_result = result["results"][0]
+    assert balance_result["metric"] == "remaining_balance"
+    summary = client.get(f"/loans/summary/?loan_id=999999&month={balance_result['month']}").json()
+    assert Decimal(str(summary["current_principal_balance"])) == Decimal(balance_result["value"]) <= 24000
+    summary = client.get(f"/loans/summary/?loan_id=999999&month={balance_result['month'] - 1}").json()
+    assert Decimal(str(summary["current_principal_balance"])) > 24000
+
+    interest_result = result["results"][1]
+    summary = client.get(f"/loans/summary/?loan_id=999999&month={interest_result['month']}").json()
+    assert Decimal(str(summary["total_interest_paid"])) == Decimal(interest_result["value"]) >= 1000
+    summary = client.get(f"/loans/summary/?loan_id=999999&month={interest_result['month'] - 1}").json()
+    assert Decimal(str(summary["total_interest_paid"])) < 1000
+
+    # The test creates an actual user & loan inside our SQLite DB, so removing them after running test
+    # Would not do this in real application
+    with Session(engine) as session:
+        user = session.exec(select(User).where(col(User.user_id) == 1337)).one()
+        loans = session.exec(select(Loan).where(col(Loan.user_id) == 1337)).all()
+
+        for loan in loans:
+            session.delete(loan)
+        session.delete(user)
+        session.commit()
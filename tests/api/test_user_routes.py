@@ -12,6 +12,16 @@ def test_server():
     assert response.json() == "Welcome to the Greystone Loan Amortization App"
 
 
+def test_metrics():
+    client.get('/')
+    response = client.get('/metrics')
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert 'http_request_duration_seconds_count{method="GET",route="/",status="200"}' in response.text
+    assert 'http_request_sql_statements_count{method="GET",route="/"}' in response.text
+    assert "loan_schedule_cache_hits_total" in response.text
+
+
 def test_user_signup():
     response = client.post(
         "/signup/",
@@ -79,4 +89,43 @@ def test_signup_existing_user():
         user = results.one()
 
         session.delete(user)  
-        session.commit()
\ No newline at end of file
+        session.commit()
+
+def test_signup_existing_email():
+    # Create a user first
+    response = client.post(
+        "/signup/",
+        json={
+            "user_id": 101,
+            "first_name": "John",
+            "last_name": "Wick",
+            "email": "johnwick1@gmail.com",
+            "password": "123"
+        },
+    )
+    assert response.status_code == 200
+
+    # Create a different user with the same email
+    response = client.post(
+        "/signup/",
+        json={
+            "user_id": 102,
+            "first_name": "Jonathan",
+            "last_name": "Wick",
+            "email": "johnwick1@gmail.com",
+            "password": "456"
+        },
+    )
+    assert response.status_code == 409
+    assert response.json() == {"detail": "User already exists"}
+
+    # The test creates an actual user inside our SQLite DB, so removing user after running test
+    # Would not do this in real application
+    with Session(engine) as session:
+        statement = select(User).where(col(User.email) == "johnwick1@gmail.com")
+        results = session.exec(statement)
+
+        user = results.one()
+
+        session.delete(user)  
+        session.commit()
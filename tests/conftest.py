@@ -0,0 +1,14 @@
+import os
+
+# Tests run against the memory storage (a throwaway database file per test run), never the application's database.db.
+# Set before any test module imports src.db, which reads the settings on import
+os.environ.setdefault("DATABASE_STORAGE", "memory")
+
+import pytest
+
+@pytest.fixture(scope="session", autouse=True)
+def database():
+    from src.db.initialize import create_db_and_tables
+
+    create_db_and_tables()
+    yield
@@ -0,0 +1,103 @@
+from decimal import Decimal
+import pytest
+from src.sqlmodel.models.rate_reset import RateReset
+from src.utils.adjustable_rate_calculation import AdjustableRateLoanCalculator
+from src.utils.loan_amortization_calculation import LoanAmortizationCalculator
+
+class TestAdjustableRateLoanCalculator:
+
+    principal_loan_balance = Decimal('250000.00')
+    term_months = 360
+    annual_interest_rate = Decimal('6.50')
+
+    def test_calculate_loan_schedule_without_resets(self):
+        assert AdjustableRateLoanCalculator.calculate_loan_schedule(
+            TestAdjustableRateLoanCalculator.principal_loan_balance,
+            TestAdjustableRateLoanCalculator.term_months,
+            TestAdjustableRateLoanCalculator.annual_interest_rate,
+            []
+        ) == LoanAmortizationCalculator.calculate_loan_schedule(
+            TestAdjustableRateLoanCalculator.principal_loan_balance,
+            TestAdjustableRateLoanCalculator.term_months,
+            TestAdjustableRateLoanCalculator.annual_interest_rate
+        )
+
+    def test_calculate_loan_schedule_with_resets(self):
+        loan_schedule = AdjustableRateLoanCalculator.calculate_loan_schedule(
+            TestAdjustableRateLoanCalculator.principal_loan_balance,
+            TestAdjustableRateLoanCalculator.term_months,
+            TestAdjustableRateLoanCalculator.annual_interest_rate,
+            [RateReset(effective_month=121, annual_interest_rate=Decimal('8.25')), RateReset(effective_month=61, annual_interest_rate=Decimal('7.00'))]
+        )
+
+        assert len(loan_schedule) == 360
+        fixed_loan_schedule = LoanAmortizationCalculator.calculate_loan_schedule(
+            TestAdjustableRateLoanCalculator.principal_loan_balance,
+            TestAdjustableRateLoanCalculator.term_months,
+            TestAdjustableRateLoanCalculator.annual_interest_rate
+        )
+        assert loan_schedule[:60] == fixed_loan_schedule[:60]
+
+        ### The balance at each reset is re-amortized over the remaining term at the new rate
+        for start_month, annual_interest_rate in [(61, Decimal('7.00')), (121, Decimal('8.25'))]:
+            remaining_loan_schedule = LoanAmortizationCalculator.calculate_loan_schedule(
+                loan_schedule[start_month - 2]['remaining_balance'],
+                360 - start_month + 1,
+                annual_interest_rate
+            )
+            assert loan_schedule[start_month - 1]['monthly_payment'] == remaining_loan_schedule[0]['monthly_payment']
+            assert loan_schedule[start_month - 1]['remaining_balance'] == remaining_loan_schedule[0]['remaining_balance']
+
+        assert loan_schedule[59]['monthly_payment'] < loan_schedule[60]['monthly_payment'] < loan_schedule[120]['monthly_payment']
+        assert loan_schedule[-1]['remaining_balance'] == 0
+
+    def test_calculate_loan_schedule_reuses_earlier_segments(self):
+        AdjustableRateLoanCalculator.calculate_remaining_balances.cache_clear()
+        rate_resets = [RateReset(effective_month=61, annual_interest_rate=Decimal('7.00'))]
+
+        AdjustableRateLoanCalculator.calculate_loan_schedule(
+            TestAdjustableRateLoanCalculator.principal_loan_balance,
+            TestAdjustableRateLoanCalculator.term_months,
+            TestAdjustableRateLoanCalculator.annual_interest_rate,
+            rate_resets + [RateReset(effective_month=121, annual_interest_rate=Decimal('8.25'))]
+        )
+        AdjustableRateLoanCalculator.calculate_loan_schedule(
+            TestAdjustableRateLoanCalculator.principal_loan_balance,
+            TestAdjustableRateLoanCalculator.term_months,
+            TestAdjustableRateLoanCalculator.annual_interest_rate,
+            rate_resets + [RateReset(effective_month=121, annual_interest_rate=Decimal('5.50'))]
+        )
+
+        ### Changing the reset at month 121 only recalculates the last segment
+        cache_info = AdjustableRateLoanCalculator.calculate_remaining_balances.cache_info()
+        assert cache_info.hits == 2
+        assert cache_info.misses == 4
+
+        AdjustableRateLoanCalculator.calculate_loan_schedule(
+            TestAdjustableRateLoanCalculator.principal_loan_balance,
+            TestAdjustableRateLoanCalculator.term_months,
+            TestAdjustableRateLoanCalculator.annual_interest_rate,
+            rate_resets + [RateReset(effective_month=133, annual_interest_rate=Decimal('5.50'))]
+        )
+
+        ### Moving the reset to month 133 lengthens the previous segment, which is still reused
+        cache_info = AdjustableRateLoanCalculator.calculate_remaining_balances.cache_info()
+        assert cache_info.hits == 4
+        assert cache_info.misses == 5
+
+    def test_get_rate_segments(self):
+        assert AdjustableRateLoanCalculator.get_rate_segments(
+            Decimal('6.50'),
+            360,
+            [RateReset(effective_month=1, annual_interest_rate=Decimal('5.00')), RateReset(effective_month=13, annual_interest_rate=Decimal('6.00'))]
+        ) == [(1, Decimal('5.00')), (13, Decimal('6.00'))]
+
+        with pytest.raises(ValueError):
+            AdjustableRateLoanCalculator.get_rate_segments(Decimal('6.50'), 360, [RateReset(effective_month=361, annual_interest_rate=Decimal('5.00'))])
+
+        with pytest.raises(ValueError):
+            AdjustableRateLoanCalculator.get_rate_segments(
+                Decimal('6.50'),
+                360,
+                [RateReset(effective_month=13, annual_interest_rate=Decimal('5.00')), RateReset(effective_month=13, annual_interest_rate=Decimal('6.00'))]
+            )
@@ -0,0 +1,227 @@
+import random
+from decimal import Decimal
+import numpy as np
+from pytest import raises
+from src.utils.batch_loan_amortization_calculation import BatchLoanAmortizationCalculator
+from src.utils.loan_amortization_calculation import LoanAmortizationCalculator
+
+class TestBatchLoanAmortizationCalculator:
+
+    principal_loan_balances = [Decimal('30000.00'), Decimal('648033.90'), Decimal('469075.67'), Decimal('1250.55')]
+    term_months = [48, 480, 360, 12]
+    annual_interest_rates = [Decimal('3.00'), Decimal('12.60'), Decimal('0.63'), Decimal('7.25')]
+
+    def test_divide_round_half_even(self):
+        assert BatchLoanAmortizationCalculator.divide_round_half_even(
+            np.array([5, 15, 16, 14, -5, -15, -16]),
+            10
+        ).tolist() == [0, 2, 2, 1, 0, -2, -2]
+
+    def test_to_cents(self):
+        assert BatchLoanAmortizationCalculator.to_cents([Decimal('30000.00'), 1.5]).tolist() == [3000000, 150]
+
+    def test_to_cents_fractions_of_a_cent(self):
+        with raises(ValueError):
+            BatchLoanAmortizationCalculator.to_cents([Decimal('10.005')])
+
+    def test_to_scaled_rates_too_many_decimal_places(self):
+        with raises(ValueError):
+            BatchLoanAmortizationCalculator.to_scaled_rates([Decimal('3.00001')])
+
+    def test_calculate_loan_schedules_shape(self):
+        loan_schedules = BatchLoanAmortizationCalculator.calculate_loan_schedules(
+            TestBatchLoanAmortizationCalculator.principal_loan_balances,
+            TestBatchLoanAmortizationCalculator.term_months,
+            TestBatchLoanAmortizationCalculator.annual_interest_rates
+        )
+        assert loan_schedules.remaining_balance.shape == (4, 480)
+        assert loan_schedules.month.tolist() == list(range(1, 481))
+        assert loan_schedules.monthly_payment[0] == 66403
+        assert loan_schedules.remaining_balance[0, 1] == 2882047
+        assert not loan_schedules.remaining_balance[3, 12:].any()
+
+    def test_calculate_loan_schedules_exact_parity(self):
+        loan_schedules = BatchLoanAmortizationCalculator.calculate_loan_schedules(
+            TestBatchLoanAmortizationCalculator.principal_loan_balances,
+            TestBatchLoanAmortizationCalculator.term_months,
+            TestBatchLoanAmortizationCalculator.annual_interest_rates
+        )
+
+        for index, loan in enumerate(zip(
+            TestBatchLoanAmortizationCalculator.principal_loan_balances,
+            TestBatchLoanAmortizationCalculator.term_months,
+            TestBatchLoanAmortizationCalculator.annual_interest_rates
+        )):
+            assert loan_schedules.to_loan_schedule(index) == LoanAmortizationCalculator.calculate_loan_schedule(*loan)
+
+    def test_calculate_loan_schedules_exact_parity_random(self):
+        generator = random.Random(20240202)
+        principal_loan_balances = [Decimal(generator.randint(100000, 200000000)).scaleb(-2) for _ in range(200)]
+        term_months = [generator.choice([12, 36, 60, 120, 180, 240, 360, 480]) for _ in range(200)]
+        annual_interest_rates = [Decimal(generator.randint(1, 2500)).scaleb(-2) for _ in range(200)]
+
+        loan_schedules = BatchLoanAmortizationCalculator.calculate_loan_schedules(
+            principal_loan_balances,
+            term_months,
+            annual_interest_rates
+        )
+
+        for index, loan in enumerate(zip(principal_loan_balances, term_months, annual_interest_rates)):
+            assert loan_schedules.to_loan_schedule(index) == LoanAmortizationCalculator.calculate_loan_schedule(*loan)
+
+    def test_calculate_loan_schedules_float(self):
+        loan_schedules = BatchLoanAmortizationCalculator.calculate_loan_schedules(
+            TestBatchLoanAmortizationCalculator.principal_loan_balances,
+            TestBatchLoanAmortizationCalculator.term_months,
+            TestBatchLoanAmortizationCalculator.annual_interest_rates,
+            exact=False
+        )
+        exact_loan_schedules = BatchLoanAmortizationCalculator.calculate_loan_schedules(
+            TestBatchLoanAmortizationCalculator.principal_loan_balances,
+            TestBatchLoanAmortizationCalculator.term_months,
+            TestBatchLoanAmortizationCalculator.annual_interest_rates
+        )
+
+        assert not loan_schedules.exact
+        assert np.allclose(loan_schedules.monthly_payment * 100, exact_loan_schedules.monthly_payment)
+        assert np.abs(loan_schedules.remaining_balance * 100 - exact_loan_schedules.remaining_balance).max() < 100
+
+    def test_calculate_remaining_balances_at_months(self):
+        months = [2, 479, 359, 12]
+        remaining_balances, total_monthly_payments = BatchLoanAmortizationCalculator.calculate_remaining_balances_at_months(
+            TestBatchLoanAmortizationCalculator.principal_loan_balances,
+            TestBatchLoanAmortizationCalculator.term_months,
+            TestBatchLoanAmortizationCalculator.annual_interest_rates,
+            months
+        )
+
+        for index, loan in enumerate(zip(
+            TestBatchLoanAmortizationCalculator.principal_loan_balances,
+            TestBatchLoanAmortizationCalculator.term_months,
+            TestBatchLoanAmortizationCalculator.annual_interest_rates
+        )):
+            loan_schedule = LoanAmortizationCalculator.calculate_loan_schedule_for_month(*loan, months[index])
+            assert remaining_balances[index] == loan_schedule['remaining_balance'] * 100
+            assert total_monthly_payments[index] == loan_schedule['monthly_payment'] * 100
+
+    def test_calculate_remaining_balances_at_month_zero(self):
+        remaining_balances, _ = BatchLoanAmortizationCalculator.calculate_remaining_balances_at_months(
+            [Decimal('30000.00')],
+            [48],
+            [Decimal('3.00')],
+            [0]
+        )
+        assert remaining_balances.tolist() == [3000000]
+
+    def get_random_quotes(self, count=300):
+        generator = random.Random(20240225)
+        principal_loan_balances = [Decimal(generator.randint(100000, 200000000)).scaleb(-2) for _ in range(count)]
+        term_months = [generator.choice([12, 36, 60, 120, 180, 240, 360, 480]) for _ in range(count)]
+        annual_interest_rates = [Decimal(generator.randint(1, 2500)).scaleb(-2) for _ in range(count)]
+        total_monthly_payments = [
+            LoanAmortizationCalculator.calculate_total_monthly_payment(*loan[:2], loan[2] / 100)
+            for loan in zip(principal_loan_balances, term_months, annual_interest_rates)
+        ]
+        return principal_loan_balances, term_months, annual_interest_rates, total_monthly_payments
+
+    def test_solve_annual_interest_rates(self):
+        principal_loan_balances, term_months, annual_interest_rates, total_monthly_payments = self.get_random_quotes()
+        solved_annual_interest_rates = BatchLoanAmortizationCalculator.solve_annual_interest_rates(
+            principal_loan_balances,
+            term_months,
+            total_monthly_payments
+        )
+
+        # Payments are rounded to cents, so the solved rate gives back the payment but can differ from the original rate
+        for principal_loan_balance, term, annual_interest_rate, total_monthly_payment in zip(
+            principal_loan_balances,
+            term_months,
+            solved_annual_interest_rates,
+            total_monthly_payments
+        ):
+            assert LoanAmortizationCalculator.calculate_total_monthly_payment(
+                principal_loan_balance,
+                term,
+                Decimal(repr(float(annual_interest_rate))) / 100
+            ) == total_monthly_payment
+
+    def test_solve_annual_interest_rates_tolerance(self):
+        loan = ([Decimal('30000.00')], [48], [Decimal('664.03')])
+        converged = BatchLoanAmortizationCalculator.solve_annual_interest_rates(*loan, tolerance=1e-12)[0]
+        assert abs(converged - 3) < 1e-3
+        assert abs(BatchLoanAmortizationCalculator.solve_annual_interest_rates(*loan)[0] - converged) < 1e-9
+        assert abs(BatchLoanAmortizationCalculator.solve_annual_interest_rates(*loan, max_iterations=1)[0] - converged) > 1e-9
+
+    def test_solve_annual_interest_rates_no_positive_rate(self):
+        # The payment of a 0% rate is 100.00, anything at or below it has no positive rate
+        assert np.isnan(BatchLoanAmortizationCalculator.solve_annual_interest_rates(
+            [Decimal('1200.00'), Decimal('1200.00')],
+            [12, 12],
+            [Decimal('100.00'), Decimal('99.00')]
+        )).all()
+
+    def test_solve_principal_loan_balances(self):
+        principal_loan_balances, term_months, annual_interest_rates, total_monthly_payments = self.get_random_quotes()
+        solved_principal_loan_balances = BatchLoanAmortizationCalculator.solve_principal_loan_balances(
+            total_monthly_payments,
+            term_months,
+            annual_interest_rates
+        )
+
+        # The largest principal within the budget: one more cent costs more than the payment
+        for index, (term, annual_interest_rate, total_monthly_payment) in enumerate(zip(term_months, annual_interest_rates, total_monthly_payments)):
+            principal_loan_balance = Decimal(int(solved_principal_loan_balances[index])).scaleb(-2)
+            assert principal_loan_balance >= principal_loan_balances[index]
+            assert LoanAmortizationCalculator.calculate_total_monthly_payment(principal_loan_balance, term, annual_interest_rate / 100) <= total_monthly_payment
+            assert LoanAmortizationCalculator.calculate_total_monthly_payment(principal_loan_balance + Decimal('0.01'), term, annual_interest_rate / 100) > total_monthly_payment
+
+    def test_solve_term_months(self):
+        principal_loan_balances, term_months, annual_interest_rates, total_monthly_payments = self.get_random_quotes()
+        solved_term_months = BatchLoanAmortizationCalculator.solve_term_months(
+            principal_loan_balances,
+            annual_interest_rates,
+            total_monthly_payments
+        )
+
+        # The shortest term within the budget: one month less costs more than the payment
+        for index, (principal_loan_balance, annual_interest_rate, total_monthly_payment) in enumerate(zip(principal_loan_balances, annual_interest_rates, total_monthly_payments)):
+            term = int(solved_term_months[index])
+            assert term <= term_months[index]
+            assert LoanAmortizationCalculator.calculate_total_monthly_payment(principal_loan_balance, term, annual_interest_rate / 100) <= total_monthly_payment
+            if term > 1:
+                assert LoanAmortizationCalculator.calculate_total_monthly_payment(principal_loan_balance, term - 1, annual_interest_rate / 100) > total_monthly_payment
+
+    def test_solve_term_months_high_rates(self):
+        # Close to the first month's interest the float estimate finds no term, but the rounded payment of a long term fits the budget
+        principal_loan_balance, annual_interest_rate = Decimal('1323331.26'), Decimal('48.79')
+        assert LoanAmortizationCalculator.calculate_total_monthly_payment(principal_loan_balance, 480, annual_interest_rate / 100) == Decimal('53804.44')
+        term = int(BatchLoanAmortizationCalculator.solve_term_months([principal_loan_balance], [annual_interest_rate], [Decimal('53804.44')])[0])
+        assert 1 <= term <= 480
+        assert LoanAmortizationCalculator.calculate_total_monthly_payment(principal_loan_balance, term, annual_interest_rate / 100) <= Decimal('53804.44')
+        assert LoanAmortizationCalculator.calculate_total_monthly_payment(principal_loan_balance, term - 1, annual_interest_rate / 100) > Decimal('53804.44')
+
+        random_generator = random.Random(25)
+        principal_loan_balances = [Decimal(random_generator.randint(100000, 200000000)).scaleb(-2) for _ in range(200)]
+        annual_interest_rates = [Decimal(random_generator.randint(2000, 6000)).scaleb(-2) for _ in range(200)]
+        total_monthly_payments = [
+            LoanAmortizationCalculator.calculate_total_monthly_payment(principal_loan_balance, 480, annual_interest_rate / 100)
+            for principal_loan_balance, annual_interest_rate in zip(principal_loan_balances, annual_interest_rates)
+        ]
+        assert (BatchLoanAmortizationCalculator.solve_term_months(principal_loan_balances, annual_interest_rates, total_monthly_payments) > 0).all()
+
+    def test_solve_at_zero_rate(self):
+        # The payment formula is undefined at 0%, the solvers return their sentinel instead of raising
+        for exact in [True, False]:
+            assert BatchLoanAmortizationCalculator.solve_principal_loan_balances(
+                [Decimal('100.00'), Decimal('100.00')], [12, 12], [Decimal('0'), Decimal('5.00')], exact=exact
+            ).tolist()[0] == -1
+            assert BatchLoanAmortizationCalculator.solve_term_months([Decimal('1000.00')], [Decimal('0')], [Decimal('100.00')], exact=exact).tolist() == [0]
+
+    def test_solve_term_months_never_paid_off(self):
+        # The first month's interest is 10.00: every payment is above it, so a payment of 9.99 never pays off the loan
+        assert BatchLoanAmortizationCalculator.solve_term_months([Decimal('1000.00')], [Decimal('12.00')], [Decimal('9.99')]).tolist() == [0]
+        # The float formula finds no term for a payment of 10.00, but the payment of a 764 month term rounds to 10.00
+        assert BatchLoanAmortizationCalculator.solve_term_months([Decimal('1000.00')], [Decimal('12.00')], [Decimal('10.00')], exact=False).tolist() == [0]
+        assert BatchLoanAmortizationCalculator.solve_term_months([Decimal('1000.00')], [Decimal('12.00')], [Decimal('10.00')]).tolist() == [764]
+        assert BatchLoanAmortizationCalculator.solve_term_months([Decimal('1000.00')], [Decimal('12.00')], [Decimal('10.00')], max_term_months=480).tolist() == [0]
+        assert BatchLoanAmortizationCalculator.solve_term_months([Decimal('1000.00')], [Decimal('12.00')], [Decimal('1010.00')]).tolist() == [1]
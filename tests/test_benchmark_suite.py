@@ -0,0 +1,22 @@
+from benchmarks.suite import compare, measure
+
+def test_measure():
+    result = measure(lambda: sum(range(100)), 5)
+    assert result['runs'] == 5
+    assert result['min_ms'] <= result['median_ms'] <= result['p95_ms']
+
+def test_compare():
+    baseline = {
+        'calculator.calculate_loan_schedule[360]': {'median_ms': 1.0},
+        'route.loans_all[20]': {'median_ms': 4.0},
+    }
+    results = {
+        'calculator.calculate_loan_schedule[360]': {'median_ms': 1.5},
+        'route.loans_all[20]': {'median_ms': 4.2},
+        'route.signup': {'median_ms': 9.0},
+    }
+
+    assert compare(results, baseline, 0.25) == [
+        "calculator.calculate_loan_schedule[360]: 1.000 ms -> 1.500 ms (+50%)"
+    ]
+    assert compare(results, baseline, 0.5) == []
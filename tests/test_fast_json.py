@@ -0,0 +1,26 @@
+from decimal import Decimal
+from src.utils.fast_json import MoneyEncoding, ResponseLayout, encode_columns, encode_money, rows_to_columns
+
+def test_encode_money():
+    assert encode_money(Decimal('28820.47'), MoneyEncoding.string) == "28820.47"
+    assert encode_money(Decimal('100'), MoneyEncoding.string) == "100.00"
+    assert encode_money(0, MoneyEncoding.string) == "0.00"
+    assert encode_money(Decimal('28820.47'), MoneyEncoding.cents) == 2882047
+    assert encode_money(0, MoneyEncoding.cents) == 0
+
+def test_encode_columns():
+    rows = [
+        {'month': 1, 'remaining_balance': Decimal('29410.97'), 'monthly_payment': Decimal('664.03')},
+        {'month': 2, 'remaining_balance': Decimal('28820.47'), 'monthly_payment': Decimal('664.03')},
+    ]
+    columns = rows_to_columns(rows, ['month', 'remaining_balance', 'monthly_payment'])
+
+    assert encode_columns(columns, ['remaining_balance', 'monthly_payment'], ResponseLayout.columns, MoneyEncoding.cents) == {
+        'month': [1, 2],
+        'remaining_balance': [2941097, 2882047],
+        'monthly_payment': [66403, 66403],
+    }
+    assert encode_columns(columns, ['remaining_balance', 'monthly_payment'], ResponseLayout.rows, MoneyEncoding.string) == [
+        {'month': 1, 'remaining_balance': "29410.97", 'monthly_payment': "664.03"},
+        {'month': 2, 'remaining_balance': "28820.47", 'monthly_payment': "664.03"},
+    ]
@@ -1,6 +1,7 @@
+import random
 from decimal import Decimal
 from pytest import approx
-from src.utils.loan_amortization_calculation import LoanAmortizationCalculator
+from src.utils.loan_amortization_calculation import CalculationEngine, LoanAmortizationCalculator
 
 class TestLoanAmortizationCalculator:
 
@@ -60,6 +61,15 @@ class TestLoanAmortizationCalculator:
         )
         assert len(loan_schedule) == TestLoanAmortizationCalculator.term_months
 
+    def test_iterate_loan_schedule(self):
+        loan_schedule = LoanAmortizationCalculator.iterate_loan_schedule(
+            TestLoanAmortizationCalculator.principal_loan_balance,
+            TestLoanAmortizationCalculator.term_months,
+            TestLoanAmortizationCalculator.annual_interest_rate
+        )
+        assert next(loan_schedule)['month'] == 1
+        assert len(list(loan_schedule)) == TestLoanAmortizationCalculator.term_months - 1
+
     def test_calculate_loan_summary(self):
         loan_summary = LoanAmortizationCalculator.calculate_loan_summary(
             TestLoanAmortizationCalculator.principal_loan_balance,
@@ -74,4 +84,115 @@ class TestLoanAmortizationCalculator:
 
         assert loan_summary['current_principal_balance'] == 28820.47
         assert loan_summary['total_principal_paid'] == 1179.53
-        assert loan_summary['total_interest_paid'] == 148.53
\ No newline at end of file
+        assert loan_summary['total_interest_paid'] == 148.53
+
+    def test_calculate_next_principal_balance(self):
+        assert LoanAmortizationCalculator.calculate_next_principal_balance(
+            Decimal('664.03'),
+            Decimal('30000.00'),
+            Decimal('0.03')
+        ) == Decimal('29410.97')
+
+    def test_calculate_next_principal_balance_final_payment(self):
+        assert LoanAmortizationCalculator.calculate_next_principal_balance(
+            Decimal('664.03'),
+            Decimal('662.45'),
+            Decimal('0.03')
+        ) == 0
+
+    def test_calculate_loan_schedule_for_month(self):
+        loan_schedule = LoanAmortizationCalculator.calculate_loan_schedule(
+            Decimal('30000.00'),
+            TestLoanAmortizationCalculator.term_months,
+            Decimal('3.00')
+        )
+
+        for month in range(1, TestLoanAmortizationCalculator.term_months + 1):
+            assert LoanAmortizationCalculator.calculate_loan_schedule_for_month(
+                Decimal('30000.00'),
+                TestLoanAmortizationCalculator.term_months,
+                Decimal('3.00'),
+                month
+            ) == loan_schedule[month - 1]
+
+    def test_calculate_loan_schedule_for_month_long_term(self):
+        ### The annuity formula alone drifts on long terms and low rates pay off a month early,
+        ### so every month is compared against the iterative schedule
+        for principal_loan_balance, term_months, annual_interest_rate in [
+            (Decimal('648033.90'), 480, Decimal('12.60')),
+            (Decimal('469075.67'), 360, Decimal('0.63')),
+        ]:
+            loan_schedule = LoanAmortizationCalculator.calculate_loan_schedule(
+                principal_loan_balance,
+                term_months,
+                annual_interest_rate
+            )
+
+            for month in [1, term_months // 2, term_months - 1, term_months]:
+                assert LoanAmortizationCalculator.calculate_loan_schedule_for_month(
+                    principal_loan_balance,
+                    term_months,
+                    annual_interest_rate,
+                    month
+                ) == loan_schedule[month - 1]
+
+    def test_calculate_loan_summaries(self):
+        principal_loan_balance = Decimal('30000.00')
+        loan_schedule = LoanAmortizationCalculator.calculate_loan_schedule(
+            principal_loan_balance,
+            TestLoanAmortizationCalculator.term_months,
+            Decimal('3.00')
+        )
+
+        loan_summaries = LoanAmortizationCalculator.calculate_loan_summaries(
+            principal_loan_balance,
+            iter(loan_schedule),
+            2,
+            47,
+            5
+        )
+
+        assert [loan_summary['month'] for loan_summary in loan_summaries] == list(range(2, 48, 5))
+        for loan_summary in loan_summaries:
+            assert loan_summary == {
+                'month': loan_summary['month'],
+                **LoanAmortizationCalculator.calculate_loan_summary(principal_loan_balance, loan_schedule[loan_summary['month'] - 1])
+            }
+
+    def test_cents_engine_parity(self):
+        ### Property-based parity check: for random amounts, terms and rates, the integer-cents engine
+        ### must give exactly the same schedule as the Decimal engine. Seeded, so failures are reproducible
+        generator = random.Random(20240218)
+
+        for _ in range(200):
+            principal_loan_balance = Decimal(generator.randint(100, 200000000)).scaleb(-2)
+            term_months = generator.randint(1, 480)
+            annual_interest_rate = Decimal(generator.randint(1, 300000)).scaleb(-4)
+
+            loan_schedule = LoanAmortizationCalculator.calculate_loan_schedule(
+                principal_loan_balance,
+                term_months,
+                annual_interest_rate
+            )
+            assert LoanAmortizationCalculator.calculate_loan_schedule(
+                principal_loan_balance,
+                term_months,
+                annual_interest_rate,
+                CalculationEngine.cents
+            ) == loan_schedule, (principal_loan_balance, term_months, annual_interest_rate)
+
+            month = generator.randint(1, term_months)
+            assert LoanAmortizationCalculator.calculate_loan_schedule_for_month(
+                principal_loan_balance,
+                term_months,
+                annual_interest_rate,
+                month,
+                CalculationEngine.cents
+            ) == loan_schedule[month - 1]
+
+    def test_divide_round_half_even(self):
+        ### Ties round to the even neighbour, like round(Decimal, 2)
+        assert LoanAmortizationCalculator.divide_round_half_even(5, 2) == 2
+        assert LoanAmortizationCalculator.divide_round_half_even(7, 2) == 4
+        assert LoanAmortizationCalculator.divide_round_half_even(-5, 2) == -2
+        assert LoanAmortizationCalculator.divide_round_half_even(11, 4) == 3
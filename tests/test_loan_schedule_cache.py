@@ -0,0 +1,91 @@
+from decimal import Decimal
+from pytest import raises
+from src.utils.loan_amortization_calculation import LoanAmortizationCalculator
+from src.utils.loan_schedule_cache import LoanScheduleCache
+
+class TestLoanScheduleCache:
+
+    principal_loan_balance = Decimal('30000.00')
+    annual_interest_rate = Decimal('3.00')
+    term_months = 48
+
+    def test_get_loan_schedule(self):
+        cache = LoanScheduleCache()
+        cached_loan_schedule = cache.get_loan_schedule(
+            TestLoanScheduleCache.principal_loan_balance,
+            TestLoanScheduleCache.term_months,
+            TestLoanScheduleCache.annual_interest_rate
+        )
+
+        assert cached_loan_schedule.to_loan_schedule() == LoanAmortizationCalculator.calculate_loan_schedule(
+            TestLoanScheduleCache.principal_loan_balance,
+            TestLoanScheduleCache.term_months,
+            TestLoanScheduleCache.annual_interest_rate
+        )
+        assert cache.stats() == {'size': 1, 'max_size': 1024, 'hits': 0, 'misses': 1, 'evictions': 0}
+
+    def test_get_loan_schedule_hit(self):
+        cache = LoanScheduleCache()
+        first = cache.get_loan_schedule(Decimal('30000.00'), 48, Decimal('3.00'))
+        second = cache.get_loan_schedule(Decimal('30000'), 48, Decimal('3'))
+
+        assert first is second
+        assert cache.stats()['hits'] == 1
+        assert cache.stats()['misses'] == 1
+
+    def test_cached_loan_schedule_is_immutable(self):
+        cache = LoanScheduleCache()
+        cached_loan_schedule = cache.get_loan_schedule(
+            TestLoanScheduleCache.principal_loan_balance,
+            TestLoanScheduleCache.term_months,
+            TestLoanScheduleCache.annual_interest_rate
+        )
+
+        loan_schedule = cached_loan_schedule.to_loan_schedule()
+        loan_schedule[0]['remaining_balance'] = Decimal('0')
+        with raises(TypeError):
+            cached_loan_schedule.remaining_balances[0] = Decimal('0')
+
+        assert cache.get_loan_schedule(
+            TestLoanScheduleCache.principal_loan_balance,
+            TestLoanScheduleCache.term_months,
+            TestLoanScheduleCache.annual_interest_rate
+        ).to_loan_schedule()[0]['remaining_balance'] == Decimal('29410.97')
+
+    def test_eviction(self):
+        cache = LoanScheduleCache(max_size=2)
+        cache.get_loan_schedule(Decimal('1000.00'), 12, Decimal('3.00'))
+        cache.get_loan_schedule(Decimal('2000.00'), 12, Decimal('3.00'))
+        cache.get_loan_schedule(Decimal('1000.00'), 12, Decimal('3.00'))
+        cache.get_loan_schedule(Decimal('3000.00'), 12, Decimal('3.00'))
+
+        assert cache.stats()['size'] == 2
+        assert cache.stats()['evictions'] == 1
+
+        # 2000.00 was the least recently used entry
+        cache.get_loan_schedule(Decimal('1000.00'), 12, Decimal('3.00'))
+        assert cache.stats()['hits'] == 2
+        cache.get_loan_schedule(Decimal('2000.00'), 12, Decimal('3.00'))
+        assert cache.stats()['misses'] == 4
+
+    def test_get_loan_schedule_for_month(self):
+        cache = LoanScheduleCache()
+        expected = {
+            'month': 2,
+            'remaining_balance': Decimal('28820.47'),
+            'monthly_payment': Decimal('664.03')
+        }
+
+        assert cache.get_loan_schedule_for_month(Decimal('30000.00'), 48, Decimal('3.00'), 2) == expected
+        assert cache.stats()['size'] == 0
+
+        cache.get_loan_schedule(Decimal('30000.00'), 48, Decimal('3.00'))
+        assert cache.get_loan_schedule_for_month(Decimal('30000.00'), 48, Decimal('3.00'), 2) == expected
+        assert cache.stats()['hits'] == 1
+
+    def test_clear(self):
+        cache = LoanScheduleCache()
+        cache.get_loan_schedule(Decimal('1000.00'), 12, Decimal('3.00'))
+        cache.clear()
+
+        assert cache.stats() == {'size': 0, 'max_size': 1024, 'hits': 0, 'misses': 0, 'evictions': 0}
@@ -0,0 +1,65 @@
+from decimal import Decimal
+from sqlalchemy import event
+from sqlmodel import Session, SQLModel, create_engine, select, col
+from src.db.loan_schedules import backfill_loan_schedules, find_drifted_loan_schedules, materialize_loan_schedule
+from src.sqlmodel.models.loan import Loan
+from src.sqlmodel.models.loan_schedule import MaterializedLoanSchedule
+from src.sqlmodel.models.user import User
+
+def create_session() -> Session:
+    engine = create_engine("sqlite://")
+    SQLModel.metadata.create_all(engine)
+    session = Session(engine)
+    session.add(User(user_id=1, first_name="John", last_name="Wick", email="johnwick@gmail.com", password="123"))
+    session.add(Loan(loan_id=1, user_id=1, loan_amount=Decimal('30000.00'), annual_interest_rate=Decimal('3.00'), loan_term_months=48))
+    session.add(Loan(loan_id=2, user_id=1, loan_amount=Decimal('1000.00'), annual_interest_rate=Decimal('5.00'), loan_term_months=12))
+    session.commit()
+    return session
+
+def test_materialize_loan_schedule():
+    with create_session() as session:
+        materialize_loan_schedule(session, session.get(Loan, 1))
+        session.commit()
+
+        rows = session.exec(select(MaterializedLoanSchedule).order_by(col(MaterializedLoanSchedule.month))).all()
+        assert len(rows) == 48
+        assert rows[1].remaining_balance == Decimal('28820.47')
+        assert rows[1].monthly_payment == Decimal('664.03')
+
+def test_backfill_loan_schedules():
+    with create_session() as session:
+        materialize_loan_schedule(session, session.get(Loan, 1))
+        session.commit()
+
+        assert backfill_loan_schedules(session) == 1
+        assert len(session.exec(select(MaterializedLoanSchedule)).all()) == 48 + 12
+        assert backfill_loan_schedules(session) == 0
+
+def test_find_drifted_loan_schedules():
+    with create_session() as session:
+        backfill_loan_schedules(session)
+        assert find_drifted_loan_schedules(session) == {}
+
+        row = session.get(MaterializedLoanSchedule, (1, 5))
+        row.remaining_balance = Decimal('1.00')
+        session.delete(session.get(MaterializedLoanSchedule, (2, 12)))
+        session.commit()
+
+        assert find_drifted_loan_schedules(session) == {1: [5], 2: [12]}
+
+def test_backfill_and_check_do_not_query_per_loan():
+    with create_session() as session:
+        for loan_id in range(3, 11):
+            session.add(Loan(loan_id=loan_id, user_id=1, loan_amount=Decimal('1000.00'), annual_interest_rate=Decimal('5.00'), loan_term_months=12))
+        session.commit()
+
+        statements = []
+        event.listen(session.get_bind(), "before_cursor_execute", lambda *args: statements.append(args[2]))
+
+        # 3 pages of 4 loans: a select and an insert per page, plus the last, empty, select
+        assert backfill_loan_schedules(session, batch_size=4) == 10
+        assert len(statements) == 3 * 2 + 1
+
+        statements.clear()
+        assert find_drifted_loan_schedules(session) == {}
+        assert len(statements) == 1
@@ -0,0 +1,154 @@
+import asyncio
+from decimal import Decimal
+import pytest
+from sqlmodel import Session, SQLModel, create_engine, select, col
+from src.db.loan_transfer import (
+    LOAN_FIELDS,
+    LOAN_SCHEDULE_FIELDS,
+    LoanTransferFormat,
+    encode_row_batches,
+    format_cents,
+    import_loans,
+    iterate_line_batches,
+    iterate_loan_row_batches,
+    iterate_loan_schedule_row_batches,
+    parse_rows,
+    read_parquet,
+    write_parquet
+)
+from src.sqlmodel.models.loan import Loan
+from src.sqlmodel.models.user import User
+from src.utils.loan_amortization_calculation import LoanAmortizationCalculator
+
+def create_session() -> Session:
+    engine = create_engine("sqlite://")
+    SQLModel.metadata.create_all(engine)
+    session = Session(engine)
+    session.add(User(user_id=1, first_name="John", last_name="Wick", email="johnwick@gmail.com", password="123"))
+    session.add(Loan(loan_id=1, user_id=1, loan_amount=Decimal('30000.00'), annual_interest_rate=Decimal('3.00'), loan_term_months=48))
+    session.add(Loan(loan_id=2, user_id=1, loan_amount=Decimal('1000.00'), annual_interest_rate=Decimal('5.00'), loan_term_months=12))
+    session.add(Loan(loan_id=3, user_id=1, loan_amount=Decimal('2500.50'), annual_interest_rate=Decimal('7.25'), loan_term_months=6))
+    session.commit()
+    return session
+
+def test_format_cents():
+    assert format_cents(2882047) == "28820.47"
+    assert format_cents(5) == "0.05"
+    assert format_cents(0) == "0.00"
+
+def test_export_loans_in_batches():
+    with create_session() as session:
+        batches = list(iterate_loan_row_batches(session, batch_size=2))
+
+        assert [len(rows) for rows in batches] == [2, 1]
+        assert [row['loan_id'] for rows in batches for row in rows] == [1, 2, 3]
+
+        lines = "".join(encode_row_batches(batches, LOAN_FIELDS, LoanTransferFormat.csv)).splitlines()
+        assert lines[0] == "loan_id,user_id,loan_amount,annual_interest_rate,loan_term_months"
+        assert lines[1] == "1,1,30000.00,3.00,48"
+
+def test_export_loan_schedules_match_calculator():
+    with create_session() as session:
+        rows = [row for rows in iterate_loan_schedule_row_batches(session, batch_size=2) for row in rows]
+        assert len(rows) == 48 + 12 + 6
+
+        for loan in session.exec(select(Loan)).all():
+            expected = LoanAmortizationCalculator.calculate_loan_schedule(loan.loan_amount, loan.loan_term_months, loan.annual_interest_rate)
+            exported = [row for row in rows if row['loan_id'] == loan.loan_id]
+            assert [Decimal(row['remaining_balance']) for row in exported] == [row['remaining_balance'] for row in expected]
+            assert [Decimal(row['monthly_payment']) for row in exported] == [row['monthly_payment'] for row in expected]
+
+def test_export_then_import_round_trip():
+    with create_session() as session:
+        ndjson = "".join(encode_row_batches(iterate_loan_row_batches(session), LOAN_FIELDS, LoanTransferFormat.ndjson))
+
+    # Import into a database with the same user and no loans, keeping the exported loan ids
+    engine = create_engine("sqlite://")
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        session.add(User(user_id=1, first_name="John", last_name="Wick", email="johnwick@gmail.com", password="123"))
+        session.commit()
+
+        result = import_loans(session, parse_rows(ndjson.splitlines(), LoanTransferFormat.ndjson), batch_size=2)
+        assert result.imported == 3
+        assert result.error_count == 0
+
+        loans = session.exec(select(Loan).order_by(col(Loan.loan_id))).all()
+        assert [(loan.loan_id, loan.loan_amount, loan.loan_term_months) for loan in loans] == [
+            (1, Decimal('30000.00'), 48),
+            (2, Decimal('1000.00'), 12),
+            (3, Decimal('2500.50'), 6)
+        ]
+
+def test_import_reports_invalid_rows():
+    lines = [
+        "user_id,loan_amount,annual_interest_rate,loan_term_months,loan_id",
+        "1,5000.00,4.50,24,",
+        "2,5000.00,4.50,24,",
+        "1,abc,4.50,24,",
+        "1,5000.001,4.50,24,",
+        "1,5000.00,4.50,0,",
+        "1,5000.00,4.50,24,1",
+        "1,6000.00,4.50,24,100",
+        "1,7000.00,4.50,24,100",
+    ]
+    with create_session() as session:
+        result = import_loans(session, parse_rows(lines, LoanTransferFormat.csv), batch_size=3)
+
+        assert result.imported == 2
+        assert result.error_count == 6
+        assert [error.line for error in result.errors] == [2, 3, 4, 5, 6, 8]
+        assert result.errors[0].detail == "Cannot create Loan for non-existent user"
+        assert result.errors[1].detail == "Invalid loan. Invalid number"
+        assert result.errors[4].detail == "Loan 1 already exists"
+        assert session.get(Loan, 100).loan_amount == Decimal('6000.00')
+
+def test_import_invalid_json_line():
+    lines = ['{"user_id": 1, "loan_amount": 100.50, "annual_interest_rate": 3, "loan_term_months": 12}', '{"user_id": 1,']
+    with create_session() as session:
+        result = import_loans(session, parse_rows(lines, LoanTransferFormat.ndjson))
+
+        assert result.imported == 1
+        assert result.errors[0].line == 2
+        assert result.errors[0].detail == "Invalid loan. Not a JSON object"
+
+def test_iterate_line_batches():
+    async def chunks():
+        for chunk in [b"a\nb", b"b\n\nc", b"\nd"]:
+            yield chunk
+
+    async def collect():
+        return [lines async for lines in iterate_line_batches(chunks(), batch_size=2)]
+
+    assert asyncio.run(collect()) == [["a", "bb"], ["c", "d"]]
+
+def test_parquet_round_trip(tmp_path):
+    pytest.importorskip("pyarrow")
+    path = str(tmp_path / "loans.parquet")
+
+    with create_session() as session:
+        assert write_parquet(iterate_loan_row_batches(session, batch_size=2), LOAN_FIELDS, path) == 3
+        rows = list(read_parquet(path))
+
+        assert rows[0] == (1, {'loan_id': 1, 'user_id': 1, 'loan_amount': '30000.00', 'annual_interest_rate': '3.00', 'loan_term_months': 48})
+
+        # Every loan already exists
+        result = import_loans(session, rows)
+        assert result.imported == 0
+        assert result.error_count == 3
+
+def test_export_loan_schedules_skips_loans_that_cannot_be_calculated():
+    with create_session() as session:
+        session.add(Loan(loan_id=4, user_id=1, loan_amount=Decimal('1000.00'), annual_interest_rate=Decimal('0'), loan_term_months=12))
+        session.commit()
+
+        skipped_loans = []
+        lines = "".join(encode_row_batches(
+            iterate_loan_schedule_row_batches(session, batch_size=3, skipped_loans=skipped_loans),
+            LOAN_SCHEDULE_FIELDS,
+            LoanTransferFormat.csv
+        )).splitlines()
+
+        assert lines[0] == "loan_id,month,remaining_balance,monthly_payment"
+        assert len(lines) == 1 + 48 + 12 + 6
+        assert skipped_loans == [(4, "Annual interest rate of 0.00%")]
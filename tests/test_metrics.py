@@ -0,0 +1,75 @@
+from sqlalchemy import text
+from sqlmodel import create_engine
+from src.utils.metrics import Histogram, MetricsRegistry, RequestMetrics, current_request_metrics, instrument_engine, timed_calculation
+
+def test_histogram():
+    histogram = Histogram((0.1, 1.0))
+    histogram.observe(0.05)
+    histogram.observe(0.5)
+    histogram.observe(5)
+
+    assert histogram.render("latency", 'route="/"') == [
+        'latency_bucket{route="/",le="0.1"} 1',
+        'latency_bucket{route="/",le="1.0"} 2',
+        'latency_bucket{route="/",le="+Inf"} 3',
+        'latency_sum{route="/"} 5.55',
+        'latency_count{route="/"} 3',
+    ]
+
+def test_metrics_registry_render():
+    registry = MetricsRegistry()
+    request_metrics = RequestMetrics()
+    request_metrics.sql_statements = 2
+    registry.record("GET", "/loans/all/", 200, 0.003, request_metrics)
+
+    rendered = registry.render({'loan_schedule_cache_hits_total': ("Loan schedule cache hits", 4)})
+    assert 'http_request_duration_seconds_count{method="GET",route="/loans/all/",status="200"} 1' in rendered
+    assert 'http_request_sql_statements_bucket{method="GET",route="/loans/all/",le="2"} 1' in rendered
+    assert '# TYPE loan_schedule_cache_hits_total counter\nloan_schedule_cache_hits_total 4' in rendered
+
+def test_instrument_engine():
+    engine = create_engine("sqlite://")
+    instrument_engine(engine)
+    request_metrics = RequestMetrics()
+    token = current_request_metrics.set(request_metrics)
+    try:
+        with engine.connect() as connection:
+            connection.execute(text("SELECT 1"))
+            connection.execute(text("SELECT 2"))
+    finally:
+        current_request_metrics.reset(token)
+
+    assert request_metrics.sql_statements == 2
+    assert request_metrics.db_seconds > 0
+
+def test_timed_calculation_counts_outermost_call():
+    @timed_calculation
+    def inner():
+        return 1
+
+    @timed_calculation
+    def outer():
+        return inner() + sum(generator())
+
+    @timed_calculation
+    def generator():
+        yield 1
+        yield 2
+
+    request_metrics = RequestMetrics()
+    token = current_request_metrics.set(request_metrics)
+    try:
+        assert outer() == 4
+        assert list(generator()) == [1, 2]
+    finally:
+        current_request_metrics.reset(token)
+
+    assert request_metrics.calculator_depth == 0
+    assert request_metrics.calculator_seconds > 0
+
+def test_timed_calculation_outside_request():
+    @timed_calculation
+    def calculation():
+        return 1
+
+    assert calculation() == 1
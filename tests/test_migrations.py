@@ -0,0 +1,42 @@
+from pytest import raises
+from sqlalchemy import inspect
+from sqlmodel import create_engine
+from src.db.migrations import migrate_db
+from src.sqlmodel.models import loan, loan_schedule, loan_share, user # registers every model on SQLModel.metadata
+
+# Schema of a database.db created before the indexes and unique constraints were added
+LEGACY_SCHEMA = [
+    "CREATE TABLE user (user_id INTEGER NOT NULL, first_name VARCHAR NOT NULL, last_name VARCHAR NOT NULL, email VARCHAR NOT NULL, password VARCHAR NOT NULL, PRIMARY KEY (user_id))",
+    "CREATE TABLE loan (loan_id INTEGER NOT NULL, user_id INTEGER, loan_amount NUMERIC NOT NULL, annual_interest_rate NUMERIC NOT NULL, loan_term_months INTEGER NOT NULL, PRIMARY KEY (loan_id))",
+    "CREATE TABLE loanshare (loan_share_id INTEGER NOT NULL, source_user_id INTEGER NOT NULL, target_user_id INTEGER NOT NULL, loan_id INTEGER NOT NULL, PRIMARY KEY (loan_share_id))",
+]
+
+def create_legacy_engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'legacy.db'}")
+    with engine.begin() as connection:
+        for statement in LEGACY_SCHEMA:
+            connection.exec_driver_sql(statement)
+    return engine
+
+def test_migrate_db(tmp_path):
+    engine = create_legacy_engine(tmp_path)
+
+    assert sorted(migrate_db(engine)) == [
+        "ix_loan_user_id",
+        "ix_loanshare_target_user_id_loan_id",
+        "ix_user_email",
+        "uq_loanshare_loan_id_target_user_id",
+    ]
+    assert migrate_db(engine) == []
+
+    indexes = {index['name']: index for index in inspect(engine).get_indexes("user")}
+    assert indexes["ix_user_email"]["unique"]
+
+def test_migrate_db_duplicates(tmp_path):
+    engine = create_legacy_engine(tmp_path)
+    with engine.begin() as connection:
+        connection.exec_driver_sql("INSERT INTO user VALUES (1, 'John', 'Wick', 'johnwick@gmail.com', '123')")
+        connection.exec_driver_sql("INSERT INTO user VALUES (2, 'John', 'Wick', 'johnwick@gmail.com', '123')")
+
+    with raises(RuntimeError, match="ix_user_email"):
+        migrate_db(engine)
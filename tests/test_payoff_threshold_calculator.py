@@ -0,0 +1,100 @@
+import random
+from decimal import Decimal
+from src.sqlmodel.models.payoff_threshold import ThresholdMetric
+from src.utils.loan_amortization_calculation import LoanAmortizationCalculator
+from src.utils.loan_schedule_cache import CachedLoanSchedule, LoanScheduleCache
+from src.utils.batch_loan_amortization_calculation import BatchLoanAmortizationCalculator
+from src.utils.payoff_threshold_calculation import CentsLoanSchedule, PayoffThresholdCalculator
+
+def scan_threshold_month(loan_amount, loan_schedule, metric, threshold):
+    ### Reference: checks every month from month 0
+    for month in range(len(loan_schedule.remaining_balances) + 1):
+        value = PayoffThresholdCalculator.get_metric_value(loan_amount, loan_schedule, metric, month)
+        if (value <= threshold) if metric == ThresholdMetric.remaining_balance else (value >= threshold):
+            return month
+    return None
+
+class TestPayoffThresholdCalculator:
+
+    loan_amount = Decimal('30000.00')
+    term_months = 48
+    annual_interest_rate = Decimal('3.00')
+
+    def get_loan_schedule(self):
+        return LoanScheduleCache().get_loan_schedule(
+            TestPayoffThresholdCalculator.loan_amount,
+            TestPayoffThresholdCalculator.term_months,
+            TestPayoffThresholdCalculator.annual_interest_rate
+        )
+
+    def test_get_metric_value_matches_loan_summary(self):
+        loan_schedule = self.get_loan_schedule()
+        loan_summary = LoanAmortizationCalculator.calculate_loan_summary(
+            TestPayoffThresholdCalculator.loan_amount,
+            loan_schedule.loan_schedule_for_month(2)
+        )
+
+        assert PayoffThresholdCalculator.get_metric_value(self.loan_amount, loan_schedule, ThresholdMetric.remaining_balance, 2) == loan_summary['current_principal_balance']
+        assert PayoffThresholdCalculator.get_metric_value(self.loan_amount, loan_schedule, ThresholdMetric.total_principal_paid, 2) == loan_summary['total_principal_paid']
+        assert PayoffThresholdCalculator.get_metric_value(self.loan_amount, loan_schedule, ThresholdMetric.total_interest_paid, 2) == loan_summary['total_interest_paid']
+
+    def test_find_threshold_month(self):
+        loan_schedule = self.get_loan_schedule()
+
+        # Balance at month 2 is 28820.47
+        assert PayoffThresholdCalculator.find_threshold_month(self.loan_amount, loan_schedule, ThresholdMetric.remaining_balance, Decimal('28820.47')) == 2
+        assert PayoffThresholdCalculator.find_threshold_month(self.loan_amount, loan_schedule, ThresholdMetric.remaining_balance, Decimal('28820.46')) == 3
+        assert PayoffThresholdCalculator.find_threshold_month(self.loan_amount, loan_schedule, ThresholdMetric.remaining_balance, Decimal('30000.00')) == 0
+        assert PayoffThresholdCalculator.find_threshold_month(self.loan_amount, loan_schedule, ThresholdMetric.remaining_balance, Decimal('0')) == 48
+        assert PayoffThresholdCalculator.find_threshold_month(self.loan_amount, loan_schedule, ThresholdMetric.total_principal_paid, Decimal('30000.01')) is None
+        assert PayoffThresholdCalculator.find_threshold_month(self.loan_amount, loan_schedule, ThresholdMetric.total_interest_paid, Decimal('0')) == 0
+
+    def test_get_payoff_month(self):
+        assert PayoffThresholdCalculator.get_payoff_month(self.get_loan_schedule()) == 48
+        assert PayoffThresholdCalculator.get_payoff_month(CachedLoanSchedule(Decimal('10'), (Decimal('20'), Decimal('10'), Decimal(0), Decimal(0)))) == 3
+        assert PayoffThresholdCalculator.get_payoff_month(CachedLoanSchedule(Decimal('10'), (Decimal('20'), Decimal('10')))) is None
+
+    def test_interest_dip_at_payoff_month(self):
+        # The final payment clears more principal than a regular payment, so interest paid drops at the payoff month
+        loan_schedule = CachedLoanSchedule(Decimal('30.00'), (Decimal('75.00'), Decimal('48.00'), Decimal(0), Decimal(0)))
+        loan_amount = Decimal('100.00')
+
+        assert [PayoffThresholdCalculator.get_metric_value(loan_amount, loan_schedule, ThresholdMetric.total_interest_paid, month) for month in range(5)] == [
+            Decimal(0), Decimal('5.00'), Decimal('8.00'), Decimal('-10.00'), Decimal('20.00')
+        ]
+        assert PayoffThresholdCalculator.find_threshold_month(loan_amount, loan_schedule, ThresholdMetric.total_interest_paid, Decimal('8.00')) == 2
+        assert PayoffThresholdCalculator.find_threshold_month(loan_amount, loan_schedule, ThresholdMetric.total_interest_paid, Decimal('9.00')) == 4
+        for threshold in ['0', '1.00', '5.00', '6.00', '8.00', '9.00', '20.00', '21.00']:
+            assert PayoffThresholdCalculator.find_threshold_month(loan_amount, loan_schedule, ThresholdMetric.total_interest_paid, Decimal(threshold)) == \
+                scan_threshold_month(loan_amount, loan_schedule, ThresholdMetric.total_interest_paid, Decimal(threshold))
+
+    def test_find_threshold_month_matches_scan(self):
+        loan_schedule_cache = LoanScheduleCache()
+        random_generator = random.Random(24)
+
+        for _ in range(50):
+            loan_amount = Decimal(random_generator.randint(100000, 50000000)).scaleb(-2)
+            loan_schedule = loan_schedule_cache.get_loan_schedule(
+                loan_amount,
+                random_generator.choice([12, 60, 180, 360]),
+                Decimal(random_generator.randint(50, 2000)).scaleb(-2)
+            )
+            for metric in ThresholdMetric:
+                threshold = Decimal(random_generator.randint(0, int(loan_amount * 100))).scaleb(-2)
+                assert PayoffThresholdCalculator.find_threshold_month(loan_amount, loan_schedule, metric, threshold) == \
+                    scan_threshold_month(loan_amount, loan_schedule, metric, threshold)
+
+    def test_find_threshold_month_in_cents(self):
+        loan_schedule = self.get_loan_schedule()
+        batch_loan_schedule = BatchLoanAmortizationCalculator.calculate_loan_schedules([self.loan_amount], [self.term_months], [self.annual_interest_rate])
+        cents_loan_schedule = CentsLoanSchedule(int(batch_loan_schedule.monthly_payment[0]), batch_loan_schedule.remaining_balance[0])
+        random_generator = random.Random(25)
+
+        for metric in ThresholdMetric:
+            for _ in range(20):
+                threshold = Decimal(random_generator.randint(0, 3000000)).scaleb(-2)
+                month = PayoffThresholdCalculator.find_threshold_month(self.loan_amount, loan_schedule, metric, threshold)
+                assert PayoffThresholdCalculator.find_threshold_month(3000000, cents_loan_schedule, metric, int(threshold * 100)) == month
+                if month is not None:
+                    assert PayoffThresholdCalculator.get_metric_value(3000000, cents_loan_schedule, metric, month) == \
+                        PayoffThresholdCalculator.get_metric_value(self.loan_amount, loan_schedule, metric, month) * 100
@@ -0,0 +1,109 @@
+from decimal import Decimal
+from src.sqlmodel.models.prepayment import ExtraPayment
+from src.utils.loan_amortization_calculation import LoanAmortizationCalculator
+from src.utils.loan_schedule_cache import LoanScheduleCache
+from src.utils.prepayment_calculation import PrepaymentCalculator
+
+def calculate_full_schedule(loan_amount, term_months, annual_interest_rate, extra_payments_by_month):
+    ### Reference: walks every month from month 1
+    total_monthly_payment = LoanAmortizationCalculator.calculate_total_monthly_payment(loan_amount, term_months, annual_interest_rate / 100)
+    principal_balance = loan_amount
+    total_interest_paid = Decimal(0)
+    for month in range(1, term_months + 1):
+        monthly_principal_payment = LoanAmortizationCalculator.calculate_monthly_principal_payment(total_monthly_payment, principal_balance, annual_interest_rate / 100)
+        next_principal_balance = principal_balance - monthly_principal_payment
+        if next_principal_balance < monthly_principal_payment:
+            next_principal_balance = 0
+        total_interest_paid += total_monthly_payment - (principal_balance - next_principal_balance)
+        principal_balance = next_principal_balance
+        principal_balance -= min(extra_payments_by_month.get(month, 0), principal_balance)
+        if principal_balance == 0:
+            return month, round(total_interest_paid, 2)
+    return term_months, round(total_interest_paid, 2)
+
+class TestPrepaymentCalculator:
+
+    loan_amount = Decimal('250000.00')
+    term_months = 360
+    annual_interest_rate = Decimal('6.50')
+
+    def get_loan_schedule(self):
+        return LoanScheduleCache().get_loan_schedule(
+            TestPrepaymentCalculator.loan_amount,
+            TestPrepaymentCalculator.term_months,
+            TestPrepaymentCalculator.annual_interest_rate
+        )
+
+    def test_get_extra_payments_by_month(self):
+        assert PrepaymentCalculator.get_extra_payments_by_month(
+            [
+                ExtraPayment(amount=Decimal('100.00'), month=2),
+                ExtraPayment(amount=Decimal('50.00'), month=3, recurring=True, end_month=5),
+                ExtraPayment(amount=Decimal('10.00'), month=4, recurring=True),
+            ],
+            6
+        ) == {
+            2: Decimal('100.00'),
+            3: Decimal('50.00'),
+            4: Decimal('60.00'),
+            5: Decimal('60.00'),
+            6: Decimal('10.00'),
+        }
+
+    def test_calculate_baseline(self):
+        assert PrepaymentCalculator.calculate_baseline(
+            TestPrepaymentCalculator.loan_amount,
+            self.get_loan_schedule()
+        ) == calculate_full_schedule(
+            TestPrepaymentCalculator.loan_amount,
+            TestPrepaymentCalculator.term_months,
+            TestPrepaymentCalculator.annual_interest_rate,
+            {}
+        )
+
+    def test_calculate_prepayment_summary(self):
+        loan_schedule = self.get_loan_schedule()
+        baseline_payoff_month, baseline_total_interest_paid = calculate_full_schedule(
+            TestPrepaymentCalculator.loan_amount,
+            TestPrepaymentCalculator.term_months,
+            TestPrepaymentCalculator.annual_interest_rate,
+            {}
+        )
+
+        for extra_payments in [
+            [ExtraPayment(amount=Decimal('200.00'), month=60, recurring=True)],
+            [ExtraPayment(amount=Decimal('20000.00'), month=1)],
+            [ExtraPayment(amount=Decimal('500.00'), month=12, recurring=True, end_month=24), ExtraPayment(amount=Decimal('10000.00'), month=120)],
+            [ExtraPayment(amount=Decimal('300000.00'), month=100)],
+        ]:
+            payoff_month, total_interest_paid = calculate_full_schedule(
+                TestPrepaymentCalculator.loan_amount,
+                TestPrepaymentCalculator.term_months,
+                TestPrepaymentCalculator.annual_interest_rate,
+                PrepaymentCalculator.get_extra_payments_by_month(extra_payments, TestPrepaymentCalculator.term_months)
+            )
+
+            prepayment_summary = PrepaymentCalculator.calculate_prepayment_summary(
+                TestPrepaymentCalculator.loan_amount,
+                TestPrepaymentCalculator.annual_interest_rate,
+                loan_schedule,
+                extra_payments
+            )
+
+            assert prepayment_summary['payoff_month'] == payoff_month
+            assert prepayment_summary['months_saved'] == baseline_payoff_month - payoff_month
+            assert prepayment_summary['total_interest_paid'] == total_interest_paid
+            assert prepayment_summary['interest_saved'] == baseline_total_interest_paid - total_interest_paid
+            assert prepayment_summary['interest_saved'] > 0
+
+    def test_calculate_prepayment_summary_after_payoff(self):
+        prepayment_summary = PrepaymentCalculator.calculate_prepayment_summary(
+            TestPrepaymentCalculator.loan_amount,
+            TestPrepaymentCalculator.annual_interest_rate,
+            self.get_loan_schedule(),
+            [ExtraPayment(amount=Decimal('100.00'), month=361)]
+        )
+
+        assert prepayment_summary['months_saved'] == 0
+        assert prepayment_summary['interest_saved'] == 0
+        assert prepayment_summary['total_extra_paid'] == 0